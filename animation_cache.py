@@ -0,0 +1,150 @@
+import os
+import mmap
+import zlib
+import struct
+import hashlib
+import pygame
+from PIL import Image, ImageSequence
+
+CACHE_VERSION = 2
+CACHE_MAGIC = b'AFC2'
+# magic, version, frame width, frame height, frame count
+HEADER = struct.Struct('<4sHHHI')
+# Per frame: offset and length of its palette plus compressed pixel indices
+FRAME_ENTRY = struct.Struct('<II')
+PALETTE_BYTES = 256 * 3
+
+
+class FrameCache:
+    """Decodes and scales every animation GIF once per screen resolution.
+
+    Frames are stored as a 256-colour palette plus zlib-compressed pixel indices,
+    one file per state. GIF frames never have more than 256 colours, so this is
+    lossless and a fraction of the size of raw RGB. Later startups decode the
+    indices into one anonymous mapping per state and wrap each frame as an 8-bit
+    surface, so switching state only swaps the frame list.
+    """
+
+    def __init__(self, gif_paths, screen_size, cache_dir=None):
+        self.gif_paths = gif_paths
+        self.screen_size = screen_size
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frame_cache')
+        self.cache_dir = cache_dir
+        self.states = {}
+        self._maps = {}
+
+    def cache_path(self, state):
+        """Cache file for a state, keyed on the GIF's identity and the screen size"""
+        path = self.gif_paths[state]
+        st = os.stat(path)
+        key = f"{CACHE_VERSION}|{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}|{self.screen_size[0]}x{self.screen_size[1]}"
+        digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{state}-{digest}.frames")
+
+    def load_all(self):
+        for state in self.gif_paths:
+            try:
+                self.load(state)
+            except Exception as e:
+                print(f"Error caching animation '{state}': {e}")
+
+    def load(self, state):
+        cache_file = self.cache_path(state)
+        if not os.path.exists(cache_file):
+            self.build(state, cache_file)
+        try:
+            self.states[state] = self.map_file(state, cache_file)
+        except (OSError, ValueError, struct.error, zlib.error) as e:
+            # A torn write or a corrupt file is rebuilt once rather than failing the state
+            print(f"Rebuilding animation cache '{state}': {e}")
+            self.remove(cache_file)
+            self.build(state, cache_file)
+            self.states[state] = self.map_file(state, cache_file)
+        return self.states[state]
+
+    def get(self, state):
+        """Return (frames, durations) for a state, loading it on first use"""
+        if state not in self.states:
+            return self.load(state)
+        return self.states[state]
+
+    def build(self, state, cache_file):
+        """Decode and scale a GIF, then write its frames to the cache atomically"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        pil_gif = Image.open(self.gif_paths[state])
+        frames = []
+        durations = []
+        size = None
+        for frame in ImageSequence.Iterator(pil_gif):
+            rgb = frame.convert('RGB')
+            width, height = rgb.size
+            size = (self.screen_size[0], int(self.screen_size[0] * height / width))
+            # Exact for GIF frames (at most 256 colours); nearest scaling keeps the palette
+            indexed = rgb.quantize(colors=256).resize(size, Image.NEAREST)
+            palette = bytes(indexed.getpalette()[:PALETTE_BYTES]).ljust(PALETTE_BYTES, b'\0')
+            frames.append(palette + zlib.compress(indexed.tobytes()))
+            durations.append(frame.info.get('duration', 100))
+
+        if not frames:
+            raise ValueError(f"No frames in {self.gif_paths[state]}")
+
+        tmp_file = cache_file + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            f.write(HEADER.pack(CACHE_MAGIC, CACHE_VERSION, size[0], size[1], len(frames)))
+            f.write(struct.pack(f'<{len(durations)}I', *durations))
+            offset = HEADER.size + (4 + FRAME_ENTRY.size) * len(frames)
+            for data in frames:
+                f.write(FRAME_ENTRY.pack(offset, len(data)))
+                offset += len(data)
+            for data in frames:
+                f.write(data)
+            # The rename must not land before the data, or a power cut leaves an empty cache
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, cache_file)
+
+        # Drop stale caches for this state (older GIF or another resolution)
+        for name in os.listdir(self.cache_dir):
+            stale = os.path.join(self.cache_dir, name)
+            if name.startswith(f"{state}-") and name.endswith('.frames') and stale != cache_file:
+                os.remove(stale)
+        print(f"Cached animation '{state}' ({len(frames)} frames)")
+
+    def map_file(self, state, cache_file):
+        """Decode a cache file into one anonymous mapping and wrap each frame as a surface"""
+        with open(cache_file, 'rb') as f:
+            data = f.read()
+        magic, version, width, height, count = HEADER.unpack_from(data, 0)
+        if magic != CACHE_MAGIC or version != CACHE_VERSION or not (width and height and count):
+            raise ValueError(f"Invalid frame cache: {cache_file}")
+
+        offset = HEADER.size
+        durations = list(struct.unpack_from(f'<{count}I', data, offset))
+        offset += 4 * count
+        frame_bytes = width * height
+        pixels = mmap.mmap(-1, frame_bytes * count)
+        view = memoryview(pixels)
+        frames = []
+        for i in range(count):
+            start, length = FRAME_ENTRY.unpack_from(data, offset + i * FRAME_ENTRY.size)
+            if length <= PALETTE_BYTES or start + length > len(data):
+                raise ValueError(f"Truncated frame cache: {cache_file}")
+            indices = zlib.decompress(data[start + PALETTE_BYTES:start + length])
+            if len(indices) != frame_bytes:
+                raise ValueError(f"Truncated frame cache: {cache_file}")
+            target = view[i * frame_bytes:(i + 1) * frame_bytes]
+            target[:] = indices
+            surface = pygame.image.frombuffer(target, (width, height), 'P')
+            palette = data[start:start + PALETTE_BYTES]
+            surface.set_palette([palette[c:c + 3] for c in range(0, PALETTE_BYTES, 3)])
+            frames.append(surface)
+
+        self._maps[state] = pixels
+        return frames, durations
+
+    def remove(self, cache_file):
+        try:
+            os.remove(cache_file)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,114 @@
+import os
+import time
+import socket
+
+SOCKET_PATH = os.environ.get("ANIMATION_SOCKET", "/tmp/robot_animation.sock")
+STATE_FILE = "animation_state.txt"
+
+
+def write_state_file(state, path=STATE_FILE):
+    """Atomically replace the fallback state file so readers never see a partial write"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(state)
+    os.replace(tmp_path, path)
+
+
+def read_state_file(path=STATE_FILE):
+    try:
+        with open(path, "r") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class StateSender:
+    """Sends animation states from the speech process over a Unix datagram socket"""
+
+    def __init__(self, socket_path=SOCKET_PATH, state_file=STATE_FILE):
+        self.socket_path = socket_path
+        self.state_file = state_file
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+
+    def send(self, state):
+        # Each datagram carries the monotonic send time so the receiver can measure latency
+        message = f"{time.monotonic():.6f} {state}".encode()
+        try:
+            self.sock.sendto(message, self.socket_path)
+        except OSError:
+            # Animation process not listening yet, leave the state for it to pick up on start
+            write_state_file(state, self.state_file)
+
+    def close(self):
+        self.sock.close()
+
+
+class StateReceiver:
+    """Receives animation states in the animation process without polling the filesystem"""
+
+    def __init__(self, socket_path=SOCKET_PATH, state_file=STATE_FILE):
+        self.socket_path = socket_path
+        self.state_file = state_file
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(socket_path)
+        self.sock.setblocking(False)
+
+        # Pick up any state written while no receiver was bound
+        self.initial_state = read_state_file(state_file)
+
+        self.pending_sent_at = None
+        self.latency_count = 0
+        self.latency_total = 0.0
+        self.latency_last = 0.0
+        self.latency_max = 0.0
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def poll(self):
+        """Drain pending messages and return the newest state, or None if nothing arrived"""
+        state = None
+        while True:
+            try:
+                data = self.sock.recv(256)
+            except (BlockingIOError, InterruptedError):
+                return state
+            try:
+                sent_at, received = data.decode().split(" ", 1)
+                sent_at = float(sent_at)
+            except ValueError:
+                print(f"Invalid animation state message: {data!r}")
+                continue
+            state = received
+            self.pending_sent_at = sent_at
+
+    def mark_presented(self):
+        """Record end-to-end latency once the first frame of the new state is on screen"""
+        if self.pending_sent_at is None:
+            return
+        self.record_latency(time.monotonic() - self.pending_sent_at)
+        self.pending_sent_at = None
+
+    def record_latency(self, seconds):
+        self.latency_count += 1
+        self.latency_total += seconds
+        self.latency_last = seconds
+        self.latency_max = max(self.latency_max, seconds)
+
+    def latency_stats(self):
+        """State-change latency from send_animation_state to first presented frame, in milliseconds"""
+        mean = self.latency_total / self.latency_count if self.latency_count else 0.0
+        return {
+            'count': self.latency_count,
+            'last_ms': self.latency_last * 1000,
+            'mean_ms': mean * 1000,
+            'max_ms': self.latency_max * 1000
+        }
+
+    def close(self):
+        self.sock.close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
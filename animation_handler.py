@@ -1,120 +1,179 @@
 import pygame
 import os
-from PIL import Image, ImageSequence
 import time
+import select
+from animation_cache import FrameCache
+from animation_channel import StateReceiver, STATE_FILE
+import metrics
 
-os.environ["SDL_VIDEODRIVER"] = "x11"
-os.environ["SDL_AUDIODRIVER"] = "alsa"
+os.environ.setdefault("SDL_VIDEODRIVER", "x11")
+os.environ.setdefault("SDL_AUDIODRIVER", "alsa")
+
+ANIMATIONS_DIR = os.environ.get("ANIMATIONS_DIR", "/home/dlt/chatbot/animations")
+
+# Shortest frame we schedule (GIFs with 0 ms delays would otherwise spin)
+MIN_FRAME_SECONDS = 1 / 60
+# Longest we sleep before checking pygame events again
+MAX_WAIT_SECONDS = 0.25
+
+FRAME_TIME = metrics.histogram("animation_frame_seconds", "Time to draw and present one frame")
+FRAME_LATENESS = metrics.histogram("animation_frame_lateness_seconds", "How late frames advance past their GIF deadline")
+STATE_SWITCH_TIME = metrics.histogram("animation_state_switch_seconds", "Time to load a state's frames and reset the schedule")
 
 class AnimationHandler:
-    def __init__(self):
+    def __init__(self, screen_size=None):
         pygame.init()
         pygame.display.init()
         pygame.mixer.quit()
 
         # Get screen info and set up display
-        screen_info = pygame.display.Info()
-        self.SCREEN_WIDTH = screen_info.current_w
-        self.SCREEN_HEIGHT = screen_info.current_h
-        self.screen = pygame.display.set_mode((self.SCREEN_WIDTH, self.SCREEN_HEIGHT), 
+        if screen_size is None:
+            screen_info = pygame.display.Info()
+            screen_size = (screen_info.current_w, screen_info.current_h)
+        self.SCREEN_WIDTH, self.SCREEN_HEIGHT = screen_size
+        self.screen = pygame.display.set_mode((self.SCREEN_WIDTH, self.SCREEN_HEIGHT),
                                             pygame.SWSURFACE | pygame.DOUBLEBUF)
         pygame.display.set_caption("AI Assistant")
-        self.clock = pygame.time.Clock()
 
         self.frames = []
-        self.durations = []
+        self.frame_seconds = []
         self.frame_index = 0
-        self.frame_count = 0
+        self.frame_rect = None
+        self.next_frame_at = 0.0
+        self.needs_present = False
+        self.needs_clear = False
         self.animation_state = 'idle'
 
+        # Scheduler statistics for benchmarking
+        self.presented_frames = 0
+        self.frame_advances = 0
+        self.drift_total = 0.0
+        self.drift_max = 0.0
+
         # Animation paths
         self.GIF_PATHS = {
-            'idle': '/home/dlt/chatbot/animations/idle.gif',
-            'listening': '/home/dlt/chatbot/animations/listening.gif',
-            'thinking': '/home/dlt/chatbot/animations/thinking.gif',
-            'answering': '/home/dlt/chatbot/animations/speaking.gif',
-            'last': '/home/dlt/chatbot/animations/last.gif'
+            'idle': os.path.join(ANIMATIONS_DIR, 'idle.gif'),
+            'listening': os.path.join(ANIMATIONS_DIR, 'listening.gif'),
+            'thinking': os.path.join(ANIMATIONS_DIR, 'thinking.gif'),
+            'answering': os.path.join(ANIMATIONS_DIR, 'speaking.gif'),
+            'last': os.path.join(ANIMATIONS_DIR, 'last.gif')
         }
 
-        # Create state file if it doesn't exist
-        self.STATE_FILE = "animation_state.txt"
-        with open(self.STATE_FILE, "w") as f:
-            f.write("idle")
+        # Decode and scale every animation once, later startups map the cache
+        self.frame_cache = FrameCache(self.GIF_PATHS, (self.SCREEN_WIDTH, self.SCREEN_HEIGHT))
+        self.frame_cache.load_all()
 
-    def load_gif(self, path):
-        self.frames = []
-        self.durations = []
+        # State changes arrive over a datagram socket from the speech handler
+        self.channel = StateReceiver()
+
+    def set_state(self, state):
+        with STATE_SWITCH_TIME.time():
+            self.load_state(state)
+
+    def load_state(self, state):
         try:
-            pil_gif = Image.open(path)
-            for frame in ImageSequence.Iterator(pil_gif):
-                mode = frame.mode
-                size = frame.size
-                data = frame.tobytes()
-
-                pygame_frame = pygame.image.fromstring(data, size, mode)
-                scaled_frame = pygame.transform.scale(pygame_frame,
-                    (self.SCREEN_WIDTH, int(self.SCREEN_WIDTH * size[1] / size[0])))
-
-                self.frames.append(scaled_frame)
-                self.durations.append(frame.info.get('duration', 100))
-
-            self.frame_index = 0
-            self.frame_count = 0
-            print(f"Successfully loaded GIF: {path}")
+            frames, durations = self.frame_cache.get(state)
         except Exception as e:
-            print(f"Error loading GIF: {e}")
+            print(f"Error loading animation '{state}': {e}")
+            return
+
+        # Everything derived from the GIF is computed once per switch, not per tick
+        self.frames = frames
+        self.frame_seconds = [max(d / 1000, MIN_FRAME_SECONDS) for d in durations]
+        x_pos = (self.SCREEN_WIDTH - frames[0].get_width()) // 2
+        y_pos = (self.SCREEN_HEIGHT - frames[0].get_height()) // 2
+        self.frame_rect = pygame.Rect(x_pos, y_pos, frames[0].get_width(), frames[0].get_height())
+        self.frame_index = 0
+        self.next_frame_at = time.monotonic() + self.frame_seconds[0]
+        self.needs_present = True
+        self.needs_clear = True
 
-    def check_state_file(self):
+    def check_state_channel(self):
         try:
-            with open(self.STATE_FILE, "r") as f:
-                new_state = f.read().strip()
-                if new_state != self.animation_state:
-                    self.animation_state = new_state
-                    self.load_gif(self.GIF_PATHS[new_state])
+            new_state = self.channel.poll()
+            if new_state and new_state != self.animation_state:
+                self.animation_state = new_state
+                self.set_state(new_state)
         except Exception as e:
-            print(f"Error reading state file: {e}")
+            print(f"Error reading animation state: {e}")
+
+    def advance(self, now):
+        """Step through frames by wall-clock time against the GIF durations"""
+        if len(self.frames) < 2 or now < self.next_frame_at:
+            return
+        self.record_drift(now - self.next_frame_at)
+        # Deadlines advance from the schedule, not from now, so late ticks don't accumulate
+        while self.next_frame_at <= now:
+            self.frame_index = (self.frame_index + 1) % len(self.frames)
+            self.next_frame_at += self.frame_seconds[self.frame_index]
+        self.needs_present = True
+
+    def record_drift(self, seconds):
+        FRAME_LATENESS.observe(seconds)
+        self.frame_advances += 1
+        self.drift_total += seconds
+        self.drift_max = max(self.drift_max, seconds)
+
+    def present(self):
+        """Draw the current frame, updating only the frame area unless the state changed"""
+        if self.needs_clear:
+            self.screen.fill((0, 0, 0))
+            self.screen.blit(self.frames[self.frame_index], self.frame_rect.topleft)
+            pygame.display.flip()
+            self.needs_clear = False
+        else:
+            self.screen.blit(self.frames[self.frame_index], self.frame_rect.topleft)
+            pygame.display.update(self.frame_rect)
+        self.needs_present = False
+        self.presented_frames += 1
+        self.channel.mark_presented()
+
+    def wait_for_next_frame(self):
+        """Sleep until the next frame deadline or an incoming state message"""
+        timeout = MAX_WAIT_SECONDS
+        if len(self.frames) > 1:
+            timeout = min(timeout, max(0.0, self.next_frame_at - time.monotonic()))
+        select.select([self.channel], [], [], timeout)
+
+    def step(self):
+        """Run one scheduler iteration, returning False once the window is closed"""
+        self.check_state_channel()
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+
+        if self.frames:
+            self.advance(time.monotonic())
+            if self.needs_present:
+                with FRAME_TIME.time():
+                    self.present()
+        self.wait_for_next_frame()
+        return True
 
     def run(self):
-        self.load_gif(self.GIF_PATHS['idle'])
+        exporters = metrics.start('animation')
+        self.animation_state = self.channel.initial_state or 'idle'
+        self.set_state(self.animation_state)
         running = True
 
         while running:
             try:
-                # Check for new animation state from file
-                self.check_state_file()
-
-                if not self.frames:
-                    time.sleep(0.016)
-                    continue
-
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT:
-                        running = False
-                        break
-
-                frame_intervals = [max(1, int(d / (1000 / 60))) for d in self.durations]
-                x_pos = (self.SCREEN_WIDTH - self.frames[0].get_width()) // 2
-                y_pos = (self.SCREEN_HEIGHT - self.frames[0].get_height()) // 2
-
-                self.screen.fill((0, 0, 0))
-                self.screen.blit(self.frames[self.frame_index], (x_pos, y_pos))
-                pygame.display.flip()
-
-                self.frame_count += 1
-                if self.frame_count >= frame_intervals[self.frame_index]:
-                    self.frame_index = (self.frame_index + 1) % len(self.frames)
-                    self.frame_count = 0
-
-                self.clock.tick(60)
-
+                running = self.step()
             except Exception as e:
                 print(f"Error in animation loop: {e}")
                 time.sleep(0.016)
 
-        if os.path.exists(self.STATE_FILE):
-            os.remove(self.STATE_FILE)
+        stats = self.channel.latency_stats()
+        print(f"State changes: {stats['count']}, latency mean {stats['mean_ms']:.1f} ms, max {stats['max_ms']:.1f} ms")
+        for line in metrics.summary():
+            print(line)
+        metrics.stop(exporters)
+        self.channel.close()
+        if os.path.exists(STATE_FILE):
+            os.remove(STATE_FILE)
         pygame.quit()
 
 if __name__ == "__main__":
     handler = AnimationHandler()
-    handler.run()
\ No newline at end of file
+    handler.run()
@@ -0,0 +1,203 @@
+import time
+import threading
+import metrics
+
+SAMPLE_RATE = 16000
+# Polly PCM output is signed 16-bit little-endian mono
+SAMPLE_WIDTH = 2
+CHANNELS = 1
+
+# Queueing a clip includes downloading it when it is a stream; draining is waiting for it to be heard
+PLAY_TIME = metrics.histogram("speech_stage_seconds", "Time spent in each voice pipeline stage", stage="audio_queue")
+DRAIN_TIME = metrics.histogram("speech_stage_seconds", "Time spent in each voice pipeline stage", stage="audio_drain")
+
+
+class AudioOutput:
+    """Backend that turns PCM bytes into sound; write() may block while the device is busy"""
+
+    sample_rate = SAMPLE_RATE
+    channels = CHANNELS
+
+    def write(self, data):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PyAudioOutput(AudioOutput):
+    """Long-lived PortAudio output stream (PyAudio is already required by speech_recognition)"""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, channels=CHANNELS):
+        import pyaudio
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.audio = pyaudio.PyAudio()
+        self.stream = self.audio.open(format=pyaudio.paInt16, channels=channels,
+                                      rate=sample_rate, output=True)
+
+    def write(self, data):
+        self.stream.write(bytes(data))
+
+    def close(self):
+        self.stream.stop_stream()
+        self.stream.close()
+        self.audio.terminate()
+
+
+class NullOutput(AudioOutput):
+    """Discards audio, optionally taking as long as real playback would; for machines without a sound card"""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, channels=CHANNELS, realtime=False):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.realtime = realtime
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        if self.realtime:
+            time.sleep(len(data) / (self.sample_rate * self.channels * SAMPLE_WIDTH))
+
+
+class RingBuffer:
+    """Bounded byte ring between the producer (network) and the audio output thread"""
+
+    def __init__(self, capacity, align=1):
+        self.buffer = bytearray(capacity)
+        self.capacity = capacity
+        self.align = align
+        self.start = 0
+        self.size = 0
+        self.in_flight = False
+        self.generation = 0
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def write(self, data, generation=None):
+        """Copy data in, blocking while full; returns False if the buffer was cleared meanwhile.
+
+        generation (from an earlier read of self.generation) also rejects data once
+        the buffer has been cleared since that read.
+        """
+        view = memoryview(data)
+        with self.cond:
+            if generation is None:
+                generation = self.generation
+            while view:
+                while self.size == self.capacity and self.generation == generation and not self.closed:
+                    self.cond.wait()
+                if self.generation != generation or self.closed:
+                    return False
+                end = (self.start + self.size) % self.capacity
+                count = min(len(view), self.capacity - self.size, self.capacity - end)
+                self.buffer[end:end + count] = view[:count]
+                self.size += count
+                view = view[count:]
+                self.cond.notify_all()
+        return True
+
+    def read(self, max_bytes, timeout=None):
+        """Take up to max_bytes (whole frames only), waiting up to timeout for data"""
+        with self.cond:
+            if self.size < self.align and not self.closed:
+                self.cond.wait(timeout)
+            count = min(self.size, max_bytes, self.capacity - self.start)
+            count -= count % self.align
+            if count == 0:
+                return b""
+            data = bytes(self.buffer[self.start:self.start + count])
+            self.start = (self.start + count) % self.capacity
+            self.size -= count
+            self.in_flight = True
+            self.cond.notify_all()
+            return data
+
+    def task_done(self):
+        with self.cond:
+            self.in_flight = False
+            self.cond.notify_all()
+
+    def wait_drained(self):
+        with self.cond:
+            while (self.size >= self.align or self.in_flight) and not self.closed:
+                self.cond.wait()
+            # Drop any trailing partial frame
+            self.start = 0
+            self.size = 0
+
+    def clear(self):
+        with self.cond:
+            self.generation += 1
+            self.start = 0
+            self.size = 0
+            self.cond.notify_all()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+class AudioPlayer:
+    """Streams audio clips through a ring buffer into one long-lived output, without temp files"""
+
+    def __init__(self, output, buffer_bytes=64 * 1024, chunk_bytes=4096):
+        self.output = output
+        self.chunk_bytes = chunk_bytes
+        self.ring = RingBuffer(buffer_bytes, align=SAMPLE_WIDTH * output.channels)
+        self.cancelled = False
+        self.thread = threading.Thread(target=self.output_worker, daemon=True)
+        self.thread.start()
+
+    def output_worker(self):
+        while not self.ring.closed:
+            data = self.ring.read(self.chunk_bytes, timeout=0.1)
+            if not data:
+                continue
+            try:
+                self.output.write(data)
+            except Exception as e:
+                print(f"⚠️ Error writing audio: {e}")
+            finally:
+                self.ring.task_done()
+
+    def play(self, clip):
+        """Queue a clip (bytes or a readable stream such as Polly's AudioStream) for playback.
+
+        Returns once the clip is in the buffer, so playback starts with the first chunk
+        while the rest is still downloading.
+        """
+        with PLAY_TIME.time():
+            self.queue_clip(clip)
+
+    def queue_clip(self, clip):
+        # A clip belongs to the buffer generation it was queued in: once stop() clears the
+        # buffer, chunks still downloading for it are dropped even after finish()
+        generation = self.ring.generation
+        if isinstance(clip, (bytes, bytearray, memoryview)):
+            chunks = [clip]
+        else:
+            chunks = iter(lambda: clip.read(self.chunk_bytes), b"")
+        if not self.cancelled:
+            for chunk in chunks:
+                if not self.ring.write(chunk, generation):
+                    break
+        if not isinstance(clip, (bytes, bytearray, memoryview)) and hasattr(clip, 'close'):
+            clip.close()
+
+    def finish(self):
+        """Wait until everything queued has been played, then accept new clips again"""
+        with DRAIN_TIME.time():
+            self.ring.wait_drained()
+        self.cancelled = False
+
+    def stop(self):
+        """Cancel playback: drop buffered audio and ignore clips until finish()"""
+        self.cancelled = True
+        self.ring.clear()
+
+    def close(self):
+        self.ring.close()
+        self.thread.join()
+        self.output.close()
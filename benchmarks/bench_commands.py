@@ -0,0 +1,98 @@
+"""Throughput of the command path up to the handler: decode, validate, dedupe and dispatch.
+
+Handlers are no-ops, so this measures only what the MQTT network thread and
+the dispatcher workers spend per command. A share of the stream repeats
+earlier command ids, as a QoS 1 redelivery would.
+
+Run from the repository root:
+    python3 benchmarks/bench_commands.py [commands]
+"""
+import os
+import sys
+import json
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from robot_commands import CommandRegistry, CommandError, Optional
+
+DELIVERY_ID = (str, int)
+
+
+def registry():
+    commands = CommandRegistry(dedupe_window=600, dedupe_size=1024)
+    noop = lambda message: None
+    commands.register('start_delivery', noop, {'deliveryId': DELIVERY_ID, 'ownerLocation': object})
+    commands.register('set_otp', noop, {'deliveryId': DELIVERY_ID, 'otp': (str, int), 'compartment': Optional(int)})
+    commands.register('open_door', noop, {'deliveryId': DELIVERY_ID})
+    commands.register('go_to_base', noop, {'baseLocation': object, 'deliveryId': Optional(DELIVERY_ID)})
+    return commands
+
+
+def payloads(count, seed=5):
+    rng = random.Random(seed)
+    messages = []
+    for i in range(count):
+        delivery_id = f"d-{i // 4}"
+        kind = i % 4
+        if kind == 0:
+            message = {'action': 'start_delivery', 'deliveryId': delivery_id,
+                       'ownerLocation': {'lat': 12.97, 'lng': 77.59, 'floor': 3}}
+        elif kind == 1:
+            message = {'action': 'set_otp', 'deliveryId': delivery_id, 'otp': f"{rng.randrange(10000):04d}"}
+        elif kind == 2:
+            message = {'action': 'open_door', 'deliveryId': delivery_id}
+        else:
+            message = {'action': 'go_to_base', 'baseLocation': {'lat': 12.96, 'lng': 77.58}}
+        message['commandId'] = f"c-{i}"
+        if rng.random() < 0.02:
+            message = {'action': 'set_otp', 'deliveryId': delivery_id}  # malformed
+        messages.append(json.dumps(message).encode())
+        if i > 10 and rng.random() < 0.05:
+            messages.append(messages[rng.randrange(max(0, len(messages) - 50), len(messages))])
+    return messages
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    raw = payloads(count)
+    commands = registry()
+
+    start = time.perf_counter()
+    decoded = [json.loads(payload) for payload in raw]
+    decode_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    valid = []
+    invalid = 0
+    for message in decoded:
+        try:
+            valid.append((commands.check(message), message))
+        except CommandError:
+            invalid += 1
+    validate_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    accepted = []
+    for command, message in valid:
+        if not commands.is_duplicate(command, message):
+            commands.remember(message)
+            accepted.append(message)
+    dedupe_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for message in accepted:
+        commands.dispatch(message)
+    dispatch_seconds = time.perf_counter() - start
+
+    total = decode_seconds + validate_seconds + dedupe_seconds + dispatch_seconds
+    print(f"{len(raw)} commands: {invalid} malformed, {len(valid) - len(accepted)} duplicates dropped")
+    for stage, seconds, n in [("decode", decode_seconds, len(raw)), ("validate", validate_seconds, len(decoded)),
+                              ("dedupe", dedupe_seconds, len(valid)), ("dispatch", dispatch_seconds, len(accepted))]:
+        print(f"  {stage:>9}: {seconds / n * 1e9:8.0f} ns/command")
+    print(f"  end to end: {len(raw) / total:,.0f} commands/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Request payload size and build latency with and without the token-budgeted context.
+
+Replays a synthetic 1,000-turn history and compares sending the whole history
+(the old module-level messages list) with ContextWindow.build().
+
+Run from the repository root:
+    python3 benchmarks/bench_context_window.py [turns] [max_tokens]
+"""
+import os
+import sys
+import json
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_context import ContextWindow, estimate_tokens
+
+WORDS = ("where is the lift the delivery robot package opening hours lobby gate floor "
+         "security guard owner please can you tell me what time does it close today").split()
+
+
+def sentence(rng, low, high):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high))).capitalize() + "."
+
+
+def payload_stats(messages):
+    start = time.perf_counter()
+    body = json.dumps({"model": "llama3-70b-8192", "messages": messages})
+    serialize_ms = (time.perf_counter() - start) * 1000
+    tokens = sum(estimate_tokens(m["content"]) for m in messages)
+    return len(body), tokens, serialize_ms
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    max_tokens = int(sys.argv[2]) if len(sys.argv) > 2 else 3000
+    rng = random.Random(7)
+
+    history = []
+    context = ContextWindow("You are Karna, a delivery robot.", max_tokens=max_tokens)
+    add_seconds = 0.0
+    build_seconds = 0.0
+    checkpoints = {10, 100, turns // 2, turns}
+
+    print(f"{'turn':>6} {'full KB':>9} {'full tok':>9} {'ctx KB':>8} {'ctx tok':>8} {'full ser ms':>12} {'ctx ser ms':>11}")
+    for turn in range(1, turns + 1):
+        for role, text in (("user", sentence(rng, 4, 14)), ("assistant", sentence(rng, 10, 60))):
+            history.append({"role": role, "content": text})
+            start = time.perf_counter()
+            context.add(role, text)
+            add_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        messages = context.build()
+        build_seconds += time.perf_counter() - start
+
+        if turn in checkpoints:
+            full_bytes, full_tokens, full_ms = payload_stats(history)
+            ctx_bytes, ctx_tokens, ctx_ms = payload_stats(messages)
+            print(f"{turn:>6} {full_bytes / 1024:>9.1f} {full_tokens:>9} {ctx_bytes / 1024:>8.1f} "
+                  f"{ctx_tokens:>8} {full_ms:>12.3f} {ctx_ms:>11.3f}")
+
+    print(f"ContextWindow.add: {add_seconds / (turns * 2) * 1e6:.1f} us/message, "
+          f"build: {build_seconds / turns * 1e6:.1f} us/turn")
+    if full_tokens > 8192:
+        print(f"Full history ({full_tokens} tokens) exceeds the 8192-token model limit")
+
+
+if __name__ == "__main__":
+    main()
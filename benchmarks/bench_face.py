@@ -0,0 +1,160 @@
+"""Face verification on a Pi-class CPU budget: latency per verification and frames per second.
+
+Synthetic 320x240 frames of textured "faces" stand in for the camera: each
+person is a fixed random texture, and every frame shifts it by a few pixels
+and changes brightness and sensor noise. Four owners are enrolled, one per
+compartment, through OTPVerifier.set_otp and a local stub server, so the
+gallery prefetch is timed as well. NumPy is limited to one thread.
+
+The stand-in detector and embedder are used unless --model points at an ONNX
+embedding model; these numbers are for the pipeline around the model, not a
+claim about recognition accuracy.
+
+Run from the repository root:
+    python3 benchmarks/bench_face.py [--trials N] [--threads T] [--model face.onnx]
+"""
+import os
+import sys
+import argparse
+
+# Must be set before NumPy loads its BLAS
+THREADS = sys.argv[sys.argv.index("--threads") + 1] if "--threads" in sys.argv else "1"
+for variable in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ[variable] = THREADS
+
+import time
+import shutil
+import tempfile
+import statistics
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from robot_face import FaceVerifier, CenterDetector, ProjectionEmbedder, OnnxEmbedder, crop
+from robot_otp import OTPVerifier
+from stub_delivery_server import StubDeliveryServer
+
+WIDTH, HEIGHT = 320, 240
+FACE = 144
+
+
+def person(seed):
+    """A smooth random texture the size of a face"""
+    rng = np.random.default_rng(seed)
+    coarse = rng.uniform(40, 215, (12, 12))
+    return np.kron(coarse, np.ones((FACE // 12, FACE // 12)))
+
+
+def frames(face, rng, count, shift=6, noise=12.0):
+    return list(generate_frames(face, rng, count, shift, noise))
+
+
+def generate_frames(face, rng, count, shift, noise):
+    for _ in range(count):
+        frame = rng.uniform(0, 255, (HEIGHT, WIDTH, 3)).astype(np.float32)
+        dx, dy = rng.integers(-shift, shift + 1, 2)
+        x, y = (WIDTH - FACE) // 2 + dx, (HEIGHT - FACE) // 2 + dy
+        frame[y:y + FACE, x:x + FACE] = (face * rng.uniform(0.8, 1.2))[:, :, None]
+        frame += rng.normal(0, noise, frame.shape).astype(np.float32)
+        yield np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def enroll(verifier, face, rng, count=5):
+    """Embeddings of a few photos, as the server would hold them"""
+    crops = np.zeros((count, verifier.embedder.size, verifier.embedder.size), dtype=np.float32)
+    for i, frame in enumerate(frames(face, rng, count)):
+        crop(frame, verifier.detector.detect(frame)[0], crops[i])
+    return verifier.embedder.embed(crops).tolist()
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return (statistics.median(samples) * 1000, samples[int(len(samples) * 0.95)] * 1000)
+
+
+def run_trials(verifier, people, rng, trials):
+    genuine, impostor, used = [], [], []
+    accepted_genuine = accepted_impostor = 0
+    for trial in range(trials):
+        delivery_id, face = people[trial % len(people)]
+        # Frames are made before the clock starts; only the pipeline is timed
+        owner_frames = frames(face, rng, verifier.max_frames)
+        stranger_frames = frames(person(10000 + trial), rng, verifier.max_frames)
+        seen = verifier.frames_seen
+        start = time.perf_counter()
+        match = verifier.match(owner_frames)
+        genuine.append(time.perf_counter() - start)
+        accepted_genuine += bool(match and match[0] == delivery_id)
+        used.append(verifier.frames_seen - seen)
+        start = time.perf_counter()
+        match = verifier.match(stranger_frames)
+        impostor.append(time.perf_counter() - start)
+        accepted_impostor += bool(match)
+    return genuine, impostor, statistics.mean(used), accepted_genuine, accepted_impostor
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trials", type=int, default=40)
+    parser.add_argument("--threads", default="1")
+    parser.add_argument("--model")
+    args = parser.parse_args()
+    rng = np.random.default_rng(1)
+    embedder = OnnxEmbedder(args.model, threads=int(args.threads)) if args.model else ProjectionEmbedder()
+
+    # Enrol four owners through set_otp, as the robot would when loading deliveries
+    workdir = tempfile.mkdtemp(prefix="bench_face_")
+    server = StubDeliveryServer().start()
+    opened = []
+    try:
+        face_verifier = FaceVerifier(CenterDetector(), embedder)
+        otp = OTPVerifier(server.url, workdir, face_verifier=face_verifier)
+        otp.set_door_callback(lambda action, compartment: opened.append(compartment))
+        people = [(f"d{k}", person(k)) for k in range(4)]
+        for delivery_id, face in people:
+            server.faces[delivery_id] = enroll(face_verifier, face, rng)
+        prefetch = []
+        for k, (delivery_id, face) in enumerate(people):
+            start = time.perf_counter()
+            otp.set_otp(f"{k:04d}", delivery_id)
+            while delivery_id not in face_verifier.gallery.owners:
+                time.sleep(0.0005)
+            prefetch.append(time.perf_counter() - start)
+
+        print(f"{THREADS} BLAS thread(s), {WIDTH}x{HEIGHT} frames, {type(embedder).__name__} "
+              f"({embedder.dim}-d, {embedder.size}px crops), 4 owners enrolled")
+        print(f"  gallery prefetch after set_otp  {statistics.mean(prefetch) * 1000:7.1f} ms mean (stub server)")
+
+        for batch_size in (1, 4, 8):
+            verifier = FaceVerifier(face_verifier.detector, embedder, batch_size=batch_size, max_frames=30)
+            verifier.gallery = face_verifier.gallery
+            genuine, impostor, used, accepted, false_accepts = run_trials(verifier, people, rng, args.trials)
+            stats = verifier.stats()
+            print(f"  batch {batch_size}: {stats['fps']:6.0f} frames/s; owner verified "
+                  f"{percentiles(genuine)[0]:6.1f} ms p50 {percentiles(genuine)[1]:6.1f} ms p95 "
+                  f"({accepted}/{args.trials}, {used:.1f} frames); stranger rejected {percentiles(impostor)[0]:6.1f} ms p50 "
+                  f"(false accepts {false_accepts}/{args.trials})")
+
+        # End to end through OTPVerifier: the door callback gets the owner's compartment
+        delivery_id, face = people[2]
+        owner_frames = frames(face, rng, 30)
+        start = time.perf_counter()
+        compartment = otp.verify_face(owner_frames, delivery_id)
+        elapsed = time.perf_counter() - start
+        deadline = time.time() + 2
+        while not opened and time.time() < deadline:
+            time.sleep(0.001)
+        print(f"  verify_face -> compartment {compartment} in {elapsed * 1000:.1f} ms, door opened {opened}, "
+              f"{delivery_id} left the gallery: {delivery_id not in face_verifier.gallery.owners}")
+        otp.outbox.wait_empty(5)
+        print(f"  server notified: {server.verified}")
+        otp.outbox.stop()
+    finally:
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Compare FaqMatcher against the difflib.get_close_matches scan.
+
+Run from the repository root:
+    python3 benchmarks/bench_faq_matcher.py
+"""
+import os
+import sys
+import time
+import random
+from difflib import get_close_matches
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from faq_matcher import FaqMatcher
+
+SIZES = [10, 1000, 10000]
+QUERIES = 200
+WORDS = ("robot delivery package order otp door compartment lift gate lobby payment refund "
+         "track schedule cancel change location time owner security code open close battery "
+         "charge route obstacle voice face app phone email address floor building parcel").split()
+
+
+def make_faqs(count, rng):
+    faqs = {}
+    while len(faqs) < count:
+        words = rng.sample(WORDS, rng.randint(4, 9))
+        faqs[f"{' '.join(words)}?"] = f"answer {len(faqs)}"
+    return faqs
+
+
+def perturb(text, rng):
+    """Simulate recognizer noise: drop or swap a few characters"""
+    chars = list(text)
+    for _ in range(rng.randint(0, 3)):
+        i = rng.randrange(len(chars))
+        if rng.random() < 0.5:
+            del chars[i]
+        else:
+            chars[i] = rng.choice("abcdefghijklmnopqrstuvwxyz ")
+    return "".join(chars)
+
+
+def difflib_best(query, faqs):
+    matches = get_close_matches(query, faqs.keys(), n=1, cutoff=0.7)
+    return faqs.get(matches[0], None) if matches else None
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'entries':>8} {'difflib ms':>11} {'matcher ms':>11} {'build ms':>9} {'agree':>6}")
+    for size in SIZES:
+        faqs = make_faqs(size, rng)
+        questions = list(faqs)
+        queries = [perturb(rng.choice(questions), rng) for _ in range(QUERIES)]
+        # The difflib scan is slow at scale, so time it on fewer queries
+        difflib_queries = queries[:max(10, QUERIES * 10 // size)] if size > 1000 else queries
+
+        start = time.perf_counter()
+        matcher = FaqMatcher(faqs)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        expected = [difflib_best(q, faqs) for q in difflib_queries]
+        difflib_ms = (time.perf_counter() - start) * 1000 / len(difflib_queries)
+
+        start = time.perf_counter()
+        for q in queries:
+            matcher.best(q)
+        matcher_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        agree = sum(matcher.best(q) == e for q, e in zip(difflib_queries, expected)) / len(expected)
+        print(f"{size:>8} {difflib_ms:>11.3f} {matcher_ms:>11.3f} {build_ms:>9.1f} {agree:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
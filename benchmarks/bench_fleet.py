@@ -0,0 +1,202 @@
+"""Load test: a fleet of RobotControllers against an in-process broker.
+
+Every robot gets the same scripted command stream (start_delivery, set_otp,
+open_door, go_to_base per delivery). A dashboard client records when each ack
+comes back. Doors are stubbed with a short sleep, the OTP keypad is never built
+and ownerId lookups go to a local stub server, so nothing leaves the machine.
+Robots can be split across processes, one broker per process.
+
+Run from the repository root:
+    python3 benchmarks/bench_fleet.py [--robots N] [--deliveries K] [--rate CMDS_PER_S] [--processes P]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import contextlib
+import statistics
+import tracemalloc
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from robot import RobotController
+from robot_otp import OTPVerifier
+from robot_door import DoorController
+from fake_broker import FakeBroker, FakeClient
+from stub_delivery_server import StubDeliveryServer
+
+
+class StubDoor(DoorController):
+    """A door that takes door_seconds to move and drives no hardware"""
+
+    def __init__(self, door_seconds):
+        super().__init__()
+        self.door_seconds = door_seconds
+
+    def control(self, action, compartment=1):
+        time.sleep(self.door_seconds)
+        if action == "open":
+            self.open_doors.add(compartment)
+        elif action == "close":
+            self.open_doors.discard(compartment)
+        if self.on_change:
+            self.on_change(set(self.open_doors))
+
+
+def script(robot_id, deliveries):
+    for k in range(deliveries):
+        delivery_id = f"{robot_id}-d{k}"
+        yield {'action': 'start_delivery', 'deliveryId': delivery_id, 'ownerLocation': {'lat': 12.97, 'lng': 77.59}}
+        yield {'action': 'set_otp', 'deliveryId': delivery_id, 'otp': f"{k % 10000:04d}"}
+        yield {'action': 'open_door', 'deliveryId': delivery_id}
+        yield {'action': 'go_to_base', 'deliveryId': delivery_id, 'baseLocation': {'lat': 12.96, 'lng': 77.58}}
+
+
+def run_shard(robot_ids, deliveries, rate, door_seconds):
+    """Run some robots in this process; returns raw results for merging"""
+    workdir = tempfile.mkdtemp(prefix="bench_fleet_")
+    server = StubDeliveryServer().start()
+    broker = FakeBroker()
+    sent = {}
+    acks = {}
+    arrivals = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def on_dashboard_message(client, userdata, msg):
+        received_at = time.perf_counter()
+        robot_id = msg.topic.split("/")[1]
+        body = json.loads(msg.payload)
+        with lock:
+            if msg.topic.endswith("/arrival"):
+                arrivals.append(body['deliveryId'])
+                return
+            acks[(robot_id, body['action'], body['deliveryId'])] = received_at
+            statuses[body['status']] = statuses.get(body['status'], 0) + 1
+
+    dashboard = FakeClient(broker, "dashboard")
+    dashboard.on_message = on_dashboard_message
+    dashboard.subscribe("robot/+/ack")
+    dashboard.subscribe("robot/+/arrival")
+    dashboard.loop_start()
+
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            robots = []
+            for robot_id in robot_ids:
+                verifier = OTPVerifier(server.url, os.path.join(workdir, robot_id))
+                robot = RobotController(robot_id, client=FakeClient(broker, robot_id),
+                                        otp_verifier=verifier, door_controller=StubDoor(door_seconds))
+                robot.client.connect()
+                robot.client.loop_start()
+                robot.telemetry.start()
+                robots.append(robot)
+            memory_per_robot = (tracemalloc.get_traced_memory()[0] - before) / len(robot_ids)
+            tracemalloc.stop()
+
+            # Interleave the robots' scripts, paced to rate commands per second per robot
+            streams = [list(script(robot_id, deliveries)) for robot_id in robot_ids]
+            commands = [(robot_id, stream[i]) for i in range(len(streams[0]))
+                        for robot_id, stream in zip(robot_ids, streams)]
+            interval = 1.0 / (rate * len(robot_ids))
+            start = time.perf_counter()
+            for i, (robot_id, message) in enumerate(commands):
+                delay = start + i * interval - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                with lock:
+                    sent[(robot_id, message['action'], message['deliveryId'])] = time.perf_counter()
+                broker.publish(f"robot/{robot_id}/command", json.dumps(message).encode())
+
+            deadline = time.perf_counter() + 30 + len(commands) * door_seconds
+            while time.perf_counter() < deadline:
+                with lock:
+                    if len(acks) >= len(sent):
+                        break
+                time.sleep(0.01)
+            finished = max(acks.values()) if acks else time.perf_counter()
+
+            dispatcher_stats = [robot.dispatcher.stats() for robot in robots]
+            for robot in robots:
+                robot.telemetry.stop()
+                robot.client.loop_stop()
+                robot.dispatcher.stop()
+                robot.otp_verifier.outbox.stop()
+    finally:
+        dashboard.loop_stop()
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    latencies = {}
+    for key, sent_at in sent.items():
+        if key in acks:
+            latencies.setdefault(key[1], []).append(acks[key] - sent_at)
+    return {
+        'latencies': latencies,
+        'sent': len(sent),
+        'acked': len(acks),
+        'statuses': statuses,
+        'arrivals': len(arrivals),
+        'seconds': finished - start,
+        'memory_per_robot': memory_per_robot,
+        'rejected': sum(stats['rejected'] for stats in dispatcher_stats),
+        'broker_messages': broker.messages
+    }
+
+
+def percentiles(samples):
+    cuts = statistics.quantiles(samples, n=100) if len(samples) > 1 else samples * 99
+    return cuts[49] * 1000, cuts[94] * 1000, cuts[98] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--robots", type=int, default=20)
+    parser.add_argument("--deliveries", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=10, help="commands per second per robot")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--door-seconds", type=float, default=0.05)
+    args = parser.parse_args()
+
+    robot_ids = [f"rob-{i:03d}" for i in range(args.robots)]
+    shards = [robot_ids[i::args.processes] for i in range(args.processes)]
+    shard_args = [(shard, args.deliveries, args.rate, args.door_seconds) for shard in shards if shard]
+    if len(shard_args) == 1:
+        results = [run_shard(*shard_args[0])]
+    else:
+        with multiprocessing.Pool(len(shard_args)) as pool:
+            results = pool.starmap(run_shard, shard_args)
+
+    latencies = {}
+    for result in results:
+        for action, samples in result['latencies'].items():
+            latencies.setdefault(action, []).extend(samples)
+    sent = sum(r['sent'] for r in results)
+    acked = sum(r['acked'] for r in results)
+    statuses = {}
+    for result in results:
+        for status, count in result['statuses'].items():
+            statuses[status] = statuses.get(status, 0) + count
+    seconds = max(r['seconds'] for r in results)
+
+    print(f"{args.robots} robots x {args.deliveries} deliveries in {len(shard_args)} process(es), "
+          f"{args.rate:g} commands/s per robot, door {args.door_seconds * 1000:.0f} ms")
+    print(f"{'action':>15} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for action, samples in sorted(latencies.items()) + [('all', sum(latencies.values(), []))]:
+        p50, p95, p99 = percentiles(samples)
+        print(f"{action:>15} {p50:8.2f} {p95:8.2f} {p99:8.2f}")
+    print(f"Acked {acked}/{sent} commands {statuses}, {acked / seconds:.0f} acks/s; "
+          f"arrivals {sum(r['arrivals'] for r in results)}, rejected {sum(r['rejected'] for r in results)}")
+    print(f"Memory per robot: {statistics.mean(r['memory_per_robot'] for r in results) / 1024:.0f} KB (tracemalloc)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark animation state switches: full GIF decode vs the frame cache.
+
+Run from the repository root:
+    python3 benchmarks/bench_frame_cache.py [width] [height]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+from PIL import Image, ImageSequence
+from animation_cache import FrameCache
+
+ANIMATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'animations')
+GIF_PATHS = {
+    'idle': os.path.join(ANIMATIONS_DIR, 'idle.gif'),
+    'listening': os.path.join(ANIMATIONS_DIR, 'listening.gif'),
+    'thinking': os.path.join(ANIMATIONS_DIR, 'thinking.gif'),
+    'answering': os.path.join(ANIMATIONS_DIR, 'speaking.gif'),
+    'last': os.path.join(ANIMATIONS_DIR, 'last.gif')
+}
+SWITCHES = 1000
+
+
+def rss_kb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def decode_gif(path, screen_width):
+    """The pre-cache load path: decode and scale every frame on each switch"""
+    frames = []
+    for frame in ImageSequence.Iterator(Image.open(path)):
+        rgb = frame.convert('RGB')
+        size = rgb.size
+        pygame_frame = pygame.image.fromstring(rgb.tobytes(), size, 'RGB')
+        frames.append(pygame.transform.scale(pygame_frame,
+            (screen_width, int(screen_width * size[1] / size[0]))))
+    return frames
+
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 800
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 480
+    pygame.init()
+    pygame.display.set_mode((width, height))
+    cache_dir = tempfile.mkdtemp(prefix='frame_cache_')
+
+    try:
+        print(f"Resolution {width}x{height}")
+        print(f"{'state':<10} {'decode ms':>10} {'build ms':>10} {'mmap ms':>10}")
+        baseline_rss = rss_kb()
+        for state, path in GIF_PATHS.items():
+            start = time.perf_counter()
+            decode_gif(path, width)
+            decode_ms = (time.perf_counter() - start) * 1000
+
+            cache = FrameCache({state: path}, (width, height), cache_dir)
+            start = time.perf_counter()
+            cache.load(state)
+            build_ms = (time.perf_counter() - start) * 1000
+
+            cache = FrameCache({state: path}, (width, height), cache_dir)
+            start = time.perf_counter()
+            cache.load(state)
+            mmap_ms = (time.perf_counter() - start) * 1000
+            print(f"{state:<10} {decode_ms:>10.1f} {build_ms:>10.1f} {mmap_ms:>10.2f}")
+
+        cache = FrameCache(GIF_PATHS, (width, height), cache_dir)
+        cache.load_all()
+        loaded_rss = rss_kb()
+        states = list(GIF_PATHS)
+        start = time.perf_counter()
+        for i in range(SWITCHES):
+            frames, durations = cache.get(states[i % len(states)])
+        switch_us = (time.perf_counter() - start) / SWITCHES * 1e6
+
+        # Blit every frame once, as the render loop eventually does
+        screen = pygame.display.get_surface()
+        for state in states:
+            for frame in cache.get(state)[0]:
+                screen.blit(frame, (0, 0))
+        print(f"Cached switch latency: {switch_us:.2f} us")
+        print(f"RSS after loading: +{loaded_rss - baseline_rss} kB, after drawing all frames: +{rss_kb() - baseline_rss} kB")
+        disk_kb = sum(os.path.getsize(os.path.join(cache_dir, name)) for name in os.listdir(cache_dir)) // 1024
+        print(f"Cache on disk: {disk_kb} kB")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
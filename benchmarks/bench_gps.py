@@ -0,0 +1,162 @@
+"""Replay NMEA logs through the GPS pipeline: sentences per second and CPU per fix.
+
+Without arguments a log is generated: a 10 Hz receiver (GGA + RMC + GSA each
+epoch) on a robot driving a loop and then parked, with ~2 m of position jitter
+and the odd corrupted sentence. Pass recorded .nmea files to replay those
+instead. The bytes are fed in small chunks, as a serial port delivers them.
+For generated logs the raw and filtered error against the true track is shown.
+
+Run from the repository root:
+    python3 benchmarks/bench_gps.py [log.nmea ...]
+"""
+import os
+import sys
+import math
+import time
+import random
+from functools import reduce
+from operator import xor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from robot_gps import NmeaParser, GpsReader, METERS_PER_DEGREE, KNOTS_TO_MPS
+
+RATE_HZ = 10
+CHUNK = 64
+ORIGIN = (12.9716, 77.5946)
+
+
+def sentence(body):
+    return f"${body}*{reduce(xor, body.encode(), 0):02X}\r\n".encode()
+
+
+def nmea_coordinate(value, positive, negative, width):
+    hemisphere = positive if value >= 0 else negative
+    value = abs(value)
+    degrees = int(value)
+    return f"{degrees:0{width}d}{(value - degrees) * 60:07.4f},{hemisphere}"
+
+
+def generate(minutes=30, jitter_m=2.0, seed=3):
+    """(log bytes, true (east, north) per epoch)"""
+    rng = random.Random(seed)
+    lat0, lon0 = ORIGIN
+    cos_lat0 = math.cos(math.radians(lat0))
+    epochs = int(minutes * 60 * RATE_HZ)
+    out = bytearray()
+    truth = np.zeros((epochs, 2))
+    east = north = 0.0
+    for i in range(epochs):
+        t = 9 * 3600 + i / RATE_HZ
+        moving = i < epochs // 2
+        heading = (i / RATE_HZ * 2) % 360
+        speed = 1.2 if moving else 0.0
+        if moving:
+            east += speed / RATE_HZ * math.sin(math.radians(heading))
+            north += speed / RATE_HZ * math.cos(math.radians(heading))
+        truth[i] = east, north
+        hdop = round(rng.uniform(0.7, 1.2), 1)
+        lat = lat0 + (north + rng.gauss(0, jitter_m)) / METERS_PER_DEGREE
+        lon = lon0 + (east + rng.gauss(0, jitter_m)) / (METERS_PER_DEGREE * cos_lat0)
+        hh, mm, ss = int(t // 3600), int(t // 60) % 60, t % 60
+        stamp = f"{hh:02d}{mm:02d}{ss:05.2f}"
+        latitude = nmea_coordinate(lat, "N", "S", 2)
+        longitude = nmea_coordinate(lon, "E", "W", 3)
+        out += sentence(f"GPRMC,{stamp},A,{latitude},{longitude},{speed / KNOTS_TO_MPS:.2f},{heading:.1f},181026,,,A")
+        gga = sentence(f"GPGGA,{stamp},{latitude},{longitude},1,09,{hdop},920.0,M,-86.0,M,,")
+        if rng.random() < 0.002:
+            gga = gga[:20] + b"9" + gga[21:]  # line noise
+        out += gga
+        out += sentence("GPGSA,A,3,04,05,09,12,24,25,29,31,,,,,1.8,1.0,1.5")
+    return bytes(out), truth
+
+
+class NaiveParser:
+    """What the pipeline replaced: decode each line and split str fields"""
+
+    def __init__(self):
+        self.pending = ""
+        self.fixes = 0
+
+    def feed(self, data):
+        lines = (self.pending + data.decode("ascii", "replace")).split("\n")
+        self.pending = lines.pop()
+        for line in lines:
+            line = line.strip()
+            if not line.startswith("$") or "*" not in line:
+                continue
+            body, checksum = line[1:].split("*")
+            if reduce(xor, (ord(c) for c in body), 0) != int(checksum, 16):
+                continue
+            fields = body.split(",")
+            if fields[0][2:] == "GGA" and fields[6] != "0":
+                lat = float(fields[2][:2]) + float(fields[2][2:]) / 60
+                lon = float(fields[4][:3]) + float(fields[4][3:]) / 60
+                self.fixes += 1
+
+
+def replay(log, feed):
+    chunks = [log[i:i + CHUNK] for i in range(0, len(log), CHUNK)]
+    wall, cpu = time.perf_counter(), time.process_time()
+    for chunk in chunks:
+        feed(chunk)
+    return time.perf_counter() - wall, time.process_time() - cpu
+
+
+def rms(errors):
+    return float(np.sqrt(np.mean(np.sum(errors ** 2, axis=1))))
+
+
+def run(name, log, truth=None):
+    sentences = log.count(b"\n")
+    naive = NaiveParser()
+    naive_wall, naive_cpu = replay(log, naive.feed)
+    parser = NmeaParser()
+    parse_wall, parse_cpu = replay(log, parser.feed)
+    reader = GpsReader(None, buffer_size=max(len(truth) if truth is not None else 0, 1024))
+    fixes = []
+    reader.on_position = fixes.append
+    pipeline_wall, pipeline_cpu = replay(log, reader.process)
+
+    print(f"{name}: {len(log) / 1024:.0f} KB, {sentences} sentences, {len(fixes)} fixes, "
+          f"{parser.bad_checksums} bad checksums")
+    print(f"  naive str parser      {sentences / naive_wall:10,.0f} sentences/s  {naive_cpu / sentences * 1e6:6.2f} us CPU each")
+    print(f"  NmeaParser            {sentences / parse_wall:10,.0f} sentences/s  {parse_cpu / sentences * 1e6:6.2f} us CPU each")
+    print(f"  parse+filter+buffer   {sentences / pipeline_wall:10,.0f} sentences/s  {pipeline_cpu / len(fixes) * 1e6:6.2f} us CPU per fix")
+    print(f"  CPU at {RATE_HZ} Hz          {pipeline_cpu / len(fixes) * RATE_HZ * 100:10.4f} % of one core")
+
+    start = time.perf_counter()
+    for _ in range(100000):
+        reader.latest
+    print(f"  latest lookup         {(time.perf_counter() - start) / 100000 * 1e9:10.0f} ns")
+
+    if truth is not None:
+        # Fixes lost to corrupted sentences are skipped by matching on timestamps
+        recent = reader.fixes.recent()
+        epochs = np.round((recent['time'] - recent['time'][0]) * RATE_HZ).astype(int)
+        # The reader's local frame starts at its first (noisy) fix, the truth's at ORIGIN
+        lat0, lon0, cos_lat0 = reader.origin
+        offset = np.array([(lon0 - ORIGIN[1]) * METERS_PER_DEGREE * cos_lat0, (lat0 - ORIGIN[0]) * METERS_PER_DEGREE])
+        true = truth[epochs] - offset
+        raw = np.column_stack([recent['east'], recent['north']])
+        filtered = np.column_stack([recent['filtered_east'], recent['filtered_north']])
+        moving = epochs < len(truth) // 2
+        for label, mask in (("driving", moving), ("parked", ~moving)):
+            print(f"  {label:>8} error       raw {rms(raw[mask] - true[mask]):5.2f} m RMS, "
+                  f"filtered {rms(filtered[mask] - true[mask]):5.2f} m RMS")
+
+
+def main():
+    if len(sys.argv) > 1:
+        for path in sys.argv[1:]:
+            with open(path, "rb") as f:
+                run(path, f.read())
+    else:
+        log, truth = generate()
+        run("generated 30 min log", log, truth)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Time from set_otp to a visible OTP keypad.
+
+Compares showing the pre-built keypad through the command queue with building a
+new Tk root and its widgets for every OTP, as create_otp_window used to. Needs
+a display (run on the robot, or under xvfb-run).
+
+Run from the repository root:
+    python3 benchmarks/bench_keypad.py [shows]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from robot_otp import OTPVerifier
+
+
+def rebuild_each_time(verifier, shows):
+    """Build, show and tear down a whole keypad per OTP"""
+    latencies = []
+    for _ in range(shows):
+        start = time.monotonic()
+        verifier.build_keypad()
+        verifier.otp_window.deiconify()
+        verifier.otp_window.wait_visibility()
+        latencies.append(time.monotonic() - start)
+        verifier.otp_window.destroy()
+    return latencies
+
+
+def drive(verifier, shows):
+    """From a worker thread, like the MQTT dispatcher: set an OTP, wait for it to show, hide"""
+    for i in range(shows):
+        count = len(verifier.show_latencies)
+        verifier.set_otp(f"{i:04d}", f"delivery-{i}", compartment=1)
+        while len(verifier.show_latencies) == count:
+            time.sleep(0.001)
+        verifier.registry.release(f"delivery-{i}")
+        verifier.hide_keypad()
+        time.sleep(0.05)
+    verifier.otp_window.after(0, verifier.otp_window.destroy)
+
+
+def main():
+    shows = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    workdir = tempfile.mkdtemp(prefix="bench_keypad_")
+    try:
+        verifier = OTPVerifier("http://127.0.0.1:9/api/owner/deliveries", os.path.join(workdir, "outbox"))
+        verifier.outbox.stop()
+        # No server, skip the ownerId lookups
+        verifier.prefetch_owner_id = lambda delivery_id: None
+        if not verifier.build_keypad():
+            sys.exit("A display is needed, try: xvfb-run python3 benchmarks/bench_keypad.py")
+        threading.Thread(target=drive, args=(verifier, shows), daemon=True).start()
+        verifier.run_keypad()
+        prebuilt = verifier.show_latencies
+
+        rebuilt = rebuild_each_time(verifier, shows)
+        print(f"set_otp to visible keypad over {shows} shows (median / max ms)")
+        print(f"  pre-built keypad:  {statistics.median(prebuilt) * 1000:7.1f} / {max(prebuilt) * 1000:7.1f}")
+        print(f"  rebuilt per OTP:   {statistics.median(rebuilt) * 1000:7.1f} / {max(rebuilt) * 1000:7.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
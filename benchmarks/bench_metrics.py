@@ -0,0 +1,79 @@
+"""Overhead of the metrics layer on a hot path, enabled and with METRICS=0.
+
+Times an empty function bare, decorated with metrics.timed, and wrapped in a
+histogram's time() block, then the cost of rendering the Prometheus page and
+fetching it from the local endpoint. The disabled run is a child process,
+since METRICS is read at import.
+
+Run from the repository root:
+    python3 benchmarks/bench_metrics.py [calls]
+"""
+import os
+import sys
+import time
+import subprocess
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+
+
+def per_call(func, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def overheads(calls):
+    def work():
+        pass
+
+    decorated = metrics.timed("bench_decorated_seconds", "Decorated no-op")(work)
+    histogram = metrics.histogram("bench_block_seconds", "No-op in a time() block")
+
+    def block():
+        with histogram.time():
+            pass
+
+    bare = per_call(work, calls)
+    return bare, per_call(decorated, calls) - bare, per_call(block, calls) - bare
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    if os.environ.get("BENCH_METRICS_CHILD"):
+        print(*overheads(calls))
+        return
+
+    bare, decorated, block = overheads(calls)
+    env = dict(os.environ, METRICS="0", BENCH_METRICS_CHILD="1")
+    output = subprocess.run([sys.executable, __file__, str(calls)], env=env, capture_output=True, text=True, check=True)
+    _, decorated_off, block_off = map(float, output.stdout.split())
+
+    print(f"{calls} calls of a no-op (bare call {bare:.0f} ns)")
+    print(f"  {'added per call':>22} {'enabled':>9} {'METRICS=0':>10}")
+    print(f"  {'@metrics.timed':>22} {decorated:7.0f} ns {decorated_off:8.0f} ns")
+    print(f"  {'with histogram.time()':>22} {block:7.0f} ns {block_off:8.0f} ns")
+
+    # A page about the size of all three processes' metrics
+    for stage in range(40):
+        histogram = metrics.histogram("bench_stage_seconds", "Stage", stage=f"s{stage}")
+        for i in range(100):
+            histogram.observe(i / 1000)
+    start = time.perf_counter()
+    page = metrics.render()
+    render_ms = (time.perf_counter() - start) * 1000
+    server = metrics.serve(0)
+    url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+    start = time.perf_counter()
+    with urllib.request.urlopen(url) as response:
+        fetched = response.read()
+    fetch_ms = (time.perf_counter() - start) * 1000
+    server.shutdown()
+    print(f"  render {len(page.splitlines())} lines: {render_ms:.2f} ms; GET /metrics {len(fetched)} bytes: {fetch_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Planning and replanning time of the Navigator on large grids, against a simulated site.
+
+The robot starts with a map of the site's walls only. Boxes the map does not
+know about are found by a simulated 180-beam lidar as the robot drives, and
+each discovery is repaired with D* Lite. Every repair is compared with running
+A* from scratch at the same moment. No motors: the simulated robot jumps cell
+by cell along its route.
+
+Run from the repository root:
+    python3 benchmarks/bench_navigation.py [grid cells per side ...]
+"""
+import os
+import sys
+import time
+import random
+import statistics
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from robot_navigation import OccupancyGrid, Navigator, DStarLite, astar
+
+RESOLUTION = 0.25
+BEAMS = 180
+MAX_RANGE = 6.0
+
+
+def build_site(cells, seed=11):
+    """(known map, ground truth): corridor walls with doorways, plus boxes only the truth has"""
+    rng = random.Random(seed)
+    size = cells * RESOLUTION
+    known = OccupancyGrid(size, size, RESOLUTION)
+    truth = OccupancyGrid(size, size, RESOLUTION)
+    for i in range(1, 4):
+        wall = size * i / 4
+        gap = rng.uniform(0.2, 0.8) * size
+        for grid in (known, truth):
+            grid.set_obstacle(wall, 0, wall + 0.3, gap - 1.5)
+            grid.set_obstacle(wall, gap + 1.5, wall + 0.3, size)
+    for _ in range(int(cells * cells / 4000)):
+        x, y = rng.uniform(3, size - 3), rng.uniform(3, size - 3)
+        truth.set_obstacle(x, y, x + rng.uniform(0.5, 2), y + rng.uniform(0.5, 2))
+    return known, truth
+
+
+def lidar(truth):
+    occupied = truth.log_odds > 0
+    angles = np.linspace(-np.pi / 2, np.pi / 2, BEAMS)
+    distances = np.arange(0, MAX_RANGE, RESOLUTION / 2)
+
+    def sense(pose):
+        x, y, heading = pose
+        cols = ((x + np.cos(angles + heading)[:, None] * distances) / RESOLUTION).astype(int)
+        rows = ((y + np.sin(angles + heading)[:, None] * distances) / RESOLUTION).astype(int)
+        np.clip(cols, 0, truth.width - 1, out=cols)
+        np.clip(rows, 0, truth.height - 1, out=rows)
+        hits = occupied[rows, cols]
+        first = np.where(hits.any(axis=1), hits.argmax(axis=1), len(distances))
+        ranges = np.where(first < len(distances), distances[np.minimum(first, len(distances) - 1)], MAX_RANGE)
+        return angles, ranges, MAX_RANGE
+    return sense
+
+
+def run(cells):
+    known, truth = build_site(cells)
+    size = cells * RESOLUTION
+    waypoints = {'base': (1.5, 1.5), 'lobby': (size - 1.5, size - 1.5)}
+    repairs, scratch, initial = [], [], []
+    seen = set()
+    compute = DStarLite.compute
+
+    def timed_compute(planner):
+        start = time.perf_counter()
+        compute(planner)
+        elapsed = time.perf_counter() - start
+        if id(planner) not in seen:
+            seen.add(id(planner))
+            initial.append(elapsed)
+            return
+        repairs.append(elapsed)
+        start = time.perf_counter()
+        astar(planner.graph, planner.start, planner.goal)
+        scratch.append(time.perf_counter() - start)
+
+    DStarLite.compute = timed_compute
+    scan_seconds = []
+    sense = lidar(truth)
+
+    def timed_sense(pose):
+        start = time.perf_counter()
+        scan = sense(pose)
+        scan_seconds.append(time.perf_counter() - start)
+        return scan
+
+    navigator = Navigator(known, waypoints, pose=waypoints['base'] + (0.0,), sense=timed_sense)
+    try:
+        start = time.perf_counter()
+        path = navigator.navigate_to('lobby')
+        # Not counting the A* runs done here for comparison
+        trip = time.perf_counter() - start - sum(scratch)
+        first_plan = navigator.plan_seconds
+        # Back and forth over the now mapped site: the lobby route driven above is cached
+        navigator.sense = None
+        navigator.navigate_to('base')
+        start = time.perf_counter()
+        navigator.navigate_to('lobby')
+        cached_trip = time.perf_counter() - start
+    finally:
+        DStarLite.compute = compute
+
+    print(f"{cells}x{cells} grid ({size:.0f} m), route {len(path)} cells, {navigator.replans} replans")
+    print(f"  initial A* plan            {first_plan * 1000:9.1f} ms")
+    if initial:
+        print(f"  first D* Lite search       {statistics.mean(initial) * 1000:9.1f} ms mean")
+    if repairs:
+        print(f"  D* Lite repair             {statistics.median(repairs) * 1000:9.1f} ms median, "
+              f"{max(repairs) * 1000:.1f} max")
+        print(f"  A* from scratch instead    {statistics.median(scratch) * 1000:9.1f} ms median, "
+              f"{max(scratch) * 1000:.1f} max")
+    print(f"  lidar sim per step         {statistics.mean(scan_seconds) * 1000:9.2f} ms")
+    print(f"  whole trip                 {trip:9.2f} s")
+    print(f"  cached route trip          {cached_trip * 1000:9.1f} ms ({navigator.routes.hits} cache hits)")
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [200, 400, 800]
+    for cells in sizes:
+        run(cells)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Drive ConversationOrchestrator end to end with fake recognizer, LLM and TTS backends.
+
+Plays audio into a real-time null sink and reports per-turn latency, plus one
+scripted barge-in where the user talks over the answer.
+
+Run from the repository root:
+    python3 benchmarks/bench_orchestrator.py [turns]
+"""
+import os
+import sys
+import asyncio
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from audio_player import AudioPlayer, NullOutput
+from speech_orchestrator import ConversationOrchestrator
+from fakes import LatencyModel, FakeCapture, FakeRecognizer, FakeLLM, FakeTTS
+
+
+async def wait_until(condition):
+    while not condition():
+        await asyncio.sleep(0.01)
+
+
+def run(turns):
+    questions = [f"where is the lift {i}" for i in range(turns)] + ["bye"]
+    # This question is asked 1 s into the previous answer, interrupting it
+    barge_in_index = turns // 2
+
+    states = []
+    recognizer = FakeRecognizer(LatencyModel(0.3, 0.6, seed=1))
+    llm = FakeLLM(LatencyModel(0.4, 0.9, seed=2), LatencyModel(0.02, 0.05, seed=3))
+    tts = FakeTTS(LatencyModel(0.15, 0.3, seed=4))
+    output = NullOutput(realtime=True)
+    player = AudioPlayer(output)
+    capture = FakeCapture([])
+    orchestrator = ConversationOrchestrator(capture, recognizer.recognize, llm.answer, tts.synthesize,
+                                            player, set_state=states.append)
+
+    async def main():
+        task = asyncio.create_task(orchestrator.run())
+        for i, text in enumerate(questions):
+            if i == barge_in_index:
+                await wait_until(lambda: orchestrator.speaking)
+                await asyncio.sleep(1.0)
+            else:
+                # Wait for the robot to go back to listening before the next question
+                await wait_until(lambda: states[-1:] == ['listening'] and orchestrator.turn_task is None)
+            capture.on_speech_start()
+            await asyncio.sleep(0.5)
+            capture.utterances.put(text)
+            await wait_until(lambda: states[-1:] != ['listening'])
+        await task
+
+    asyncio.run(main())
+    player.close()
+    return orchestrator, output
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    orchestrator, output = run(turns)
+
+    print(f"{'turn':>4} {'first token s':>14} {'first audio s':>14} {'total s':>8} {'interrupted':>12}")
+    for i, metrics in enumerate(orchestrator.turns):
+        print(f"{i:>4} {metrics.elapsed(metrics.first_token) or 0:>14.2f} "
+              f"{metrics.elapsed(metrics.first_audio) or 0:>14.2f} {metrics.elapsed(metrics.end):>8.2f} "
+              f"{str(metrics.interrupted):>12}")
+
+    complete = [m for m in orchestrator.turns if not m.interrupted and m.first_audio]
+    first_audio = [m.elapsed(m.first_audio) for m in complete]
+    print(f"Median time to first audio: {statistics.median(first_audio):.2f}s over {len(complete)} turns")
+    print(f"Barge-ins: {orchestrator.barge_ins}, audio played: {output.bytes_written / 32000:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""OTP verification callbacks against a local stub delivery server.
+
+Compares the time the keypad's button handler is blocked by the old inline
+GET + POST with queueing the verification in the outbox, then checks that
+verifications survive server errors and a robot restart while the server is down.
+
+Run from the repository root:
+    python3 benchmarks/bench_otp_outbox.py [verifications] [server latency ms]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import statistics
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from robot_otp import OTPVerifier
+from stub_delivery_server import StubDeliveryServer
+
+
+def inline_notify(server_url, delivery_id, otp):
+    """What the keypad handler used to do: two fresh connections, no timeout"""
+    response = requests.get(f"{server_url}/{delivery_id}")
+    owner_id = response.json().get("ownerId")
+    requests.post(f"{server_url}/{delivery_id}/verify-otp", json={"otp": otp, "ownerId": owner_id})
+
+
+def verify(verifier, delivery_id, otp):
+    start = time.perf_counter()
+    verifier.notify_server_otp_verified(delivery_id, otp)
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+    workdir = tempfile.mkdtemp(prefix="bench_outbox_")
+    server = StubDeliveryServer(latency=latency).start()
+    try:
+        inline = []
+        for i in range(count):
+            start = time.perf_counter()
+            inline_notify(server.url, f"inline-{i}", "1234")
+            inline.append(time.perf_counter() - start)
+        inline_connections = server.connections
+
+        verifier = OTPVerifier(server.url, os.path.join(workdir, "outbox"))
+        for i in range(count):
+            verifier.prefetch_owner_id(f"d-{i}")
+        server.connections = 0
+        queued = [verify(verifier, f"d-{i}", "1234") for i in range(count)]
+        start = time.perf_counter()
+        verifier.outbox.wait_empty(60)
+        drain = time.perf_counter() - start
+        print(f"Keypad handler blocked (median): inline {statistics.median(inline) * 1000:.1f} ms, "
+              f"outbox {statistics.median(queued) * 1000:.2f} ms")
+        print(f"Connections for {count} verifications: inline {inline_connections}, "
+              f"outbox {server.connections}; outbox drained in {drain:.2f}s")
+
+        server.fail_next = 5
+        verifier.outbox.backoff = 0.05
+        verify(verifier, "flaky", "1234")
+        verifier.outbox.wait_empty(30)
+        print(f"After 5 server errors: {verifier.outbox.stats()}")
+        verifier.outbox.stop()
+
+        # Robot restarts while the server is unreachable; the event waits on disk
+        offline = OTPVerifier("http://127.0.0.1:9/api/owner/deliveries", os.path.join(workdir, "outbox2"))
+        offline.outbox.stop()
+        verify(offline, "offline", "1234")
+        restarted = OTPVerifier(server.url, os.path.join(workdir, "outbox2"))
+        restarted.outbox.wait_empty(30)
+        delivered = [delivery_id for delivery_id, _ in server.verified]
+        print(f"Delivered after restart: {'offline' in delivered}; "
+              f"total verified {len(delivered)} of {2 * count + 2}")
+        restarted.outbox.stop()
+    finally:
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
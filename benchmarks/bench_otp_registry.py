@@ -0,0 +1,77 @@
+"""OTPRegistry with hundreds of deliveries on board, as on a hub robot.
+
+Times register, verify by entered code and expiry, and compares lookup with
+scanning every delivery's code the way a list of current_otp values would.
+
+Run from the repository root:
+    python3 benchmarks/bench_otp_registry.py [deliveries]
+"""
+import os
+import sys
+import time
+import random
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from robot_otp_registry import OTPRegistry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return (statistics.median(samples) * 1e6, samples[int(len(samples) * 0.99)] * 1e6)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rng = random.Random(7)
+    # 6 digit codes, unique per load so every code identifies one delivery
+    codes = [f"{code:06d}" for code in rng.sample(range(1000000), count)]
+    deliveries = [(f"delivery-{i}", code) for i, code in enumerate(codes)]
+
+    clock = FakeClock()
+    registry = OTPRegistry(compartments=count, ttl=600, max_attempts=5, clock=clock)
+    register = [timed(registry.register, delivery_id, code)[0] for delivery_id, code in deliveries]
+
+    order = list(deliveries)
+    rng.shuffle(order)
+    verify = []
+    for delivery_id, code in order[:count // 2]:
+        seconds, delivery = timed(registry.verify, code)
+        assert delivery and delivery.delivery_id == delivery_id
+        verify.append(seconds)
+
+    # The same lookup done by scanning every active delivery's code
+    active = order[count // 2:]
+    scan = [timed(lambda code: next((d for d, c in active if c == code), None), code)[0] for _, code in active]
+
+    wrong = [timed(registry.verify, "000000x", delivery_id)[0] for delivery_id, _ in active[:50]]
+
+    clock.now += 601
+    expire_seconds, _ = timed(registry.compartment_for, "none")
+
+    print(f"{count} deliveries, timings in microseconds (median / p99)")
+    print(f"  register        {percentiles(register)[0]:8.1f} / {percentiles(register)[1]:8.1f}")
+    print(f"  verify by code  {percentiles(verify)[0]:8.1f} / {percentiles(verify)[1]:8.1f}")
+    print(f"  wrong code      {percentiles(wrong)[0]:8.1f} / {percentiles(wrong)[1]:8.1f}")
+    print(f"  linear scan     {percentiles(scan)[0]:8.1f} / {percentiles(scan)[1]:8.1f}")
+    print(f"  expire {len(active)} at once: {expire_seconds * 1000:.2f} ms, "
+          f"{len(registry.delivery_ids())} codes valid, {len(registry)} compartments still reserved")
+
+
+if __name__ == "__main__":
+    main()
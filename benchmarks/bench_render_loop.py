@@ -0,0 +1,102 @@
+"""Headless benchmark of the animation render loop using SDL's dummy video driver.
+
+Reports CPU time per wall-clock second, presented frames per second and frame
+timing drift for each animation state, against the old fixed 60 fps loop.
+
+Run from the repository root:
+    python3 benchmarks/bench_render_loop.py [seconds_per_state]
+"""
+import os
+import sys
+import time
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+os.environ.setdefault("ANIMATIONS_DIR", os.path.join(ROOT, "animations"))
+os.environ["ANIMATION_SOCKET"] = os.path.join(tempfile.gettempdir(), f"bench_animation_{os.getpid()}.sock")
+sys.path.insert(0, ROOT)
+
+import pygame
+from animation_handler import AnimationHandler
+
+SCREEN_SIZE = (800, 480)
+
+
+def run_scheduler(handler, state, seconds):
+    handler.set_state(state)
+    handler.presented_frames = 0
+    handler.frame_advances = 0
+    handler.drift_total = 0.0
+    handler.drift_max = 0.0
+
+    cpu_start = time.process_time()
+    wall_start = time.monotonic()
+    while time.monotonic() - wall_start < seconds:
+        handler.step()
+    wall = time.monotonic() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    mean_drift = handler.drift_total / handler.frame_advances if handler.frame_advances else 0.0
+    return cpu / wall, handler.presented_frames / wall, mean_drift, handler.drift_max
+
+
+def run_legacy(handler, state, seconds):
+    """The previous loop: recompute intervals and offsets, full redraw, tick-counted at 60 fps"""
+    frames, durations = handler.frame_cache.get(state)
+    clock = pygame.time.Clock()
+    frame_index = 0
+    frame_count = 0
+    presented = 0
+    # Ideal time each frame should start, to compare against tick counting
+    expected_at = time.monotonic()
+    drift_total = 0.0
+    drift_max = 0.0
+    advances = 0
+
+    cpu_start = time.process_time()
+    wall_start = time.monotonic()
+    while time.monotonic() - wall_start < seconds:
+        pygame.event.get()
+        frame_intervals = [max(1, int(d / (1000 / 60))) for d in durations]
+        x_pos = (handler.SCREEN_WIDTH - frames[0].get_width()) // 2
+        y_pos = (handler.SCREEN_HEIGHT - frames[0].get_height()) // 2
+        handler.screen.fill((0, 0, 0))
+        handler.screen.blit(frames[frame_index], (x_pos, y_pos))
+        pygame.display.flip()
+        presented += 1
+
+        frame_count += 1
+        if frame_count >= frame_intervals[frame_index]:
+            expected_at += durations[frame_index] / 1000
+            frame_index = (frame_index + 1) % len(frames)
+            frame_count = 0
+            drift = abs(time.monotonic() - expected_at)
+            drift_total += drift
+            drift_max = max(drift_max, drift)
+            advances += 1
+        clock.tick(60)
+    wall = time.monotonic() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    mean_drift = drift_total / advances if advances else 0.0
+    return cpu / wall, presented / wall, mean_drift, drift_max
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    handler = AnimationHandler(screen_size=SCREEN_SIZE)
+    try:
+        print(f"{'state':<10} {'loop':<10} {'cpu s/s':>8} {'fps':>7} {'drift ms':>9} {'max ms':>8}")
+        for state in handler.GIF_PATHS:
+            for name, loop in (('legacy', run_legacy), ('scheduler', run_scheduler)):
+                cpu, fps, drift, drift_max = loop(handler, state, seconds)
+                print(f"{state:<10} {name:<10} {cpu:>8.3f} {fps:>7.1f} {drift * 1000:>9.2f} {drift_max * 1000:>8.2f}")
+    finally:
+        handler.channel.close()
+        pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
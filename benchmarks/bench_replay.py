@@ -0,0 +1,475 @@
+"""Replay recorded utterances through speech_handler's conversation loop.
+
+Each turn feeds one WAV file into a real MicrophoneCapture (VAD and
+segmentation included). By default the turns run through a
+ConversationOrchestrator wired the way speech_handler.main() wires it, and the
+next utterance is spoken whenever it goes back to listening. --mode sequential
+runs speech_handler's listen(), process_query() and speak() one after another
+instead. Google speech recognition, Groq and Polly are replaced by the local
+fakes in fakes.py, with log-normal latencies set on the command line. Audio
+goes to a null output. Everything runs in a scratch directory, so the robot's
+chat logs and caches are not touched.
+
+The corpus is a directory of 16-bit mono WAV files, each with a .txt
+transcript next to it. Without --corpus, a synthetic one is generated. It
+holds the FAQ questions, paraphrases of them and off-FAQ questions, spoken as
+tone bursts the length of the text.
+
+Reported per stage and end to end (from the utterance being spoken to the
+robot listening again): p50/p95/p99, memory (RSS) growth over the
+run, and read/write syscalls and bytes per turn (/proc/self/io, which also
+counts speech_handler's console prints). The results
+are written as JSON to compare branches:
+    python3 benchmarks/bench_replay.py --turns 2000 --latency-scale 0 --output main.json
+    python3 benchmarks/bench_replay.py --turns 2000 --latency-scale 0 --compare main.json
+
+Run from the repository root:
+    python3 benchmarks/bench_replay.py [--mode orchestrator|sequential] [--corpus DIR] [--turns N]
+                                       [--latency-scale X] [--output PATH]
+"""
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import wave
+import queue
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import statistics
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import (LatencyModel, FakeLLM, FakeTTS, FakeGoogleRecognizer, FakeGroqClient, FakePollyClient,
+                   SAMPLE_RATE, SAMPLE_WIDTH)
+
+OFF_FAQ = [
+    "where is the nearest lift",
+    "what floor is the cafeteria on",
+    "is there parking for visitors",
+    "what time does the building close",
+    "can you tell me a joke",
+    "how far is the metro station",
+]
+SECONDS_PER_CHAR = 0.06
+
+
+def synthesize_corpus(directory, questions):
+    """Tone-burst WAVs the length of each question, with .txt transcripts"""
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(7)
+    for i, text in enumerate(questions):
+        seconds = max(0.6, len(text) * SECONDS_PER_CHAR)
+        t = [n / SAMPLE_RATE for n in range(int(seconds * SAMPLE_RATE))]
+        pitch = rng.uniform(110, 220)
+        samples = bytearray()
+        for x in t:
+            envelope = min(1.0, x / 0.05, (seconds - x) / 0.05)
+            value = 4000 * envelope * (math.sin(2 * math.pi * pitch * x) + 0.5 * math.sin(4 * math.pi * pitch * x))
+            samples += int(value + rng.gauss(0, 40)).to_bytes(2, "little", signed=True)
+        lead_in = b"".join(int(rng.gauss(0, 40)).to_bytes(2, "little", signed=True) for _ in range(SAMPLE_RATE // 4))
+        path = os.path.join(directory, f"utterance_{i:03d}")
+        with wave.open(path + ".wav", "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(SAMPLE_WIDTH)
+            f.setframerate(SAMPLE_RATE)
+            f.writeframes(lead_in + bytes(samples))
+        with open(path + ".txt", "w") as f:
+            f.write(text)
+
+
+def load_corpus(directory):
+    """[(transcript, pcm bytes, sample rate)] read up front, so turns do no corpus I/O"""
+    corpus = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".wav"):
+            continue
+        path = os.path.join(directory, name)
+        transcript_path = path[:-4] + ".txt"
+        transcript = open(transcript_path).read().strip() if os.path.exists(transcript_path) else ""
+        with wave.open(path, "rb") as f:
+            if f.getsampwidth() != SAMPLE_WIDTH or f.getnchannels() != 1:
+                raise ValueError(f"{path} must be 16-bit mono")
+            corpus.append((transcript, f.readframes(f.getnframes()), f.getframerate()))
+    if not corpus:
+        raise ValueError(f"No .wav files in {directory}")
+    return corpus
+
+
+class ReplaySource:
+    """Microphone source fed one utterance at a time; silence in between, b'' after close()"""
+
+    def __init__(self, sample_rate, trailing_silence=1.0):
+        self.sample_rate = sample_rate
+        self.trailing = b"\x00" * int(trailing_silence * sample_rate) * SAMPLE_WIDTH
+        self.pending = queue.Queue()
+        self.data = b""
+        self.offset = 0
+
+    def feed(self, pcm):
+        self.pending.put(pcm + self.trailing)
+
+    def read(self, frames):
+        if self.offset >= len(self.data):
+            # Like a quiet room: blocks until the next utterance is spoken
+            self.data = self.pending.get()
+            self.offset = 0
+            if self.data is None:
+                return b""
+        chunk = self.data[self.offset:self.offset + frames * SAMPLE_WIDTH]
+        self.offset += len(chunk)
+        return chunk.ljust(frames * SAMPLE_WIDTH, b"\x00")
+
+    def close(self):
+        self.pending.put(None)
+
+
+class StageTimer:
+    """Raw per-stage samples, so percentiles are exact rather than bucketed"""
+
+    def __init__(self):
+        self.samples = {}
+        self.recording = False
+
+    def add(self, stage, seconds):
+        if self.recording:
+            self.samples.setdefault(stage, []).append(seconds)
+
+    def wrap(self, stage, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return timed
+
+    def wrap_stream(self, stage, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                yield from func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return timed
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
+
+
+def io_counters():
+    try:
+        with open("/proc/self/io") as f:
+            return {key: int(value) for key, value in (line.split(": ") for line in f)}
+    except OSError:
+        return None
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    if len(samples) == 1:
+        cuts = samples * 99
+    else:
+        cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.mean(samples) * 1000,
+        "p50_ms": cuts[49] * 1000,
+        "p95_ms": cuts[94] * 1000,
+        "p99_ms": cuts[98] * 1000,
+        "max_ms": samples[-1] * 1000,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Measurement:
+    """Memory, I/O and wall time from the end of the warm-up turns to the end of the run"""
+
+    def __init__(self, turns, trace=False):
+        self.turns = turns
+        self.trace = trace
+        self.memory = []
+        self.io_start = self.rss_start = self.run_start = None
+        self.snapshot = None
+        if trace:
+            tracemalloc.start()
+
+    def start(self):
+        self.io_start = io_counters()
+        self.rss_start = rss_bytes()
+        self.memory.append((0, self.rss_start))
+        self.snapshot = tracemalloc.take_snapshot() if self.trace else None
+        self.run_start = time.perf_counter()
+
+    def turn_done(self, measured):
+        if measured > 0 and measured % max(1, self.turns // 20) == 0:
+            self.memory.append((measured, rss_bytes()))
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.run_start
+        self.io_end = io_counters()
+        self.rss_end = rss_bytes()
+        self.growth = None
+        if self.trace:
+            diff = tracemalloc.take_snapshot().compare_to(self.snapshot, "filename")
+            self.growth = [{"file": str(stat.traceback), "bytes": stat.size_diff} for stat in diff[:10]]
+            tracemalloc.stop()
+
+
+def replay_sequential(speech_handler, corpus, order, warmup, recognizer, capture, source, timer, measurement):
+    """speech_handler's listen(), process_query() and speak(), one turn after another"""
+    next_pcm = [None]
+    clear = capture.clear
+
+    def clear_and_speak():
+        # listen() drops what was heard before it; the next utterance starts only after that
+        clear()
+        source.feed(next_pcm[0])
+    capture.clear = clear_and_speak
+
+    failures = 0
+    for turn, index in enumerate(order):
+        if turn == warmup:
+            timer.recording = True
+            measurement.start()
+        transcript, pcm, _ = corpus[index]
+        next_pcm[0] = pcm
+        recognizer.transcript = transcript
+
+        turn_start = time.perf_counter()
+        text = timer.wrap("listen", speech_handler.listen)(timeout=30)
+        if text is None:
+            failures += 1
+            continue
+        response = timer.wrap("process_query", speech_handler.process_query)(text)
+        timer.wrap("speak", speech_handler.speak)(response)
+        timer.add("turn", time.perf_counter() - turn_start)
+        measurement.turn_done(turn - warmup + 1)
+    measurement.finish()
+    return failures
+
+
+def replay_orchestrator(speech_handler, corpus, order, warmup, recognizer, capture, source, timer, measurement):
+    """A ConversationOrchestrator built like speech_handler.main(); ends with an exit word"""
+    from speech_orchestrator import ConversationOrchestrator
+
+    fed = []  # time.monotonic() each utterance was spoken, the clock TurnMetrics uses
+    finished = [0]
+
+    def on_state(state):
+        # Runs on the orchestrator's event loop each time it is ready for the next utterance
+        if state != 'listening':
+            return
+        now = time.monotonic()
+        if fed and len(orchestrator.turns) > finished[0]:
+            finished[0] = len(orchestrator.turns)
+            turn = orchestrator.turns[-1]
+            timer.add("capture", turn.start - fed[-1])
+            for stage, mark in (("first_token", turn.first_token), ("first_audio", turn.first_audio)):
+                if mark is not None:
+                    timer.add(stage, turn.elapsed(mark))
+            timer.add("turn", now - fed[-1])
+            measurement.turn_done(len(fed) - warmup)
+        if len(fed) == warmup:
+            timer.recording = True
+            measurement.start()
+        if len(fed) == len(order):
+            timer.recording = False
+            transcript, pcm = "bye", corpus[0][1]
+        else:
+            transcript, pcm, _ = corpus[order[len(fed)]]
+        recognizer.transcript = transcript
+        fed.append(time.monotonic())
+        source.feed(pcm)
+
+    orchestrator = ConversationOrchestrator(
+        capture, speech_handler.recognize, speech_handler.answer_query,
+        timer.wrap("tts", speech_handler.synthesize_stream), speech_handler.player.get(),
+        set_state=on_state, synthesize_fixed=speech_handler.cached_synthesize, barge_in=False)
+    asyncio.run(orchestrator.run())
+    measurement.finish()
+    return len(order) - len(orchestrator.turns)
+
+
+def latency(value, scale, seed):
+    median, p95 = (float(part) for part in value.split(","))
+    return LatencyModel(median * scale, p95 * scale, seed=seed)
+
+
+def run(args, workdir):
+    with open(os.path.join(workdir, ".env"), "w") as f:
+        f.write("AudioOutput=null\nAssistantname=Karna\n")
+    os.chdir(workdir)
+
+    import speech_handler
+    from audio_player import AudioPlayer, NullOutput
+    from mic_capture import MicrophoneCapture
+    from lazy_services import LazyService
+    import metrics
+
+    if args.corpus:
+        corpus_dir = args.corpus
+    else:
+        corpus_dir = os.path.join(workdir, "corpus")
+        questions = list(speech_handler.delivery_queries)
+        questions += [question.rstrip("?") + " please" for question in questions[:8]]
+        synthesize_corpus(corpus_dir, questions + OFF_FAQ)
+    corpus = load_corpus(corpus_dir)
+    sample_rate = corpus[0][2]
+
+    scale = args.latency_scale
+    recognizer = FakeGoogleRecognizer(latency(args.recognize_latency, scale, 1))
+    llm = FakeLLM(latency(args.llm_first_token, scale, 2), latency(args.llm_per_token, scale, 3))
+    tts = FakeTTS(latency(args.tts_latency, scale, 4))
+    source = ReplaySource(sample_rate)
+    capture = MicrophoneCapture(source, calibration_path=None)
+    capture.start()
+
+    speech_handler.recognizer = recognizer
+    speech_handler.groq = LazyService("Groq", lambda: FakeGroqClient(llm))
+    speech_handler.polly = LazyService("AWS Polly", lambda: FakePollyClient(tts))
+    speech_handler.microphone = LazyService("Microphone", lambda: capture)
+    speech_handler.player = LazyService("Audio output", lambda: AudioPlayer(NullOutput(sample_rate, realtime=args.realtime_audio)))
+
+    timer = StageTimer()
+    recognizer.recognize_google = timer.wrap("recognize", recognizer.recognize_google)
+    speech_handler.get_delivery_response = timer.wrap("faq_match", speech_handler.get_delivery_response)
+    cache = speech_handler.response_cache
+    cache.get = timer.wrap("response_cache", cache.get)
+    speech_handler.stream_groq_response = timer.wrap_stream("llm", speech_handler.stream_groq_response)
+    speech_handler.cached_synthesize = timer.wrap("tts", speech_handler.cached_synthesize)
+    player = speech_handler.player.get()
+    player.finish = timer.wrap("playback", player.finish)
+
+    rng = random.Random(args.seed)
+    order = [rng.randrange(len(corpus)) for _ in range(args.turns + args.warmup)]
+    measurement = Measurement(args.turns, args.tracemalloc)
+    replay = replay_orchestrator if args.mode == "orchestrator" else replay_sequential
+    failures = replay(speech_handler, corpus, order, args.warmup, recognizer, capture, source, timer, measurement)
+
+    source.close()
+    capture.stop()
+    for service in (speech_handler.player, speech_handler.chat_store, speech_handler.unanswered_store):
+        if service.ready:
+            service.get().close()
+
+    turns = args.turns
+    stage_order = ["listen", "capture", "recognize", "process_query", "faq_match", "response_cache", "llm",
+                   "first_token", "speak", "tts", "first_audio", "playback", "turn"]
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "corpus": {"directory": args.corpus or "synthetic", "utterances": len(corpus)},
+        "turns": turns,
+        "failed_turns": failures,
+        "turns_per_second": turns / measurement.elapsed,
+        "stages": {stage: percentiles(timer.samples[stage]) for stage in stage_order if stage in timer.samples},
+        "memory": {
+            "rss_start_bytes": measurement.rss_start,
+            "rss_end_bytes": measurement.rss_end,
+            "growth_bytes_per_1000_turns": (measurement.rss_end - measurement.rss_start) / turns * 1000
+            if measurement.rss_start else None,
+            "samples": measurement.memory,
+            "tracemalloc_top_growth": measurement.growth,
+        },
+        "io_per_turn": {key: (measurement.io_end[key] - measurement.io_start[key]) / turns
+                        for key in measurement.io_end} if measurement.io_start else None,
+        "backend_calls": {"recognize": recognizer.calls, "llm": llm.calls, "tts": tts.calls},
+        "metrics": metrics.snapshot(),
+    }
+
+
+def report(result, baseline=None):
+    print(f"{result['turns']} {result['config'].get('mode', 'sequential')} turns at {result['turns_per_second']:.1f} turns/s, "
+          f"latency scale {result['config']['latency_scale']:g}, revision {result['revision']}, "
+          f"{result['failed_turns']} failed")
+    header = f"{'stage':>15} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'count':>6}"
+    if baseline:
+        header += f"   vs {baseline.get('revision')}: {'p50':>8} {'p95':>8}"
+    print(header)
+    for stage, stats in result["stages"].items():
+        line = f"{stage:>15} {stats['p50_ms']:9.2f} {stats['p95_ms']:9.2f} {stats['p99_ms']:9.2f} {stats['count']:6d}"
+        base = (baseline or {}).get("stages", {}).get(stage)
+        if base:
+            line += f"   {' ' * (len(str(baseline.get('revision'))) + 4)}" \
+                    f"{stats['p50_ms'] - base['p50_ms']:+8.2f} {stats['p95_ms'] - base['p95_ms']:+8.2f}"
+        print(line)
+    memory = result["memory"]
+    if memory["growth_bytes_per_1000_turns"] is not None:
+        print(f"RSS {memory['rss_start_bytes'] / 2**20:.1f} -> {memory['rss_end_bytes'] / 2**20:.1f} MB, "
+              f"{memory['growth_bytes_per_1000_turns'] / 1024:+.0f} KB per 1000 turns")
+    for entry in memory["tracemalloc_top_growth"] or []:
+        print(f"  {entry['bytes'] / 1024:+8.1f} KB {entry['file']}")
+    io = result["io_per_turn"]
+    if io:
+        print(f"I/O per turn: {io['syscr']:.1f} reads ({io['rchar'] / 1024:.1f} KB), "
+              f"{io['syscw']:.1f} writes ({io['wchar'] / 1024:.1f} KB), "
+              f"{io['write_bytes'] / 1024:.1f} KB to storage")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=("orchestrator", "sequential"), default="orchestrator",
+                        help="run turns through ConversationOrchestrator, as speech_handler does, "
+                             "or through listen/process_query/speak")
+    parser.add_argument("--corpus", help="directory of .wav utterances with .txt transcripts")
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20, help="turns run before measuring")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="multiplies every fake latency; 0 measures only local work")
+    parser.add_argument("--recognize-latency", default="0.35,0.8", help="median,p95 seconds")
+    parser.add_argument("--llm-first-token", default="0.4,0.9", help="median,p95 seconds")
+    parser.add_argument("--llm-per-token", default="0.015,0.04", help="median,p95 seconds")
+    parser.add_argument("--tts-latency", default="0.15,0.35", help="median,p95 seconds")
+    parser.add_argument("--realtime-audio", action="store_true", help="play audio at real speed")
+    parser.add_argument("--tracemalloc", action="store_true", help="report where memory grew (slow)")
+    parser.add_argument("--output", help="JSON results path (default replay-<revision>.json)")
+    parser.add_argument("--compare", help="JSON results of another run to diff against")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    output = os.path.abspath(args.output or f"replay-{git_revision() or 'local'}.json")
+    if args.corpus:
+        args.corpus = os.path.abspath(args.corpus)
+
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="bench_replay_")
+    try:
+        result = run(args, workdir)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    report(result, baseline)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Import-time and time-to-greeting benchmark for speech_handler.
+
+Runs speech_handler in a scratch directory with a null audio output, so chat logs
+and caches on the robot are not touched. The greeting needs AWS credentials
+unless a warmed speech_cache exists in the current directory (it is linked in).
+
+Run from the directory the robot runs in:
+    python3 benchmarks/bench_startup.py [--runs N] [--max-import-ms MS] [--max-greeting-s S]
+Exits non-zero when a limit is exceeded, so it can gate changes.
+"""
+import os
+import re
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def scratch_dir():
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    env_lines = ["AudioOutput=null"]
+    if os.path.exists(".env"):
+        with open(".env") as f:
+            env_lines += [line.strip() for line in f if line.strip() and not line.startswith("AudioOutput")]
+    with open(os.path.join(workdir, ".env"), "w") as f:
+        f.write("\n".join(env_lines) + "\n")
+    if os.path.isdir("speech_cache"):
+        os.symlink(os.path.abspath("speech_cache"), os.path.join(workdir, "speech_cache"))
+    return workdir
+
+
+def measure_import(workdir):
+    """Return (total ms, [(ms, module)] for speech_handler's direct imports)"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import speech_handler"],
+                            cwd=workdir, env=dict(os.environ, PYTHONPATH=ROOT),
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    total = 0
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        if indent == 1:
+            # Children are logged before their parent, so keep only speech_handler's
+            if name == "speech_handler":
+                total = cumulative
+                break
+            modules = []
+        elif indent == 3:
+            modules.append((cumulative / 1000, name))
+    return total / 1000, sorted(modules, reverse=True)
+
+
+def measure_greeting(workdir):
+    start = time.monotonic()
+    result = subprocess.run([sys.executable, os.path.join(ROOT, "speech_handler.py"), "--greeting-only"],
+                            cwd=workdir, capture_output=True, text=True)
+    wall = time.monotonic() - start
+    if "Greeting complete" not in result.stdout:
+        raise RuntimeError(result.stdout[-2000:] + result.stderr[-2000:])
+    return wall
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--max-import-ms", type=float)
+    parser.add_argument("--max-greeting-s", type=float)
+    parser.add_argument("--skip-greeting", action="store_true")
+    args = parser.parse_args()
+
+    workdir = scratch_dir()
+    failed = False
+    try:
+        imports = [measure_import(workdir) for _ in range(args.runs)]
+        import_ms = statistics.median(total for total, _ in imports)
+        print(f"Import speech_handler: {import_ms:.0f} ms (median of {args.runs})")
+        for ms, name in imports[-1][1][:10]:
+            print(f"  {ms:>8.1f} ms  {name}")
+        if args.max_import_ms and import_ms > args.max_import_ms:
+            print(f"❌ Import time over limit of {args.max_import_ms:.0f} ms")
+            failed = True
+
+        if not args.skip_greeting:
+            greeting_s = statistics.median(measure_greeting(workdir) for _ in range(args.runs))
+            print(f"Process start to greeting finished: {greeting_s:.2f} s (median of {args.runs})")
+            if args.max_greeting_s and greeting_s > args.max_greeting_s:
+                print(f"❌ Time to greeting over limit of {args.max_greeting_s:.2f} s")
+                failed = True
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Bytes and messages per minute of TelemetryPublisher against one JSON publish per sample.
+
+Simulates a robot with a 10 Hz GPS for ten minutes: five minutes driving, five
+parked with GPS jitter, two door openings and a one minute connection drop.
+Bytes are topic plus payload; MQTT framing adds the same few bytes per message
+to both.
+
+Run from the repository root:
+    python3 benchmarks/bench_telemetry.py [minutes]
+"""
+import os
+import sys
+import json
+import math
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from robot_telemetry import TelemetryPublisher, decode
+
+SAMPLE_HZ = 10
+METERS_PER_DEGREE = 111320
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeClient:
+    def __init__(self):
+        self.connected = True
+        self.messages = []
+
+    def is_connected(self):
+        return self.connected
+
+    def publish(self, topic, payload, qos=0):
+        self.messages.append((topic, payload))
+
+
+def samples(minutes, seed=3):
+    """(t, fields) at SAMPLE_HZ: drive for the first half, then park"""
+    rng = random.Random(seed)
+    lat, lon = 12.9716, 77.5946
+    heading = 45.0
+    for i in range(int(minutes * 60 * SAMPLE_HZ)):
+        t = i / SAMPLE_HZ
+        driving = t < minutes * 30
+        speed = 1.5 if driving else 0.0
+        if driving:
+            heading = (heading + rng.gauss(0, 0.5)) % 360
+            lat += speed / SAMPLE_HZ * math.cos(math.radians(heading)) / METERS_PER_DEGREE
+            lon += speed / SAMPLE_HZ * math.sin(math.radians(heading)) / METERS_PER_DEGREE
+        jitter = 0.5 / METERS_PER_DEGREE
+        doors = 1 if minutes * 30 + 10 <= t < minutes * 30 + 40 or minutes * 45 <= t < minutes * 45 + 30 else 0
+        yield t, {
+            'lat': lat + rng.gauss(0, jitter),
+            'lon': lon + rng.gauss(0, jitter),
+            'speed': speed,
+            'heading': heading,
+            'doors': doors
+        }
+
+
+def main():
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    clock = FakeClock()
+    client = FakeClient()
+    publisher = TelemetryPublisher(client, "rob-003", clock=clock)
+    naive_bytes = naive_messages = 0
+    offline = (minutes * 60 * 0.6, minutes * 60 * 0.6 + 60)
+    for t, fields in samples(minutes):
+        clock.now = t
+        client.connected = not offline[0] <= t < offline[1]
+        if client.connected:
+            naive = json.dumps(dict(fields, robotId="rob-003", timestamp=t))
+            naive_bytes += len("robot/rob-003/telemetry") + len(naive)
+            naive_messages += 1
+        # The publisher's tick matches the GPS rate, so flush after every sample
+        publisher.update(**fields)
+        publisher.flush()
+
+    decoded = [decode(payload) for _, payload in client.messages]
+    assert all(values for _, _, values in decoded)
+    stats = publisher.stats()
+    print(f"{minutes:g} simulated minutes at {SAMPLE_HZ} Hz (naive JSON drops samples while offline)")
+    print(f"  naive JSON:  {naive_messages / minutes:8.0f} msgs/min {naive_bytes / minutes / 1024:8.1f} KB/min")
+    print(f"  telemetry:   {stats['messages'] / minutes:8.0f} msgs/min {stats['bytes'] / minutes / 1024:8.1f} KB/min")
+    print(f"  reduction:   {naive_bytes / max(stats['bytes'], 1):.0f}x bytes, "
+          f"{naive_messages / max(stats['messages'], 1):.0f}x messages; "
+          f"{stats['dropped']} dropped and {stats['buffered']} still buffered after the outage")
+
+
+if __name__ == "__main__":
+    main()
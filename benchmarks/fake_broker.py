@@ -0,0 +1,105 @@
+"""In-process stand-in for the MQTT broker and paho's Client, for running robots offline.
+
+FakeClient implements the part of paho.mqtt.client.Client that RobotController
+uses. Like paho, each client delivers on_connect and on_message on its own
+network thread, so a slow callback holds up only that client's messages.
+"""
+import queue
+import threading
+
+from paho.mqtt.client import topic_matches_sub
+
+CONNECT = object()
+
+
+class Message:
+    def __init__(self, topic, payload):
+        self.topic = topic
+        self.payload = payload
+
+
+class FakeBroker:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = []  # (pattern, client)
+        self.messages = 0
+        self.bytes = 0
+
+    def subscribe(self, client, pattern):
+        with self.lock:
+            self.subscriptions.append((pattern, client))
+
+    def unsubscribe_all(self, client):
+        with self.lock:
+            self.subscriptions = [(p, c) for p, c in self.subscriptions if c is not client]
+
+    def publish(self, topic, payload):
+        with self.lock:
+            self.messages += 1
+            self.bytes += len(topic) + len(payload)
+            subscribers = [client for pattern, client in self.subscriptions if topic_matches_sub(pattern, topic)]
+        for client in subscribers:
+            client.inbox.put(Message(topic, payload))
+
+
+class FakeClient:
+    def __init__(self, broker, client_id=""):
+        self.broker = broker
+        self.client_id = client_id
+        self.on_connect = None
+        self.on_message = None
+        self.inbox = queue.Queue()
+        self.connected = False
+        self.thread = None
+
+    def username_pw_set(self, username, password=None):
+        pass
+
+    def tls_set(self, *args, **kwargs):
+        pass
+
+    def tls_insecure_set(self, value):
+        pass
+
+    def connect(self, host=None, port=1883, keepalive=60):
+        self.connected = True
+        self.inbox.put(CONNECT)
+        return 0
+
+    def disconnect(self):
+        self.connected = False
+        self.broker.unsubscribe_all(self)
+        return 0
+
+    def is_connected(self):
+        return self.connected
+
+    def subscribe(self, topic, qos=0):
+        self.broker.subscribe(self, topic)
+        return 0, 0
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        if isinstance(payload, str):
+            payload = payload.encode()
+        self.broker.publish(topic, payload or b"")
+
+    def loop_forever(self):
+        while True:
+            item = self.inbox.get()
+            if item is None:
+                return
+            if item is CONNECT:
+                if self.on_connect:
+                    self.on_connect(self, None, {}, 0)
+            elif self.on_message:
+                self.on_message(self, None, item)
+
+    def loop_start(self):
+        self.thread = threading.Thread(target=self.loop_forever, daemon=True)
+        self.thread.start()
+
+    def loop_stop(self):
+        if self.thread:
+            self.inbox.put(None)
+            self.thread.join()
+            self.thread = None
@@ -0,0 +1,163 @@
+"""Deterministic local stand-ins for the microphone, Google speech recognition, Groq and Polly.
+
+Each fake sleeps for a latency drawn from a LatencyModel so turn timings can be
+measured offline and compared between branches. The *Client classes wrap the
+fakes in the shape of the real client objects, for code that calls
+speech_recognition, groq and boto3 directly.
+"""
+import io
+import math
+import time
+import queue
+import random
+import threading
+from types import SimpleNamespace
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+# Roughly how fast Polly speaks, for sizing fake PCM clips
+CHARS_PER_SECOND = 15
+
+
+class LatencyModel:
+    """Log-normal latency with a given median and 95th percentile, in seconds"""
+
+    def __init__(self, median, p95=None, seed=0):
+        self.median = median
+        self.sigma = math.log(p95 / median) / 1.645 if p95 and median else 0.0
+        self.rng = random.Random(seed)
+
+    def sample(self):
+        if not self.median:
+            return 0.0
+        return self.median * math.exp(self.rng.gauss(0, self.sigma)) if self.sigma else self.median
+
+    def sleep(self):
+        time.sleep(self.sample())
+
+
+class FakeCapture:
+    """Delivers scripted utterances like MicrophoneCapture.
+
+    script is a list of (delay, utterance, speech_seconds): after delay seconds the
+    user starts speaking (on_speech_start fires) and the utterance is ready
+    speech_seconds later.
+    """
+
+    def __init__(self, script):
+        self.on_speech_start = None
+        self.utterances = queue.Queue()
+        self.thread = threading.Thread(target=self.speak_script, args=(script,), daemon=True)
+        self.thread.start()
+
+    def speak_script(self, script):
+        for delay, utterance, speech_seconds in script:
+            time.sleep(delay)
+            if self.on_speech_start:
+                self.on_speech_start()
+            time.sleep(speech_seconds)
+            self.utterances.put(utterance)
+
+    def next_utterance(self, timeout=None):
+        try:
+            return self.utterances.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def clear(self):
+        while True:
+            try:
+                self.utterances.get_nowait()
+            except queue.Empty:
+                return
+
+
+class FakeRecognizer:
+    """Returns the transcript attached to the audio after a simulated network delay"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def recognize(self, audio):
+        self.calls += 1
+        self.latency.sleep()
+        return getattr(audio, "transcript", audio)
+
+
+class FakeLLM:
+    """Streams a canned answer word by word, like a Groq streaming completion"""
+
+    def __init__(self, first_token, per_token, answer="I can help with that. The lift is next to the lobby on the ground floor. Have a nice day."):
+        self.first_token = first_token
+        self.per_token = per_token
+        self.answer_text = answer
+        self.calls = 0
+
+    def stream(self, query):
+        self.calls += 1
+        self.first_token.sleep()
+        words = self.answer_text.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                self.per_token.sleep()
+            yield word if i == len(words) - 1 else word + " "
+
+    def answer(self, query):
+        return self.stream(query), False
+
+
+class FakeTTS:
+    """Returns silent PCM sized like real speech for the sentence"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def synthesize(self, text, voice="Joanna"):
+        self.calls += 1
+        self.latency.sleep()
+        seconds = len(text) / CHARS_PER_SECOND
+        return b"\x00" * (int(seconds * SAMPLE_RATE) * SAMPLE_WIDTH)
+
+
+class FakeGoogleRecognizer:
+    """speech_recognition.Recognizer stand-in: recognize_google returns the transcript set for the next utterance"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.transcript = None
+        self.calls = 0
+
+    def recognize_google(self, audio):
+        self.calls += 1
+        self.latency.sleep()
+        if not self.transcript:
+            import speech_recognition as sr
+            raise sr.UnknownValueError()
+        return self.transcript
+
+
+class FakeGroqClient:
+    """groq.Groq stand-in: chat.completions.create streams a FakeLLM answer to the last message"""
+
+    def __init__(self, llm):
+        self.llm = llm
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, messages, stream=False, **kwargs):
+        chunks = self.llm.stream(messages[-1]["content"])
+        if stream:
+            return (SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=chunk))])
+                    for chunk in chunks)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="".join(chunks)))])
+
+
+class FakePollyClient:
+    """boto3 Polly client stand-in: synthesize_speech returns FakeTTS audio as a readable AudioStream"""
+
+    def __init__(self, tts):
+        self.tts = tts
+
+    def synthesize_speech(self, Text, VoiceId="Joanna", **kwargs):
+        return {"AudioStream": io.BytesIO(self.tts.synthesize(Text, VoiceId))}
@@ -0,0 +1,116 @@
+"""Local stand-in for the delivery server's owner API, with injectable latency and failures.
+
+    GET  /api/owner/deliveries/<id>                  -> {"ownerId": "owner-<id>"}
+    GET  /api/owner/deliveries/<id>/face-embeddings  -> {"embeddings": faces[<id>]}
+    POST /api/owner/deliveries/<id>/verify-otp       -> {"verified": true}
+    POST /api/owner/deliveries/<id>/verify-face      -> {"verified": true}
+
+Run standalone with:
+    python3 benchmarks/stub_delivery_server.py [port]
+"""
+import sys
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "/api/owner/deliveries/"
+
+
+class StubDeliveryServer:
+    """Serves the owner API on 127.0.0.1 from a background thread.
+
+    latency is slept before every response; fail_next makes that many of the
+    following requests answer 503. faces maps delivery ids to enrolled embeddings.
+    """
+
+    def __init__(self, port=0, latency=0.0):
+        self.latency = latency
+        self.fail_next = 0
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.verified = []
+        self.faces = {}
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with stub.lock:
+                    stub.connections += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def respond(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def should_fail(self):
+                time.sleep(stub.latency)
+                with stub.lock:
+                    stub.requests += 1
+                    if stub.fail_next > 0:
+                        stub.fail_next -= 1
+                        return True
+                return False
+
+            def do_GET(self):
+                if self.should_fail():
+                    return self.respond(503, {"error": "unavailable"})
+                if not self.path.startswith(PREFIX):
+                    return self.respond(404, {"error": "not found"})
+                delivery_id = self.path[len(PREFIX):]
+                if delivery_id.endswith("/face-embeddings"):
+                    delivery_id = delivery_id[:-len("/face-embeddings")]
+                    if delivery_id not in stub.faces:
+                        return self.respond(404, {"error": "no enrolled faces"})
+                    return self.respond(200, {"embeddings": stub.faces[delivery_id]})
+                self.respond(200, {"ownerId": f"owner-{delivery_id}"})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.should_fail():
+                    return self.respond(503, {"error": "unavailable"})
+                if not (self.path.startswith(PREFIX) and self.path.endswith(("/verify-otp", "/verify-face"))):
+                    return self.respond(404, {"error": "not found"})
+                if not body.get("ownerId"):
+                    return self.respond(400, {"error": "ownerId required"})
+                delivery_id = self.path[len(PREFIX):].rsplit("/", 1)[0]
+                with stub.lock:
+                    stub.verified.append((delivery_id, body))
+                self.respond(200, {"verified": True})
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}{PREFIX.rstrip('/')}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    server = StubDeliveryServer(int(sys.argv[1]) if len(sys.argv) > 1 else 5000).start()
+    print(f"Serving {server.url}")
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,103 @@
+import re
+import time
+from collections import deque
+
+# Per-message overhead for role and formatting tokens in the chat template
+MESSAGE_OVERHEAD = 4
+# After a failed summary, wait this long before calling the summarizer again, doubling up to the max
+SUMMARY_RETRY_SECONDS = 30.0
+SUMMARY_RETRY_MAX_SECONDS = 600.0
+WORD_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text):
+    """Cheap local token estimate: words and punctuation, with long words costing extra pieces"""
+    tokens = 0
+    for piece in WORD_PATTERN.findall(text):
+        tokens += 1 + len(piece) // 8
+    return tokens + MESSAGE_OVERHEAD
+
+
+class ContextWindow:
+    """Chat history sent to the LLM, bounded by a token budget.
+
+    Holds a system prompt, the most recent messages that fit in max_tokens and,
+    if a summarize callable is given, a running summary of the turns that fell
+    out of the window. Token counts are computed once per message. While the
+    summarizer is failing it is retried with a growing delay, and evicted turns
+    beyond max_evicted_tokens are forgotten oldest first.
+    """
+
+    def __init__(self, system_prompt, max_tokens=3000, summarize=None, summary_batch_tokens=1000,
+                 max_evicted_tokens=None, clock=time.monotonic):
+        self.system_prompt = {"role": "system", "content": system_prompt}
+        self.system_tokens = estimate_tokens(system_prompt)
+        self.max_tokens = max_tokens
+        self.summarize = summarize
+        self.summary_batch_tokens = summary_batch_tokens
+        self.summary = None
+        self.summary_tokens = 0
+        self.recent = deque()  # (message, tokens)
+        self.recent_tokens = 0
+        self.max_evicted_tokens = max_evicted_tokens or 4 * summary_batch_tokens
+        self.clock = clock
+        self.retry_at = 0.0
+        self.retry_delay = 0.0
+        self.evicted = deque()  # (message, tokens)
+        self.evicted_tokens = 0
+
+    def add(self, role, content):
+        message = {"role": role, "content": content}
+        tokens = estimate_tokens(content)
+        self.recent.append((message, tokens))
+        self.recent_tokens += tokens
+        self.trim()
+
+    def extend(self, messages):
+        for message in messages:
+            self.add(message["role"], message["content"])
+
+    def budget(self):
+        return self.max_tokens - self.system_tokens - self.summary_tokens
+
+    def trim(self):
+        # Always keep the newest message, even if it alone is over budget
+        while self.recent_tokens > self.budget() and len(self.recent) > 1:
+            message, tokens = self.recent.popleft()
+            self.recent_tokens -= tokens
+            if self.summarize:
+                self.evicted.append((message, tokens))
+                self.evicted_tokens += tokens
+        while self.evicted_tokens > self.max_evicted_tokens:
+            _, tokens = self.evicted.popleft()
+            self.evicted_tokens -= tokens
+        if (self.summarize and self.evicted_tokens >= self.summary_batch_tokens
+                and self.clock() >= self.retry_at):
+            self.fold_summary()
+
+    def fold_summary(self):
+        """Merge evicted turns into the running summary"""
+        try:
+            summary = self.summarize(self.summary, [message for message, _ in self.evicted])
+        except Exception as e:
+            self.retry_delay = min(max(self.retry_delay * 2, SUMMARY_RETRY_SECONDS), SUMMARY_RETRY_MAX_SECONDS)
+            self.retry_at = self.clock() + self.retry_delay
+            print(f"⚠️ Error summarizing conversation, retrying in {self.retry_delay:.0f}s: {e}")
+            return
+        self.retry_delay = 0.0
+        self.summary = {"role": "system", "content": f"Summary of the earlier conversation: {summary}"}
+        self.summary_tokens = estimate_tokens(self.summary["content"])
+        self.evicted.clear()
+        self.evicted_tokens = 0
+        self.trim()
+
+    def build(self):
+        """Messages for the next completion request"""
+        messages = [self.system_prompt]
+        if self.summary:
+            messages.append(self.summary)
+        messages.extend(message for message, _ in self.recent)
+        return messages
+
+    def token_count(self):
+        return self.system_tokens + self.summary_tokens + self.recent_tokens
@@ -0,0 +1,188 @@
+import os
+import sys
+import json
+import time
+import threading
+from collections import deque
+
+
+class JsonlStore:
+    """Append-only record log stored as rotating JSON Lines segments.
+
+    Records are appended to the active segment and fsynced in batches. Once a
+    segment passes segment_bytes a new one is started. With max_records set,
+    closed segments holding only older records are dropped once too many pile up;
+    without it the full history is kept and segments are never rewritten.
+    """
+
+    def __init__(self, directory, segment_bytes=1024 * 1024, compact_segments=8,
+                 max_records=None, fsync_batch=16, fsync_interval=5.0):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.compact_segments = compact_segments
+        self.max_records = max_records
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.synced_at = time.monotonic()
+
+        os.makedirs(directory, exist_ok=True)
+        segments = self.segments()
+        self.next_segment = int(segments[-1][len('segment-'):-len('.jsonl')]) + 1 if segments else 0
+        if segments:
+            self.active_path = os.path.join(directory, segments[-1])
+        else:
+            self.active_path = self.new_segment_path()
+        self.active = open(self.active_path, "a", encoding="utf-8")
+
+    def segments(self):
+        return sorted(name for name in os.listdir(self.directory)
+                      if name.startswith('segment-') and name.endswith('.jsonl'))
+
+    def new_segment_path(self):
+        path = os.path.join(self.directory, f"segment-{self.next_segment:06d}.jsonl")
+        self.next_segment += 1
+        return path
+
+    def append(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            self.active.write(line)
+            self.active.flush()
+            self.pending += 1
+            if self.pending >= self.fsync_batch or time.monotonic() - self.synced_at >= self.fsync_interval:
+                self.sync()
+            if self.active.tell() >= self.segment_bytes:
+                self.rotate()
+
+    def sync(self):
+        os.fsync(self.active.fileno())
+        self.pending = 0
+        self.synced_at = time.monotonic()
+
+    def flush(self):
+        with self.lock:
+            self.active.flush()
+            self.sync()
+
+    def rotate(self):
+        """Close the active segment and start a new one (lock must be held)"""
+        self.sync()
+        self.active.close()
+        self.active_path = self.new_segment_path()
+        self.active = open(self.active_path, "a", encoding="utf-8")
+        if self.max_records is not None and len(self.segments()) - 1 >= self.compact_segments:
+            self.compact()
+
+    def compact(self):
+        """Drop closed records beyond the newest max_records (lock must be held)
+
+        Segments are walked newest first and only the one straddling the limit is
+        rewritten, so the cost is bounded by max_records rather than the history.
+        """
+        if self.max_records is None:
+            return
+        closed = [os.path.join(self.directory, name) for name in self.segments()
+                  if os.path.join(self.directory, name) != self.active_path]
+        kept = 0
+        for index in range(len(closed) - 1, -1, -1):
+            records = list(self.read_segments([closed[index]]))
+            if kept + len(records) <= self.max_records:
+                kept += len(records)
+                continue
+            keep = self.max_records - kept
+            if keep:
+                self.rewrite(closed[index], records[-keep:])
+            else:
+                os.remove(closed[index])
+            for path in closed[:index]:
+                os.remove(path)
+            return
+
+    @staticmethod
+    def rewrite(path, records):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def read_segments(paths):
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # A torn final line from a crash mid-write is skipped
+                        continue
+
+    def read(self):
+        """Stream every record, oldest first, without loading the whole log"""
+        with self.lock:
+            self.active.flush()
+            paths = [os.path.join(self.directory, name) for name in self.segments()]
+        return self.read_segments(paths)
+
+    def tail(self, count):
+        """The newest count records, oldest first, reading back from the last segment"""
+        with self.lock:
+            self.active.flush()
+            names = self.segments()
+        records = deque()
+        for name in reversed(names):
+            if len(records) >= count:
+                break
+            segment = list(self.read_segments([os.path.join(self.directory, name)]))
+            records.extendleft(reversed(segment[len(records) - count:]))
+        return list(records)
+
+    def is_empty(self):
+        return all(os.path.getsize(os.path.join(self.directory, name)) == 0 for name in self.segments())
+
+    def close(self):
+        with self.lock:
+            self.active.flush()
+            self.sync()
+            self.active.close()
+
+
+def migrate_json(json_path, store):
+    """Import a legacy JSON array file into an empty store, then move the old file aside"""
+    if not os.path.exists(json_path) or not store.is_empty():
+        return 0
+    try:
+        with open(json_path, "r") as f:
+            content = f.read().strip()
+        records = json.loads(content) if content else []
+    except ValueError as e:
+        print(f"⚠️ Could not migrate {json_path}: {e}")
+        return 0
+    for record in records:
+        store.append(record)
+    store.flush()
+    os.replace(json_path, f"{json_path}.migrated")
+    print(f"✅ Migrated {len(records)} records from {json_path}")
+    return len(records)
+
+
+def export_json(store, out):
+    """Write the store as a JSON array, one record at a time"""
+    out.write("[\n")
+    for i, record in enumerate(store.read()):
+        if i:
+            out.write(",\n")
+        out.write(json.dumps(record, ensure_ascii=False))
+    out.write("\n]\n")
+
+
+if __name__ == "__main__":
+    # python3 chat_store.py chat_log > ChatLog.json
+    export_json(JsonlStore(sys.argv[1]), sys.stdout)
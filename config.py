@@ -6,4 +6,23 @@ mqtt_options = {
     'broker': '65f02f33157749ed9e713a070f930f6e.s1.eu.hivemq.cloud',  # Replace with your HiveMQ Cloud cluster URL
     'port': 8883,  # HiveMQ Cloud port (usually 8883 for TLS)
     'keepalive': 60  # Keepalive interval in seconds
-}
\ No newline at end of file
+}
+compartments = 4  # Package compartments, each with its own door
+# How long a delivery's OTP is accepted; after that the compartment stays reserved until opened by an operator
+otp_ttl_seconds = 3600
+# Site map for navigation, in metres from the map origin; None drives nowhere and reports arrival straight away.
+# Locations the map cannot place (lat/lng without geo_origin, off the map) are not planned either
+navigation = {
+    'width_m': 100,
+    'height_m': 100,
+    'resolution': 0.25,  # metres per grid cell
+    'robot_radius': 0.3,
+    'geo_origin': None,  # (lat, lng) of the map origin, needed to navigate to lat/lng locations
+    'waypoints': {'base': (5, 5), 'gate': (50, 2), 'security': (52, 6), 'lobby': (50, 50)}
+}
+# Face match as an alternative to the OTP, e.g. {'camera': 0, 'detector': 'haar', 'model': 'mobilefacenet.onnx'};
+# face unlock stays off without a model. None disables it
+face_verification = None
+# NMEA GPS module, e.g. {'port': '/dev/serial0', 'baud': 9600}; None runs without a position fix
+gps = None
+arrival_radius_m = 10  # How close the GPS fix has to be to a lat/lng location to count as arrived
@@ -0,0 +1,133 @@
+import os
+import json
+import time
+import hashlib
+import numpy as np
+from difflib import SequenceMatcher
+
+NGRAM = 3
+
+
+def ngrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)}
+
+
+class FaqIndex:
+    """Character trigram inverted index over FAQ questions, built once per FAQ version"""
+
+    def __init__(self, entries):
+        self.questions = list(entries)
+        self.answers = [entries[q] for q in self.questions]
+        vocab = {}
+        postings = []
+        sizes = np.zeros(len(self.questions), dtype=np.float32)
+        for row, question in enumerate(self.questions):
+            grams = ngrams(question)
+            sizes[row] = len(grams)
+            for gram in grams:
+                gram_id = vocab.setdefault(gram, len(vocab))
+                if gram_id == len(postings):
+                    postings.append([])
+                postings[gram_id].append(row)
+        self.vocab = vocab
+        self.postings = [np.array(rows, dtype=np.int32) for rows in postings]
+        self.sizes = sizes
+
+    def candidates(self, query, limit):
+        """Rows ranked by trigram Dice similarity to the query, best first"""
+        grams = ngrams(query)
+        hits = [self.postings[self.vocab[g]] for g in grams if g in self.vocab]
+        if not hits:
+            return np.array([], dtype=np.int32), np.array([], dtype=np.float32)
+        shared = np.bincount(np.concatenate(hits), minlength=len(self.questions))
+        scores = 2 * shared / (self.sizes + len(grams))
+        if len(scores) > limit:
+            rows = np.argpartition(scores, -limit)[-limit:]
+        else:
+            rows = np.arange(len(scores))
+        rows = rows[np.argsort(scores[rows])[::-1]]
+        return rows, scores[rows]
+
+
+class FaqMatcher:
+    """Fuzzy FAQ lookup that scales to thousands of questions.
+
+    A vectorized trigram score shortlists candidates, which are then re-scored with
+    difflib's SequenceMatcher so the cutoff means the same as get_close_matches.
+    FAQs come from a built-in dict plus an optional JSON file of question -> answer,
+    which is reloaded when it changes on disk.
+    """
+
+    def __init__(self, entries=None, path=None, cutoff=0.7, shortlist=20, reload_interval=5.0, on_reload=None):
+        self.base_entries = dict(entries or {})
+        self.on_reload = on_reload
+        self.version = None
+        self.path = path
+        self.cutoff = cutoff
+        self.shortlist = shortlist
+        self.reload_interval = reload_interval
+        self.loaded_mtime = None
+        self.checked_at = 0.0
+        self.index = None
+        self.reload()
+
+    def load_entries(self):
+        entries = dict(self.base_entries)
+        if self.path and os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                entries.update({q.lower().strip(): a for q, a in json.load(f).items()})
+        return entries
+
+    def reload(self):
+        # Remember the mtime even if loading fails, so a bad file is retried only after it changes
+        self.loaded_mtime = os.path.getmtime(self.path) if self.path and os.path.exists(self.path) else None
+        try:
+            entries = self.load_entries()
+            self.index = FaqIndex(entries)
+            self.version = hashlib.sha1(json.dumps(entries, sort_keys=True).encode()).hexdigest()[:16]
+        except Exception as e:
+            print(f"⚠️ Error loading FAQ file: {e}")
+            if self.index is None:
+                self.index = FaqIndex(self.base_entries)
+
+    def check_reload(self):
+        now = time.monotonic()
+        if now - self.checked_at < self.reload_interval:
+            return
+        self.checked_at = now
+        mtime = os.path.getmtime(self.path) if self.path and os.path.exists(self.path) else None
+        if mtime != self.loaded_mtime:
+            print("🔄 FAQ file changed, reloading")
+            self.reload()
+            if self.on_reload:
+                self.on_reload(self.version)
+
+    @property
+    def entries(self):
+        index = self.index
+        return dict(zip(index.questions, index.answers))
+
+    def match(self, query, n=3):
+        """Return up to n (question, answer, score) tuples scoring at least the cutoff, best first"""
+        self.check_reload()
+        index = self.index
+        query = query.lower().strip()
+        rows, _ = index.candidates(query, self.shortlist)
+
+        # Same checks and order as difflib.get_close_matches
+        s = SequenceMatcher()
+        s.set_seq2(query)
+        results = []
+        for row in rows:
+            s.set_seq1(index.questions[row])
+            if s.real_quick_ratio() >= self.cutoff and s.quick_ratio() >= self.cutoff:
+                score = s.ratio()
+                if score >= self.cutoff:
+                    results.append((index.questions[row], index.answers[row], score))
+        results.sort(key=lambda r: r[2], reverse=True)
+        return results[:n]
+
+    def best(self, query):
+        matches = self.match(query, n=1)
+        return matches[0][1] if matches else None
@@ -0,0 +1,55 @@
+import time
+import threading
+
+
+class LazyService:
+    """Creates an expensive client (and its imports) on first use, once, from any thread.
+
+    warm, if given, is called with the new client by warm_up() to open pooled
+    connections ahead of the first real request.
+    """
+
+    def __init__(self, name, factory, warm=None):
+        self.name = name
+        self.factory = factory
+        self.warm = warm
+        self.instance = None
+        self.lock = threading.Lock()
+        self.init_seconds = None
+        self.warm_seconds = None
+
+    def get(self):
+        if self.instance is None:
+            with self.lock:
+                if self.instance is None:
+                    start = time.monotonic()
+                    self.instance = self.factory()
+                    self.init_seconds = time.monotonic() - start
+        return self.instance
+
+    @property
+    def ready(self):
+        return self.instance is not None
+
+    def warm_up(self):
+        try:
+            instance = self.get()
+            if self.warm:
+                start = time.monotonic()
+                self.warm(instance)
+                self.warm_seconds = time.monotonic() - start
+            print(f"✅ {self.name} ready (init {self.init_seconds:.2f}s"
+                  + (f", warm-up {self.warm_seconds:.2f}s)" if self.warm_seconds is not None else ")"))
+        except Exception as e:
+            print(f"⚠️ Error warming up {self.name}: {e}")
+
+
+def warm_up_in_background(*tasks):
+    """Run services' warm_up (or plain callables) in parallel daemon threads"""
+    threads = []
+    for task in tasks:
+        target = task.warm_up if isinstance(task, LazyService) else task
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
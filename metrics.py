@@ -0,0 +1,297 @@
+"""Timing histograms and counters shared by the speech, animation and robot processes.
+
+Stages are timed with time.perf_counter into fixed buckets allocated when the
+histogram is created, so recording is a bisect and three additions. Each
+process exports its own metrics (see start()):
+  METRICS=0           turn everything off; histogram() and counter() return a
+                      shared no-op and timed() returns the function unchanged
+  METRICS_HTTP=1      serve Prometheus text on http://127.0.0.1:<PORTS[job]>/metrics
+  METRICS_DIR=<dir>   append a JSON snapshot to <dir>/<job>.jsonl every
+                      METRICS_INTERVAL seconds (default 60), rotated at 1 MB
+"""
+import os
+import json
+import time
+import bisect
+import threading
+import contextlib
+import functools
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENABLED = os.environ.get("METRICS", "1").lower() not in ("0", "false", "no", "off")
+PORTS = {'speech': 9101, 'animation': 9102, 'robot': 9103}
+# Upper bounds in seconds, from a fast frame blit to a slow network call
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Histogram:
+    def __init__(self, name, labels, bounds=BUCKETS):
+        self.name = name
+        self.labels = labels
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # the last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(self.bounds, seconds)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += seconds
+            self.count += 1
+
+    def time(self):
+        """Context manager that observes the time spent inside it"""
+        return Timer(self)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (inf past the last bound)"""
+        with self.lock:
+            counts, count = list(self.counts), self.count
+        rank = q * count
+        seen = 0
+        for bound, bucket in zip(self.bounds + (float('inf'),), counts):
+            seen += bucket
+            if seen >= rank and seen:
+                return bound
+        return 0.0
+
+    def snapshot(self):
+        with self.lock:
+            return {'count': self.count, 'sum': self.sum, 'buckets': list(self.counts)}
+
+
+class Counter:
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+
+class NullMetric:
+    """Stands in for every metric when METRICS=0"""
+    TIMER = contextlib.nullcontext()
+
+    def observe(self, seconds):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def time(self):
+        return self.TIMER
+
+    def snapshot(self):
+        return None
+
+
+NULL = NullMetric()
+registry = {}  # (name, labels) -> Histogram or Counter
+descriptions = {}  # name -> (type, help)
+registry_lock = threading.Lock()
+
+
+def get_metric(cls, kind, name, help, labels, *args):
+    if not ENABLED:
+        return NULL
+    key = (name, tuple(sorted(labels.items())))
+    with registry_lock:
+        metric = registry.get(key)
+        if metric is None:
+            metric = registry[key] = cls(name, key[1], *args)
+            descriptions.setdefault(name, (kind, help))
+        return metric
+
+
+def histogram(name, help="", bounds=BUCKETS, **labels):
+    """The histogram for name and labels, created on first use; look it up once and keep it"""
+    return get_metric(Histogram, 'histogram', name, help, labels, bounds)
+
+
+def counter(name, help="", **labels):
+    return get_metric(Counter, 'counter', name, help, labels)
+
+
+def timed(name, help="", **labels):
+    """Decorator observing each call's duration; a no-op wrapper is never added when disabled"""
+    def decorate(func):
+        if not ENABLED:
+            return func
+        metric = histogram(name, help, **labels)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metric.observe(time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+def render():
+    """Every metric in the Prometheus text exposition format"""
+    with registry_lock:
+        metrics = sorted(registry.values(), key=lambda m: (m.name, m.labels))
+    lines = []
+    described = set()
+    for metric in metrics:
+        if metric.name not in described:
+            kind, help = descriptions[metric.name]
+            lines.append(f"# HELP {metric.name} {help}")
+            lines.append(f"# TYPE {metric.name} {kind}")
+            described.add(metric.name)
+        if isinstance(metric, Counter):
+            lines.append(f"{metric.name}{format_labels(metric.labels)} {metric.value}")
+            continue
+        snapshot = metric.snapshot()
+        cumulative = 0
+        for bound, bucket in zip(metric.bounds + ('+Inf',), snapshot['buckets']):
+            cumulative += bucket
+            lines.append(f"{metric.name}_bucket{format_labels(metric.labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{metric.name}_sum{format_labels(metric.labels)} {snapshot['sum']}")
+        lines.append(f"{metric.name}_count{format_labels(metric.labels)} {snapshot['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def snapshot():
+    """{metric name{labels}: counter value or histogram snapshot}"""
+    with registry_lock:
+        metrics = list(registry.values())
+    return {metric.name + format_labels(metric.labels): metric.snapshot() for metric in metrics}
+
+
+def summary():
+    """One line per histogram with count, mean and bucket p50/p95, for logging at shutdown"""
+    with registry_lock:
+        metrics = sorted((m for m in registry.values() if isinstance(m, Histogram)), key=lambda m: (m.name, m.labels))
+    lines = []
+    for metric in metrics:
+        if metric.count:
+            lines.append(f"{metric.name}{format_labels(metric.labels)}: {metric.count} x "
+                         f"mean {metric.sum / metric.count * 1000:.1f} ms, p50 <= {metric.quantile(0.5) * 1000:g} ms, "
+                         f"p95 <= {metric.quantile(0.95) * 1000:g} ms")
+    return lines
+
+
+def serve(port, host="127.0.0.1"):
+    """Serve render() on /metrics from a daemon thread; returns the server"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class FileExporter:
+    """Appends a timestamped snapshot() as one JSON line every interval, keeping backups rotated files"""
+
+    def __init__(self, path, interval=60, max_bytes=1024 * 1024, backups=3):
+        self.path = path
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def write(self):
+        line = json.dumps({'time': time.time(), 'metrics': snapshot()}) + "\n"
+        if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_bytes:
+            self.rotate()
+        with open(self.path, "a") as f:
+            f.write(line)
+
+    def rotate(self):
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{index}"):
+                os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                print(f"Error writing metrics: {e}")
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop and write a final snapshot"""
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+        self.write()
+
+
+def start(job):
+    """Start the exporters the environment asks for; returns them (call stop() on FileExporters at exit)"""
+    exporters = []
+    if not ENABLED:
+        return exporters
+    if os.environ.get("METRICS_HTTP", "").lower() in ("1", "true", "yes"):
+        try:
+            exporters.append(serve(PORTS[job]))
+        except OSError as e:
+            print(f"Metrics endpoint for {job} unavailable: {e}")
+    if os.environ.get("METRICS_DIR"):
+        path = os.path.join(os.environ["METRICS_DIR"], f"{job}.jsonl")
+        exporters.append(FileExporter(path, float(os.environ.get("METRICS_INTERVAL", 60))).start())
+    return exporters
+
+
+def stop(exporters):
+    for exporter in exporters:
+        if isinstance(exporter, FileExporter):
+            exporter.stop()
+        else:
+            exporter.shutdown()
@@ -0,0 +1,223 @@
+import os
+import json
+import wave
+import time
+import queue
+import threading
+from collections import deque
+import numpy as np
+import speech_recognition as sr
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+FRAME_MS = 30
+
+
+class MicrophoneSource:
+    """Long-lived PyAudio input stream, 16-bit mono"""
+
+    def __init__(self, device_index=0, sample_rate=SAMPLE_RATE):
+        import pyaudio
+        self.sample_rate = sample_rate
+        self.audio = pyaudio.PyAudio()
+        self.stream = self.audio.open(format=pyaudio.paInt16, channels=1, rate=sample_rate,
+                                      input=True, input_device_index=device_index)
+
+    def read(self, frames):
+        return self.stream.read(frames, exception_on_overflow=False)
+
+    def close(self):
+        self.stream.stop_stream()
+        self.stream.close()
+        self.audio.terminate()
+
+
+class WavFileSource:
+    """Reads a 16-bit mono WAV file in place of a microphone; returns b'' at the end"""
+
+    def __init__(self, path, realtime=False, trailing_silence=1.0):
+        self.wav = wave.open(path, "rb")
+        if self.wav.getsampwidth() != SAMPLE_WIDTH or self.wav.getnchannels() != 1:
+            raise ValueError(f"{path} must be 16-bit mono")
+        self.sample_rate = self.wav.getframerate()
+        self.realtime = realtime
+        # Silence after the file so a trailing utterance is closed off
+        self.silence_left = int(trailing_silence * self.sample_rate)
+
+    def read(self, frames):
+        data = self.wav.readframes(frames)
+        if len(data) < frames * SAMPLE_WIDTH and self.silence_left > 0:
+            pad = min(frames - len(data) // SAMPLE_WIDTH, self.silence_left)
+            self.silence_left -= pad
+            data += b"\x00" * (pad * SAMPLE_WIDTH)
+        if self.realtime and data:
+            time.sleep(len(data) / (SAMPLE_WIDTH * self.sample_rate))
+        return data
+
+    def close(self):
+        self.wav.close()
+
+
+class VoiceActivityDetector:
+    """Energy and zero-crossing VAD with a noise floor that keeps adapting during silence.
+
+    Background noise that jumps above the speech threshold (a fan, a passing
+    engine) is never silence, so the floor also follows energy that stays
+    steady, within stationary_ratio, for stationary_seconds. Speech is never
+    that steady: syllables and the gaps between words differ many times over.
+    """
+
+    def __init__(self, noise_floor=200.0, threshold_ratio=3.0, min_energy=150.0,
+                 max_zero_crossing=0.35, adapt_rate=0.05, stationary_seconds=3.0, stationary_ratio=2.0):
+        self.noise_floor = noise_floor
+        self.threshold_ratio = threshold_ratio
+        self.min_energy = min_energy
+        self.max_zero_crossing = max_zero_crossing
+        self.adapt_rate = adapt_rate
+        self.stationary_frames = int(stationary_seconds * 1000 / FRAME_MS)
+        self.stationary_ratio = stationary_ratio
+        self.block_frames = 0
+        self.block_min = self.block_max = 0.0
+
+    def is_speech(self, frame):
+        samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+        if samples.size == 0:
+            return False
+        energy = float(np.sqrt(np.mean(samples * samples)))
+        zero_crossing = np.count_nonzero(np.diff(np.signbit(samples))) / samples.size
+        self.track_stationary(energy)
+        speech = (energy > max(self.noise_floor * self.threshold_ratio, self.min_energy)
+                  and zero_crossing < self.max_zero_crossing)
+        if not speech:
+            self.noise_floor += self.adapt_rate * (energy - self.noise_floor)
+        return speech
+
+    def track_stationary(self, energy):
+        """Raise the floor to a background that has held steady above it for a whole block"""
+        if self.block_frames == 0:
+            self.block_min = self.block_max = energy
+        else:
+            self.block_min = min(self.block_min, energy)
+            self.block_max = max(self.block_max, energy)
+        self.block_frames += 1
+        if self.block_frames < self.stationary_frames:
+            return
+        if self.block_min > self.noise_floor and self.block_max <= self.block_min * self.stationary_ratio:
+            self.noise_floor = self.block_min
+        self.block_frames = 0
+
+
+class MicrophoneCapture:
+    """Always-on capture thread that hands finished utterances to the recognizer.
+
+    Audio is read continuously into a short pre-roll ring so speech onsets are
+    not clipped. The learned noise floor is saved to calibration_path every
+    save_interval seconds and on stop, and reused on the next start instead of
+    calibrating before every turn.
+    """
+
+    def __init__(self, source, vad=None, calibration_path="noise_floor.json", preroll_ms=300,
+                 onset_frames=3, end_silence_ms=800, max_phrase_seconds=8, save_interval=60.0):
+        self.source = source
+        self.sample_rate = source.sample_rate
+        self.frame_samples = self.sample_rate * FRAME_MS // 1000
+        self.vad = vad or VoiceActivityDetector()
+        self.calibration_path = calibration_path
+        self.preroll = deque(maxlen=preroll_ms // FRAME_MS)
+        self.onset_frames = onset_frames
+        self.end_silence_frames = end_silence_ms // FRAME_MS
+        self.max_phrase_frames = max_phrase_seconds * 1000 // FRAME_MS
+        self.save_interval = save_interval
+        self.saved_floor = None
+        self.utterances = queue.Queue()
+        # Optional hook called from the capture thread when speech starts (used for barge-in)
+        self.on_speech_start = None
+        self.running = False
+        self.thread = None
+        self.load_calibration()
+
+    def load_calibration(self):
+        if self.calibration_path and os.path.exists(self.calibration_path):
+            try:
+                with open(self.calibration_path, "r") as f:
+                    self.vad.noise_floor = float(json.load(f)["noise_floor"])
+                self.saved_floor = self.vad.noise_floor
+            except Exception as e:
+                print(f"⚠️ Ignoring noise calibration: {e}")
+
+    def save_calibration(self):
+        if not self.calibration_path or self.vad.noise_floor == self.saved_floor:
+            return
+        noise_floor = self.vad.noise_floor
+        tmp_path = f"{self.calibration_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"noise_floor": noise_floor}, f)
+            os.replace(tmp_path, self.calibration_path)
+            self.saved_floor = noise_floor
+        except OSError as e:
+            print(f"⚠️ Could not save noise calibration: {e}")
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.capture_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join()
+        self.source.close()
+        self.save_calibration()
+
+    def capture_loop(self):
+        phrase = None
+        speech_run = 0
+        silence_run = 0
+        saved_at = time.monotonic()
+        while self.running:
+            frame = self.source.read(self.frame_samples)
+            if not frame:
+                break
+            speech = self.vad.is_speech(frame)
+            # A crash or power cut then loses at most one interval of calibration
+            if time.monotonic() - saved_at >= self.save_interval:
+                self.save_calibration()
+                saved_at = time.monotonic()
+
+            if phrase is None:
+                self.preroll.append(frame)
+                speech_run = speech_run + 1 if speech else 0
+                if speech_run >= self.onset_frames:
+                    # Onset confirmed: start the utterance with the buffered pre-roll
+                    phrase = list(self.preroll)
+                    self.preroll.clear()
+                    silence_run = 0
+                    if self.on_speech_start:
+                        self.on_speech_start()
+                continue
+
+            phrase.append(frame)
+            silence_run = 0 if speech else silence_run + 1
+            if silence_run >= self.end_silence_frames or len(phrase) >= self.max_phrase_frames:
+                self.utterances.put(sr.AudioData(b"".join(phrase), self.sample_rate, SAMPLE_WIDTH))
+                phrase = None
+                speech_run = 0
+        if phrase:
+            self.utterances.put(sr.AudioData(b"".join(phrase), self.sample_rate, SAMPLE_WIDTH))
+        self.running = False
+
+    def next_utterance(self, timeout=None):
+        """Block until an utterance is finished; None on timeout"""
+        try:
+            return self.utterances.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def clear(self):
+        """Drop utterances captured while nobody was listening (e.g. the robot's own speech)"""
+        while True:
+            try:
+                self.utterances.get_nowait()
+            except queue.Empty:
+                return
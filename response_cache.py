@@ -0,0 +1,171 @@
+import os
+import re
+import json
+import time
+import threading
+from collections import OrderedDict
+from difflib import get_close_matches
+
+# Words that change the wording but not the question
+FILLER_WORDS = {"please", "um", "uh", "hey", "hi", "hello", "okay", "ok", "robot", "karna"}
+# Answers to these depend on the conversation so far or on when they are asked
+CONTEXT_WORDS = {"it", "its", "that", "this", "these", "those", "they", "them", "he", "him", "she", "her",
+                 "again", "else", "more", "another", "previous", "last", "earlier"}
+TIME_WORDS = {"now", "today", "tonight", "tomorrow", "yesterday", "currently", "current", "time",
+              "date", "day", "weather", "latest", "news", "still", "yet", "open", "closed"}
+
+
+def normalize(query):
+    words = re.sub(r"[^\w\s]", " ", query.lower()).split()
+    kept = [w for w in words if w not in FILLER_WORDS]
+    return " ".join(kept or words)
+
+
+def cacheable(key):
+    """False for follow-ups and time-sensitive questions, whose answers must not be replayed"""
+    return not CONTEXT_WORDS.intersection(key.split()) and not TIME_WORDS.intersection(key.split())
+
+
+def same_specifics(a, b):
+    """Numbers must match exactly: "room 101" and "room 102" are different questions"""
+    return [w for w in a.split() if any(c.isdigit() for c in w)] == \
+        [w for w in b.split() if any(c.isdigit() for c in w)]
+
+
+class ResponseCache:
+    """Cache of LLM answers keyed on the normalized question.
+
+    Exact keys are an O(1) lookup. Setting fuzzy_cutoff below 1.0 also accepts
+    the closest cached question with the same numbers; it is off by default
+    because near-identical wording can still be a different question.
+    Follow-ups and time-sensitive questions are never cached.
+    Entries expire after ttl seconds, the least recently
+    used are evicted past max_entries, and the cache is saved to path so it
+    survives restarts. Changing version (e.g. the FAQ fingerprint) drops all entries.
+    """
+
+    def __init__(self, path="response_cache.json", ttl=7 * 24 * 3600, max_entries=500,
+                 fuzzy_cutoff=1.0, version=None, save_interval=30.0):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.version = version
+        self.save_interval = save_interval
+        self.entries = OrderedDict()  # key -> (answer, created_at)
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.saved_at = time.monotonic()
+
+        self.hits = 0
+        self.misses = 0
+        self.miss_seconds = 0.0
+        self.timed_misses = 0
+        self.load()
+
+    def load(self):
+        """Read saved entries; an unreadable or malformed file is treated as an empty cache"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError("not a JSON object")
+            if data.get("version") != self.version:
+                print("🔄 FAQ data changed, response cache cleared")
+                self.dirty = True
+                return
+            now = time.time()
+            entries = OrderedDict()
+            for key, answer, created_at in data.get("entries", []):
+                if not isinstance(key, str) or not isinstance(answer, str):
+                    raise ValueError(f"malformed entry for {key!r}")
+                if now - created_at < self.ttl:
+                    entries[key] = (answer, created_at)
+        except (OSError, ValueError, TypeError) as e:
+            print(f"⚠️ Ignoring response cache: {e}")
+            # The next save replaces the bad file
+            self.dirty = True
+            return
+        self.entries = entries
+
+    def save(self):
+        with self.lock:
+            if not self.path or not self.dirty:
+                return
+            data = {"version": self.version,
+                    "entries": [[key, answer, created_at] for key, (answer, created_at) in self.entries.items()]}
+            self.dirty = False
+            self.saved_at = time.monotonic()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def lookup(self, key):
+        """Find a fresh entry for key (lock must be held)"""
+        if key not in self.entries and self.fuzzy_cutoff < 1.0:
+            matches = get_close_matches(key, self.entries.keys(), n=1, cutoff=self.fuzzy_cutoff)
+            if matches and same_specifics(key, matches[0]):
+                key = matches[0]
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        answer, created_at = entry
+        if time.time() - created_at >= self.ttl:
+            del self.entries[key]
+            self.dirty = True
+            return None
+        self.entries.move_to_end(key)
+        return answer
+
+    def get(self, query):
+        key = normalize(query)
+        if not cacheable(key):
+            return None
+        with self.lock:
+            answer = self.lookup(key)
+            if answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return answer
+
+    def put(self, query, answer, seconds=0.0):
+        """Store an answer; seconds is how long the LLM took, used to estimate time saved"""
+        key = normalize(query)
+        if not cacheable(key):
+            return
+        with self.lock:
+            self.entries[key] = (answer, time.time())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.miss_seconds += seconds
+            self.timed_misses += 1
+            self.dirty = True
+            due = time.monotonic() - self.saved_at >= self.save_interval
+        if due:
+            self.save()
+
+    def invalidate(self, version=None):
+        """Drop every entry, e.g. after the FAQ data changed"""
+        with self.lock:
+            self.entries.clear()
+            if version is not None:
+                self.version = version
+            self.dirty = True
+        self.save()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            mean_miss = self.miss_seconds / self.timed_misses if self.timed_misses else 0.0
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'seconds_saved': self.hits * mean_miss,
+                'entries': len(self.entries)
+            }
@@ -1,83 +1,247 @@
 import paho.mqtt.client as mqtt
 import json
+import threading
 import config
 from robot_otp import OTPVerifier
 from robot_door import DoorController
+from robot_dispatcher import CommandDispatcher
+from robot_commands import CommandRegistry, CommandError, Optional
+from robot_telemetry import TelemetryPublisher
+from robot_navigation import OccupancyGrid, Navigator, LocationError
+from robot_gps import GpsReader
+from robot_face import build_face_verifier
+import metrics
 
 class RobotController:
-    def __init__(self):
+    def __init__(self, robot_id=None, client=None, otp_verifier=None, door_controller=None, navigator=None, gps=None):
+        """Defaults come from config; pass components in to run without hardware (see benchmarks/bench_fleet.py)"""
         self.mqtt_options = config.mqtt_options
-        self.robot_id = config.robot_id
+        self.robot_id = robot_id or config.robot_id
         
         # Initialize components
-        self.otp_verifier = OTPVerifier()
-        self.door_controller = DoorController()
+        if otp_verifier is None:
+            face_verifier = None
+            if config.face_verification:
+                face_verifier = build_face_verifier(config.face_verification, config.compartments)
+            otp_verifier = OTPVerifier(compartments=config.compartments, face_verifier=face_verifier,
+                                       otp_ttl=config.otp_ttl_seconds)
+        self.otp_verifier = otp_verifier
+        self.door_controller = door_controller or DoorController()
+        if navigator is None and config.navigation:
+            site = config.navigation
+            grid = OccupancyGrid(site['width_m'], site['height_m'], site['resolution'], site['robot_radius'])
+            # Motors and lidar are not wired up yet, so the robot is simulated along the planned path
+            navigator = Navigator(grid, site['waypoints'], site['geo_origin'], pose=site['waypoints']['base'] + (0.0,))
+        self.navigator = navigator
+        # Held for a whole trip, so two deliveries (or a delivery and go_to_base) never share the navigator
+        self.trip_lock = threading.Lock()
+        if gps is None and config.gps:
+            gps = GpsReader.open_serial(config.gps['port'], config.gps.get('baud', 9600))
+        self.gps = gps
         
         # Set up door control callback
         self.otp_verifier.set_door_callback(self.door_controller.control)
         
         # Set up MQTT client
-        self.client = mqtt.Client(client_id=self.mqtt_options['clientId'])
-        self.client.username_pw_set(self.mqtt_options['username'], 
-                                  self.mqtt_options['password'])
-        self.client.tls_set()
-        self.client.tls_insecure_set(False)
+        if client is None:
+            client = mqtt.Client(client_id=self.mqtt_options['clientId'])
+            client.username_pw_set(self.mqtt_options['username'], 
+                                   self.mqtt_options['password'])
+            client.tls_set()
+            client.tls_insecure_set(False)
+        self.client = client
         
         # Set up MQTT callbacks
         self.client.on_connect = self.on_connect
         self.client.on_message = self.on_message
 
+        # Each action's handler and payload schema; validators are compiled here, once
+        delivery_id = (str, int)
+        self.commands = CommandRegistry()
+        self.commands.register('start_delivery', self.start_delivery,
+                               {'deliveryId': delivery_id, 'ownerLocation': object})
+        self.commands.register('set_otp', self.set_otp,
+                               {'deliveryId': delivery_id, 'otp': (str, int), 'compartment': Optional(int)})
+        self.commands.register('open_door', self.open_door, {'deliveryId': delivery_id})
+        self.commands.register('verify_face', self.verify_face, {'deliveryId': Optional(delivery_id)})
+        self.commands.register('go_to_base', self.go_to_base,
+                               {'baseLocation': object, 'deliveryId': Optional(delivery_id)})
+
+        # Commands run on worker threads so door and UI calls never stall the MQTT loop
+        self.dispatcher = CommandDispatcher(self.commands.dispatch, on_reply=self.reply)
+
+        # Position and door state for the dashboard, rate limited and binary encoded
+        self.telemetry = TelemetryPublisher(self.client, self.robot_id)
+        self.door_controller.on_change = self.on_doors_changed
+        if self.gps:
+            self.gps.on_position = self.on_position
+
     def on_connect(self, client, userdata, flags, rc):
         if rc == 0:
             print("Connected to HiveMQ Cloud")
             self.client.subscribe(f"robot/{self.robot_id}/command")
+            self.telemetry.on_connected()
         else:
             print("Failed to connect, return code %d\n", rc)
 
+    @metrics.timed("robot_mqtt_handler_seconds", "Time spent in on_message on paho's network thread")
     def on_message(self, client, userdata, msg):
+        # Runs on paho's network thread: only decode here and leave the work to the dispatcher
         try:
             message = json.loads(msg.payload)
-            print("Received message:", message)
-            if message['action'] == 'start_delivery':
-               print('Received start_delivery command')
-               print(message)
-               owner_location = message['ownerLocation']
-            # 1. Navigate to security guard's location
-            # 2. Open the robot door
-            # 3. Navigate to owner's location
-            # 4. Send arrival notification
-               arrival_message = {
-                'deliveryId': message['deliveryId'],
-                'message': 'I have arrived'
-               }
-               client.publish(f"robot/{robot_id}/arrival", json.dumps(arrival_message))
-            # 5. Wait for owner to open the door
-            # 6. Deliver the package
-            elif message['action'] == 'set_otp':
-                self.otp_verifier.set_otp(message['otp'], message['deliveryId'])
-                print("otp")
-            elif message['action'] == 'open_door':
-                if self.otp_verifier.verify_delivery_id(message['deliveryId']):
-                    self.door_controller.control("open")
-                    print("opendoor")
-            elif message['action'] == 'go_to_base':
-                 print('Received go_to_base command')
-                 base_location = message['baseLocation']
-        except Exception as e:
-            print(f"Error processing message: {e}")
+        except ValueError as e:
+            print(f"Error decoding message: {e}")
+            return
+        print("Received message:", message)
+        try:
+            command = self.commands.check(message)
+        except CommandError as e:
+            print(f"Rejected command: {e}")
+            self.reply(message if isinstance(message, dict) else {}, 'error', str(e))
+            return
+        if self.commands.is_duplicate(command, message):
+            # A redelivery of a command already run; ack it again without running it
+            print(f"Duplicate command {message['commandId']}, skipping")
+            self.reply(message, 'duplicate')
+        elif not self.dispatcher.submit(message):
+            print(f"Command queue full, rejecting {message['action']}")
+            self.reply(message, 'busy', 'command queue full')
+        else:
+            self.commands.remember(message)
+
+    def on_doors_changed(self, open_doors):
+        self.telemetry.update(doors=sum(1 << (compartment - 1) for compartment in open_doors))
+
+    def on_position(self, position):
+        self.telemetry.update(lat=position.lat, lon=position.lon, speed=position.speed, heading=position.heading)
+
+    def location(self):
+        """Latest filtered GPS position ({'lat', 'lng', 'accuracy'}), or None without a fix"""
+        position = self.gps.latest if self.gps else None
+        if position is None:
+            return None
+        return {'lat': position.lat, 'lng': position.lon, 'accuracy': position.accuracy}
+
+    def arrived_at(self, location):
+        """False only when the GPS fix is known to be further than arrival_radius_m from a lat/lng location"""
+        if not self.gps or not isinstance(location, dict) or 'lat' not in location:
+            return True
+        distance = self.gps.distance_to(location['lat'], location.get('lng', location.get('lon')))
+        return distance is None or distance <= config.arrival_radius_m + self.gps.latest.accuracy
+
+    def reply(self, message, status, result=None):
+        """Acknowledge a command on robot/<id>/ack; safe to call from any thread"""
+        ack = {
+            'action': message.get('action'),
+            'deliveryId': message.get('deliveryId'),
+            'status': status
+        }
+        if 'commandId' in message:
+            ack['commandId'] = message['commandId']
+        if status != 'ok' and result is not None:
+            ack['error'] = result
+        self.client.publish(f"robot/{self.robot_id}/ack", json.dumps(ack))
+
+    def navigate(self, target):
+        """Drive to target on the site map; a location the map cannot place is not planned, as before navigation"""
+        if self.navigator is None:
+            return
+        try:
+            self.navigator.navigate_to(target)
+        except LocationError as e:
+            print(f"Not planning a route to {target!r}: {e}")
+
+    def start_delivery(self, message):
+        print('Received start_delivery command')
+        print(message)
+        with self.trip_lock:
+            self.deliver(message)
+
+    def deliver(self, message):
+        owner_location = message['ownerLocation']
+        # 1. Navigate to security guard's location
+        self.navigate('security')
+        # 2. Open the robot door
+        # 3. Navigate to owner's location
+        self.navigate(owner_location)
+        # 4. Send arrival notification; from now on only this delivery's owner can open a compartment
+        self.otp_verifier.serve(message['deliveryId'])
+        if not self.arrived_at(owner_location):
+            print("GPS fix is not within the arrival radius of the owner location")
+        arrival_message = {
+            'deliveryId': message['deliveryId'],
+            'message': 'I have arrived'
+        }
+        location = self.location()
+        if location:
+            arrival_message['location'] = location
+        self.client.publish(f"robot/{self.robot_id}/arrival", json.dumps(arrival_message))
+        # 5. Wait for owner to open the door
+        # 6. Deliver the package
+
+    def set_otp(self, message):
+        compartment = self.otp_verifier.set_otp(message['otp'], message['deliveryId'], message.get('compartment'))
+        print(f"otp for compartment {compartment}")
+
+    def open_door(self, message):
+        # Only the compartment holding this delivery opens, and it is then free for the next load
+        delivery = self.otp_verifier.registry.release(message['deliveryId'])
+        if not delivery:
+            raise ValueError('unknown delivery')
+        self.door_controller.control("open", delivery.compartment)
+        print("opendoor")
+
+    def verify_face(self, message):
+        # Opens the matched delivery's compartment through the same door callback as the keypad;
+        # without deliveryId the owner of the delivery being handed over must match
+        compartment = self.otp_verifier.verify_face(delivery_id=message.get('deliveryId'))
+        if compartment is None:
+            raise ValueError('face not recognised')
+        print(f"Face verified for compartment {compartment}")
+
+    def go_to_base(self, message):
+        print('Received go_to_base command')
+        base_location = message['baseLocation']
+        if not self.trip_lock.acquire(blocking=False):
+            raise ValueError('delivery in progress')
+        try:
+            self.navigate(base_location)
+        finally:
+            self.trip_lock.release()
 
     def start(self):
         """Start the robot controller"""
+        exporters = metrics.start('robot')
         try:
+            keypad = self.otp_verifier.build_keypad()
             self.client.connect(
                 self.mqtt_options['broker'],
                 self.mqtt_options['port'],
                 self.mqtt_options['keepalive']
             )
             print("Starting MQTT loop...")
-            self.client.loop_forever()
+            self.telemetry.start()
+            if self.gps:
+                self.gps.start()
+            if keypad:
+                # Tk has to own the main thread, so paho runs its network loop on its own thread
+                self.client.loop_start()
+                try:
+                    self.otp_verifier.run_keypad()
+                finally:
+                    self.client.loop_stop()
+            else:
+                self.client.loop_forever()
         except Exception as e:
             print(f"Error starting robot controller: {e}")
+        finally:
+            print("Dispatcher stats:", json.dumps(self.dispatcher.stats()))
+            print("Command stats:", json.dumps(self.commands.stats()))
+            if self.navigator:
+                print("Navigation stats:", json.dumps(self.navigator.stats()))
+            for line in metrics.summary():
+                print(line)
+            metrics.stop(exporters)
 
 if __name__ == "__main__":
     controller = RobotController()
@@ -0,0 +1,167 @@
+import time
+import threading
+from collections import OrderedDict
+import metrics
+
+
+class CommandError(Exception):
+    """A command the robot will not run: unknown action or a payload that fails its schema"""
+
+
+class Optional:
+    """Marks a schema field that may be left out"""
+
+    def __init__(self, spec):
+        self.spec = spec
+
+
+def compile_schema(schema, path=""):
+    """Turn {'field': spec} into a function that raises CommandError for a bad payload.
+
+    A spec is a type or tuple of types (float also accepts int, object accepts
+    anything), a nested schema dict, or Optional(spec).
+    """
+    checks = []
+    for key, spec in schema.items():
+        optional = isinstance(spec, Optional)
+        checks.append((key, optional, compile_spec(spec.spec if optional else spec, path + key)))
+
+    def validate(value):
+        if not isinstance(value, dict):
+            raise CommandError(f"{path.rstrip('.') or 'message'} must be an object")
+        for key, optional, check in checks:
+            if key in value:
+                check(value[key])
+            elif not optional:
+                raise CommandError(f"missing {path}{key}")
+    return validate
+
+
+def compile_spec(spec, path):
+    if isinstance(spec, dict):
+        return compile_schema(spec, path + ".")
+    if spec is object:
+        return lambda value: None
+    types = spec if isinstance(spec, tuple) else (spec,)
+    if float in types:
+        types += (int,)
+    allow_bool = bool in types
+    names = " or ".join(t.__name__ for t in types if not (t is int and float in types))
+
+    def check(value):
+        if not isinstance(value, types) or (isinstance(value, bool) and not allow_bool):
+            raise CommandError(f"{path} must be {names}")
+    return check
+
+
+class Command:
+    __slots__ = ('action', 'handler', 'validate', 'received', 'ok', 'failed', 'invalid', 'duplicates', 'histogram')
+
+    def __init__(self, action, handler, validate):
+        self.action = action
+        self.handler = handler
+        self.validate = validate
+        self.received = 0
+        self.ok = 0
+        self.failed = 0
+        self.invalid = 0
+        self.duplicates = 0
+        # Handler latency, exported as robot_command_seconds{action=...} (see metrics.py)
+        self.histogram = metrics.histogram("robot_command_seconds", "Time running a command's handler",
+                                           action=str(action))
+
+
+class CommandRegistry:
+    """Robot commands by action: handler, compiled payload schema and counters.
+
+    Commands that carry a commandId are remembered for dedupe_window seconds (at
+    most dedupe_size of them), so a QoS 1 redelivery after a reconnect is
+    recognised instead of run twice.
+    """
+
+    def __init__(self, dedupe_window=600, dedupe_size=1024, clock=time.monotonic):
+        self.commands = {}
+        self.dedupe_window = dedupe_window
+        self.dedupe_size = dedupe_size
+        self.clock = clock
+        self.seen = OrderedDict()  # commandId -> first seen, oldest first
+        self.lock = threading.Lock()
+
+    def register(self, action, handler, schema):
+        self.commands[action] = Command(action, handler, compile_schema(schema))
+
+    def check(self, message):
+        """Validate a decoded message; returns its Command or raises CommandError"""
+        if not isinstance(message, dict):
+            raise CommandError("message must be an object")
+        command = self.commands.get(message.get('action'))
+        if command is None:
+            raise CommandError(f"unknown action {message.get('action')!r}")
+        command.received += 1
+        try:
+            command.validate(message)
+            if not isinstance(message.get('commandId', ""), (str, int)):
+                raise CommandError("commandId must be str or int")
+        except CommandError:
+            command.invalid += 1
+            raise
+        return command
+
+    def is_duplicate(self, command, message):
+        command_id = message.get('commandId')
+        if command_id is None:
+            return False
+        now = self.clock()
+        with self.lock:
+            while self.seen and (len(self.seen) > self.dedupe_size
+                                 or now - next(iter(self.seen.values())) > self.dedupe_window):
+                self.seen.popitem(last=False)
+            if command_id in self.seen:
+                command.duplicates += 1
+                return True
+        return False
+
+    def remember(self, message):
+        """Record a command's id once it has been accepted for running"""
+        command_id = message.get('commandId')
+        if command_id is not None:
+            with self.lock:
+                self.seen[command_id] = self.clock()
+
+    def dispatch(self, message):
+        command = self.commands[message['action']]
+        start = time.monotonic()
+        ok = False
+        try:
+            result = command.handler(message)
+            ok = True
+            return result
+        finally:
+            command.histogram.observe(time.monotonic() - start)
+            # Handlers run on several dispatcher workers
+            with self.lock:
+                if ok:
+                    command.ok += 1
+                else:
+                    command.failed += 1
+
+    def stats(self):
+        return {
+            action: {
+                'received': command.received,
+                'ok': command.ok,
+                'failed': command.failed,
+                'invalid': command.invalid,
+                'duplicates': command.duplicates,
+                # Handler runs per bucket, keyed by the bucket's upper bound in seconds (empty with METRICS=0)
+                'latency_buckets': latency_buckets(command.histogram)
+            }
+            for action, command in self.commands.items()
+        }
+
+
+def latency_buckets(histogram):
+    snapshot = histogram.snapshot()
+    if snapshot is None:
+        return {}
+    return dict(zip([str(bound) for bound in histogram.bounds] + ['inf'], snapshot['buckets']))
@@ -0,0 +1,94 @@
+import time
+import zlib
+import queue
+import threading
+import metrics
+from robot_commands import latency_buckets
+
+
+class CommandDispatcher:
+    """Runs robot commands on worker threads so the MQTT network thread never blocks.
+
+    Commands are routed to a worker by delivery ID, so commands for the same
+    delivery run in the order they arrived while different deliveries proceed in
+    parallel. Each worker has a bounded queue; when it is full submit() returns
+    False instead of blocking and the caller replies that the robot is busy.
+    """
+
+    def __init__(self, handle, on_reply=None, workers=2, queue_size=16):
+        self.handle = handle
+        self.on_reply = on_reply
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in range(workers)]
+        self.lock = threading.Lock()
+        self.rejected = 0
+        self.failed = 0
+        # action -> metrics histogram of queue wait; handler time is kept by CommandRegistry
+        self.wait_histograms = {}
+        self.threads = [threading.Thread(target=self.worker, args=(q,), daemon=True) for q in self.queues]
+        for thread in self.threads:
+            thread.start()
+
+    @staticmethod
+    def ordering_key(message):
+        return str(message.get('deliveryId') or 'robot')
+
+    def submit(self, message):
+        """Queue a decoded command; returns False if its worker's queue is full"""
+        key = self.ordering_key(message)
+        worker_queue = self.queues[zlib.crc32(key.encode()) % len(self.queues)]
+        try:
+            worker_queue.put_nowait((message, time.monotonic()))
+            return True
+        except queue.Full:
+            with self.lock:
+                self.rejected += 1
+            return False
+
+    def worker(self, worker_queue):
+        while True:
+            item = worker_queue.get()
+            if item is None:
+                return
+            message, queued_at = item
+            self.wait_histogram(message.get('action')).observe(time.monotonic() - queued_at)
+            try:
+                result = self.handle(message)
+                status = 'ok'
+            except Exception as e:
+                print(f"Error processing {message.get('action')}: {e}")
+                result = str(e)
+                status = 'error'
+                with self.lock:
+                    self.failed += 1
+            if self.on_reply:
+                try:
+                    self.on_reply(message, status, result)
+                except Exception as e:
+                    print(f"Error sending reply: {e}")
+
+    def wait_histogram(self, action):
+        # Workers look these up concurrently; the lock keeps one histogram per action
+        with self.lock:
+            histogram = self.wait_histograms.get(action)
+            if histogram is None:
+                histogram = self.wait_histograms[action] = metrics.histogram(
+                    "robot_command_wait_seconds", "Time a command waited for its worker", action=str(action))
+            return histogram
+
+    def stats(self):
+        with self.lock:
+            histograms = dict(self.wait_histograms)
+            stats = {
+                'queue_depths': [q.qsize() for q in self.queues],
+                'rejected': self.rejected,
+                'failed': self.failed
+            }
+        # Commands per wait bucket, keyed by the bucket's upper bound in seconds (empty with METRICS=0)
+        stats['wait_buckets'] = {action: latency_buckets(histogram) for action, histogram in histograms.items()}
+        return stats
+
+    def stop(self):
+        for worker_queue in self.queues:
+            worker_queue.put(None)
+        for thread in self.threads:
+            thread.join()
@@ -2,13 +2,25 @@ import time
 
 class DoorController:
     def __init__(self):
-        pass
+        self.open_doors = set()
+        # Called with the set of open compartments whenever a door opens or closes
+        self.on_change = None
 
-    def control(self, action):
-        """Control the robot door"""
+    def control(self, action, compartment=1):
+        """Control the door of one compartment"""
         if action == "open":
-            print("Opening door...")
+            print(f"Opening door {compartment}...")
             # Add your door control code here
             # This could be GPIO control or other hardware interface
             time.sleep(2)  # Simulate door opening
-            print("Door opened")
+            print(f"Door {compartment} opened")
+            self.open_doors.add(compartment)
+        elif action == "close":
+            print(f"Closing door {compartment}...")
+            time.sleep(2)  # Simulate door closing
+            print(f"Door {compartment} closed")
+            self.open_doors.discard(compartment)
+        else:
+            return
+        if self.on_change:
+            self.on_change(set(self.open_doors))
@@ -0,0 +1,265 @@
+import time
+import threading
+
+import numpy as np
+
+import metrics
+
+MATCH_TIME = metrics.histogram("robot_face_match_seconds", "Time to match a face against the gallery, camera included")
+
+
+class CenterDetector:
+    """Stand-in detector: the owner is asked to look into the camera, so take the central square"""
+
+    def __init__(self, scale=0.6):
+        self.scale = scale
+
+    def detect(self, frame):
+        height, width = frame.shape[:2]
+        side = int(min(height, width) * self.scale)
+        return [((width - side) // 2, (height - side) // 2, side, side)]
+
+
+class HaarDetector:
+    """OpenCV's frontal face Haar cascade (needs opencv-python), largest face first"""
+
+    def __init__(self, min_size=60):
+        import cv2
+        self.cv2 = cv2
+        self.cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+        self.min_size = (min_size, min_size)
+
+    def detect(self, frame):
+        gray = frame if frame.ndim == 2 else self.cv2.cvtColor(frame, self.cv2.COLOR_BGR2GRAY)
+        faces = self.cascade.detectMultiScale(gray, scaleFactor=1.2, minNeighbors=5, minSize=self.min_size)
+        return sorted((tuple(face) for face in faces), key=lambda face: face[2] * face[3], reverse=True)
+
+
+class ProjectionEmbedder:
+    """Stand-in embedding model: a fixed random projection of the normalised grey crop.
+
+    Deterministic for a seed and cheap on a CPU, so tests and benchmarks can run
+    the whole pipeline without model files. It tells apart different images,
+    not different people; use a real model on the robot.
+    """
+
+    def __init__(self, dim=128, size=32, seed=0):
+        self.dim = dim
+        self.size = size
+        rng = np.random.default_rng(seed)
+        self.projection = (rng.standard_normal((size * size, dim)) / np.sqrt(dim)).astype(np.float32)
+
+    def embed(self, crops):
+        pixels = crops.reshape(len(crops), -1)
+        pixels = pixels - pixels.mean(axis=1, keepdims=True)
+        pixels /= pixels.std(axis=1, keepdims=True) + 1e-6
+        return normalize(pixels @ self.projection)
+
+
+class OnnxEmbedder:
+    """An ONNX face embedding model such as MobileFaceNet (needs onnxruntime), run on the CPU"""
+
+    def __init__(self, path, size=112, threads=2):
+        import onnxruntime
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input = self.session.get_inputs()[0].name
+        self.dim = self.session.get_outputs()[0].shape[-1]
+        self.size = size
+
+    def embed(self, crops):
+        # Grey crops repeated over the model's three colour channels, NCHW
+        batch = np.repeat(((crops - 127.5) / 128.0)[:, None], 3, axis=1).astype(np.float32)
+        return normalize(self.session.run(None, {self.input: batch})[0])
+
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / (np.linalg.norm(vectors, axis=-1, keepdims=True) + 1e-12)
+
+
+def crop(frame, box, out):
+    """Nearest-neighbour resize of a box of the frame into out (size x size, grey float32)"""
+    x, y, w, h = box
+    size = out.shape[0]
+    rows = np.minimum(y + (np.arange(size) * h) // size, frame.shape[0] - 1)
+    cols = np.minimum(x + (np.arange(size) * w) // size, frame.shape[1] - 1)
+    patch = frame[rows[:, None], cols]
+    if patch.ndim == 3:
+        np.mean(patch, axis=2, out=out)
+    else:
+        out[:] = patch
+
+
+class FaceGallery:
+    """Enrolled embeddings of the owners of deliveries on board, in one preallocated matrix.
+
+    Each delivery gets a slot of per_slot rows; unused rows stay zero and so
+    never score above a positive threshold.
+    """
+
+    def __init__(self, dim, slots=4, per_slot=8):
+        self.per_slot = per_slot
+        self.matrix = np.zeros((slots * per_slot, dim), dtype=np.float32)
+        self.owners = [None] * slots  # delivery_id per slot
+        self.lock = threading.Lock()
+
+    def load(self, delivery_id, embeddings):
+        """Store up to per_slot embeddings for a delivery, replacing any it had"""
+        embeddings = normalize(embeddings)[:self.per_slot]
+        with self.lock:
+            if delivery_id in self.owners:
+                slot = self.owners.index(delivery_id)
+            elif None in self.owners:
+                slot = self.owners.index(None)
+            else:
+                raise ValueError("Face gallery is full")
+            rows = self.matrix[slot * self.per_slot:(slot + 1) * self.per_slot]
+            rows[:len(embeddings)] = embeddings
+            rows[len(embeddings):] = 0
+            self.owners[slot] = delivery_id
+
+    def remove(self, delivery_id):
+        with self.lock:
+            if delivery_id in self.owners:
+                slot = self.owners.index(delivery_id)
+                self.matrix[slot * self.per_slot:(slot + 1) * self.per_slot] = 0
+                self.owners[slot] = None
+
+    def retain(self, delivery_ids):
+        for delivery_id in list(self.owners):
+            if delivery_id is not None and delivery_id not in delivery_ids:
+                self.remove(delivery_id)
+
+    def scores(self, embeddings, delivery_id=None):
+        """(frames x slots) best cosine similarity per slot; other slots are -1 when delivery_id is given"""
+        with self.lock:
+            similarity = embeddings @ self.matrix.T
+            best = similarity.reshape(len(embeddings), len(self.owners), self.per_slot).max(axis=2)
+            if delivery_id is not None:
+                best[:, [owner != delivery_id for owner in self.owners]] = -1.0
+            return best, list(self.owners)
+
+
+class FaceVerifier:
+    """Matches camera frames against the gallery in batches.
+
+    A frame scoring confident or above matches at once; otherwise a delivery
+    needs votes frames above threshold. Frames are pulled lazily from the
+    iterable, so an early match also stops the capture.
+    """
+
+    def __init__(self, detector, embedder, camera=None, slots=4, per_slot=8, threshold=0.5,
+                 confident=0.7, votes=3, batch_size=4, max_frames=30):
+        self.detector = detector
+        self.embedder = embedder
+        self.camera = camera
+        self.gallery = FaceGallery(self.embedder.dim, slots, per_slot)
+        self.threshold = threshold
+        self.confident = confident
+        self.votes = votes
+        self.max_frames = max_frames
+        self.crops = np.zeros((batch_size, self.embedder.size, self.embedder.size), dtype=np.float32)
+        # One camera and one crop buffer, so one verification at a time
+        self.lock = threading.Lock()
+        self.verifications = 0
+        self.frames_seen = 0
+        self.seconds = 0.0
+
+    def match(self, frames=None, delivery_id=None):
+        """(delivery_id, score) of the owner in front of the camera, or None"""
+        if frames is None:
+            if self.camera is None:
+                raise ValueError("No camera for face verification")
+            frames = self.camera.frames(self.max_frames)
+        with self.lock:
+            return self.match_frames(frames, delivery_id)
+
+    def match_frames(self, frames, delivery_id):
+        start = time.perf_counter()
+        votes = {}
+        count = seen = 0
+        result = None
+        for frame in frames:
+            seen += 1
+            boxes = self.detector.detect(frame)
+            if boxes:
+                crop(frame, boxes[0], self.crops[count])
+                count += 1
+            if count == len(self.crops):
+                result = self.decide(count, delivery_id, votes)
+                count = 0
+                if result:
+                    break
+            if seen >= self.max_frames:
+                break
+        if count and not result:
+            result = self.decide(count, delivery_id, votes)
+        elapsed = time.perf_counter() - start
+        MATCH_TIME.observe(elapsed)
+        self.verifications += 1
+        self.frames_seen += seen
+        self.seconds += elapsed
+        return result
+
+    def decide(self, count, delivery_id, votes):
+        embeddings = self.embedder.embed(self.crops[:count])
+        best, owners = self.gallery.scores(embeddings, delivery_id)
+        for frame_scores in best:
+            slot = int(frame_scores.argmax())
+            score = float(frame_scores[slot])
+            if owners[slot] is None or score < self.threshold:
+                continue
+            if score >= self.confident:
+                return owners[slot], score
+            scores = votes.setdefault(owners[slot], [])
+            scores.append(score)
+            if len(scores) >= self.votes:
+                return owners[slot], sum(scores) / len(scores)
+        return None
+
+    def stats(self):
+        return {
+            'verifications': self.verifications,
+            'frames': self.frames_seen,
+            'mean_ms': self.seconds / self.verifications * 1000 if self.verifications else 0.0,
+            'fps': self.frames_seen / self.seconds if self.seconds else 0.0
+        }
+
+
+class Camera:
+    """Frames from a V4L2 camera through OpenCV (needs opencv-python)"""
+
+    def __init__(self, index=0, width=320, height=240):
+        import cv2
+        self.cv2 = cv2
+        self.index = index
+        self.width = width
+        self.height = height
+
+    def frames(self, limit):
+        capture = self.cv2.VideoCapture(self.index)
+        capture.set(self.cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        capture.set(self.cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        try:
+            for _ in range(limit):
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                yield frame
+        finally:
+            capture.release()
+
+
+def build_face_verifier(options, compartments=4):
+    """FaceVerifier from a config.face_verification dict, or None when no embedding model is configured"""
+    if not options.get('model'):
+        # ProjectionEmbedder cannot tell people apart, so it must never open a compartment
+        print("Face verification needs an embedding model in config.face_verification['model'], face unlock disabled")
+        return None
+    detector = HaarDetector() if options.get('detector') == 'haar' else CenterDetector()
+    embedder = OnnxEmbedder(options['model'])
+    camera = Camera(options.get('camera', 0))
+    return FaceVerifier(detector, embedder, camera, slots=compartments,
+                        threshold=options.get('threshold', 0.5), confident=options.get('confident', 0.7))
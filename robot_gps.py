@@ -0,0 +1,287 @@
+import math
+import time
+import threading
+from functools import reduce
+from operator import xor
+from collections import namedtuple
+
+import numpy as np
+
+from robot_navigation import METERS_PER_DEGREE
+
+KNOTS_TO_MPS = 0.514444
+# Rough 1-sigma position error of a consumer GPS per unit of HDOP, in metres
+UERE = 3.0
+
+Fix = namedtuple("Fix", "time lat lon quality hdop speed course")
+Position = namedtuple("Position", "time lat lon speed heading accuracy")
+
+
+def parse_coordinate(value, hemisphere):
+    """ddmm.mmmm (or dddmm.mmmm) bytes and N/S/E/W to signed degrees"""
+    raw = float(value)
+    degrees = int(raw // 100)
+    result = degrees + (raw - degrees * 100) / 60
+    return -result if hemisphere in (b"S", b"W") else result
+
+
+def parse_time(value):
+    """hhmmss.ss bytes to seconds since midnight UTC"""
+    raw = float(value)
+    hours = int(raw // 10000)
+    minutes = int(raw // 100) % 100
+    return hours * 3600 + minutes * 60 + raw % 100
+
+
+class NmeaParser:
+    """Incremental NMEA 0183 parser for GGA and RMC sentences.
+
+    feed() takes raw bytes in any chunking and returns the complete fixes they
+    finish. Lines stay bytes throughout; fields are converted with float() on
+    the byte slices. A fix is produced per GGA with a valid position, using the
+    speed and course of the latest RMC; receivers that send only RMC get a fix
+    per RMC instead.
+    """
+
+    def __init__(self, max_line=128):
+        self.buffer = bytearray()
+        self.max_line = max_line
+        self.speed = 0.0
+        self.course = 0.0
+        self.seen_gga = False
+        self.sentences = 0
+        self.bad_checksums = 0
+
+    def feed(self, data):
+        self.buffer += data
+        fixes = []
+        start = 0
+        buffer = self.buffer
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            fix = self.parse_line(buffer, start, end)
+            if fix:
+                fixes.append(fix)
+            start = end + 1
+        if start:
+            del buffer[:start]
+        if len(buffer) > self.max_line:
+            # Garbage without line breaks, e.g. the wrong baud rate
+            del buffer[:-self.max_line]
+        return fixes
+
+    def parse_line(self, buffer, start, end):
+        dollar = buffer.find(b"$", start, end)
+        star = buffer.find(b"*", start, end)
+        if dollar < 0 or star < dollar or end - star < 3:
+            return None
+        self.sentences += 1
+        try:
+            checksum = int(buffer[star + 1:star + 3], 16)
+        except ValueError:
+            checksum = -1
+        body = buffer[dollar + 1:star]
+        if reduce(xor, body, 0) != checksum:
+            self.bad_checksums += 1
+            return None
+        kind = body[2:5]
+        try:
+            if kind == b"GGA":
+                return self.parse_gga(body.split(b","))
+            if kind == b"RMC":
+                return self.parse_rmc(body.split(b","))
+        except (ValueError, IndexError):
+            return None
+        return None
+
+    def parse_gga(self, fields):
+        self.seen_gga = True
+        quality = int(fields[6] or 0)
+        if not quality or not fields[2] or not fields[4]:
+            return None
+        return Fix(parse_time(fields[1]), parse_coordinate(fields[2], fields[3]),
+                   parse_coordinate(fields[4], fields[5]), quality, float(fields[8] or 99.0),
+                   self.speed, self.course)
+
+    def parse_rmc(self, fields):
+        if fields[2] != b"A":
+            return None
+        self.speed = float(fields[7] or 0) * KNOTS_TO_MPS
+        self.course = float(fields[8] or self.course)
+        if self.seen_gga:
+            return None
+        return Fix(parse_time(fields[1]), parse_coordinate(fields[3], fields[4]),
+                   parse_coordinate(fields[5], fields[6]), 1, 1.0, self.speed, self.course)
+
+
+class FixBuffer:
+    """The last capacity fixes and filtered positions in preallocated NumPy columns"""
+
+    COLUMNS = ("time", "lat", "lon", "hdop", "east", "north", "filtered_east", "filtered_north")
+
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.data = np.zeros((len(self.COLUMNS), capacity))
+        self.index = 0
+        self.count = 0
+
+    def push(self, *values):
+        self.data[:, self.index] = values
+        self.index = (self.index + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def recent(self, n=None):
+        """{column: array} of the newest n rows, oldest first"""
+        n = min(n or self.count, self.count)
+        rows = (np.arange(self.index - n, self.index)) % self.capacity
+        return {name: self.data[i, rows] for i, name in enumerate(self.COLUMNS)}
+
+
+class KalmanFilter:
+    """Constant-velocity Kalman filter on local east/north metres.
+
+    Both axes share dt and measurement noise, so they share one covariance and
+    their states are updated together as arrays.
+    """
+
+    def __init__(self, accel_noise=0.5):
+        self.accel_noise = accel_noise
+        self.position = np.zeros(2)
+        self.velocity = np.zeros(2)
+        self.p00 = self.p01 = self.p11 = 0.0
+        self.time = None
+
+    def update(self, t, measured, variance):
+        measured = np.asarray(measured, dtype=float)
+        if self.time is None:
+            self.position[:] = measured
+            self.velocity[:] = 0.0
+            self.p00, self.p01, self.p11 = variance, 0.0, 25.0
+            self.time = t
+            return self.position
+        dt = t - self.time
+        if dt < -43200:
+            dt += 86400  # GPS time wrapped at midnight
+        dt = max(dt, 1e-3)
+        self.time = t
+        # Predict with F = [[1, dt], [0, 1]] and white acceleration noise
+        q = self.accel_noise
+        p00 = self.p00 + dt * (2 * self.p01 + dt * self.p11) + q * dt ** 4 / 4
+        p01 = self.p01 + dt * self.p11 + q * dt ** 3 / 2
+        p11 = self.p11 + q * dt ** 2
+        self.position += dt * self.velocity
+        # Update with a position measurement
+        k0 = p00 / (p00 + variance)
+        k1 = p01 / (p00 + variance)
+        innovation = measured - self.position
+        self.position += k0 * innovation
+        self.velocity += k1 * innovation
+        self.p00 = (1 - k0) * p00
+        self.p01 = (1 - k0) * p01
+        self.p11 = p11 - k1 * p01
+        return self.position
+
+
+class GpsReader:
+    """Reads NMEA from a serial port or replay file and keeps the latest filtered position.
+
+    latest is replaced (never mutated) on each fix, so readers on other threads
+    get a consistent Position in O(1) without locking. on_position, if given, is
+    called from the reader thread with each new Position.
+    """
+
+    def __init__(self, stream, on_position=None, buffer_size=1024, realtime=False, accel_noise=0.5):
+        self.stream = stream
+        self.on_position = on_position
+        self.realtime = realtime
+        self.parser = NmeaParser()
+        self.filter = KalmanFilter(accel_noise)
+        self.fixes = FixBuffer(buffer_size)
+        self.origin = None
+        self.latest = None
+        self.thread = None
+        self.running = False
+        self.replay_start = None
+
+    @classmethod
+    def open_serial(cls, port, baud=9600, **kwargs):
+        import serial
+        return cls(serial.Serial(port, baud, timeout=1), **kwargs)
+
+    @classmethod
+    def open_replay(cls, path, **kwargs):
+        return cls(open(path, "rb"), **kwargs)
+
+    def read_chunk(self):
+        # Serial ports: take what has arrived rather than waiting for a full chunk
+        waiting = getattr(self.stream, "in_waiting", None)
+        return self.stream.read(max(waiting, 1) if waiting is not None else 4096)
+
+    def process(self, data):
+        for fix in self.parser.feed(data):
+            self.handle(fix)
+
+    def handle(self, fix):
+        if self.origin is None:
+            self.origin = (fix.lat, fix.lon, math.cos(math.radians(fix.lat)))
+        lat0, lon0, cos_lat0 = self.origin
+        east = (fix.lon - lon0) * METERS_PER_DEGREE * cos_lat0
+        north = (fix.lat - lat0) * METERS_PER_DEGREE
+        accuracy = fix.hdop * UERE
+        if self.realtime:
+            self.wait_for(fix.time)
+        filtered_east, filtered_north = self.filter.update(fix.time, (east, north), accuracy ** 2).tolist()
+        self.fixes.push(fix.time, fix.lat, fix.lon, fix.hdop, east, north, filtered_east, filtered_north)
+        v_east, v_north = self.filter.velocity.tolist()
+        speed = math.hypot(v_east, v_north)
+        heading = math.degrees(math.atan2(v_east, v_north)) % 360 if speed > 0.2 else fix.course
+        self.latest = Position(time.time(), lat0 + filtered_north / METERS_PER_DEGREE,
+                               lon0 + filtered_east / (METERS_PER_DEGREE * cos_lat0), speed, heading, accuracy)
+        if self.on_position:
+            self.on_position(self.latest)
+
+    def wait_for(self, fix_time):
+        now = time.monotonic()
+        if self.replay_start is None:
+            self.replay_start = (now, fix_time)
+        delay = self.replay_start[0] + (fix_time - self.replay_start[1]) - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def run(self):
+        while self.running:
+            try:
+                data = self.read_chunk()
+            except Exception as e:
+                print(f"Error reading GPS: {e}")
+                time.sleep(1)
+                continue
+            if not data:
+                if not hasattr(self.stream, "in_waiting"):
+                    break  # end of a replay file
+                continue
+            self.process(data)
+
+    def start(self):
+        if self.thread is None:
+            self.running = True
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def distance_to(self, lat, lon):
+        """Metres from the latest filtered position, or None before the first fix"""
+        latest = self.latest
+        if latest is None:
+            return None
+        d_north = (lat - latest.lat) * METERS_PER_DEGREE
+        d_east = (lon - latest.lon) * METERS_PER_DEGREE * math.cos(math.radians(latest.lat))
+        return math.hypot(d_north, d_east)
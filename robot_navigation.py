@@ -0,0 +1,478 @@
+import math
+import time
+import heapq
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+INF = float("inf")
+SQRT2 = math.sqrt(2)
+# (d_col, d_row, cost) on the 8-connected grid
+MOVES = ((1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0),
+         (1, 1, SQRT2), (1, -1, SQRT2), (-1, 1, SQRT2), (-1, -1, SQRT2))
+METERS_PER_DEGREE = 111320.0
+
+# Log-odds added per lidar hit and per pass-through, and the clamp that keeps cells changeable
+LOG_ODDS_HIT = 0.85
+LOG_ODDS_MISS = -0.4
+LOG_ODDS_LIMIT = 4.0
+
+
+def dilate(mask, radius):
+    """Grow True cells by radius cells in every direction (square kernel, separable)"""
+    if radius <= 0:
+        return mask.copy()
+    out = mask.copy()
+    for shift in range(1, radius + 1):
+        out[shift:, :] |= mask[:-shift, :]
+        out[:-shift, :] |= mask[shift:, :]
+    rows = out.copy()
+    for shift in range(1, radius + 1):
+        out[:, shift:] |= rows[:, :-shift]
+        out[:, :-shift] |= rows[:, shift:]
+    return out
+
+
+class OccupancyGrid:
+    """Occupancy grid in metres, updated from lidar-style scans.
+
+    Cells hold log-odds of being occupied. blocked is the occupied set grown by
+    the robot's radius, which is what the planners treat as impassable. Cells
+    are (col, row) with (0, 0) at origin.
+    """
+
+    def __init__(self, width_m, height_m, resolution=0.25, robot_radius=0.3, origin=(0.0, 0.0)):
+        self.resolution = resolution
+        self.origin = origin
+        self.width = int(math.ceil(width_m / resolution))
+        self.height = int(math.ceil(height_m / resolution))
+        self.inflation = int(math.ceil(robot_radius / resolution))
+        self.log_odds = np.zeros((self.height, self.width), dtype=np.float32)
+        self.blocked = np.zeros((self.height, self.width), dtype=bool)
+        self.version = 0
+
+    def to_cell(self, x, y):
+        return (int((x - self.origin[0]) / self.resolution), int((y - self.origin[1]) / self.resolution))
+
+    def to_world(self, cell):
+        return (self.origin[0] + (cell[0] + 0.5) * self.resolution,
+                self.origin[1] + (cell[1] + 0.5) * self.resolution)
+
+    def in_bounds(self, cell):
+        return 0 <= cell[0] < self.width and 0 <= cell[1] < self.height
+
+    def set_obstacle(self, x0, y0, x1, y1, occupied=True):
+        """Mark a rectangle in metres as known obstacle (or free); returns the changed blocked cells"""
+        c0, r0 = self.to_cell(min(x0, x1), min(y0, y1))
+        c1, r1 = self.to_cell(max(x0, x1), max(y0, y1))
+        c0, r0 = max(c0, 0), max(r0, 0)
+        c1, r1 = min(c1, self.width - 1), min(r1, self.height - 1)
+        self.log_odds[r0:r1 + 1, c0:c1 + 1] = LOG_ODDS_LIMIT if occupied else -LOG_ODDS_LIMIT
+        return self.refresh(r0, r1, c0, c1)
+
+    def update_scan(self, pose, angles, ranges, max_range):
+        """Fold one scan taken at pose (x, y, heading radians) into the grid.
+
+        angles and ranges are arrays, angles relative to the heading; a range of
+        max_range or more means the beam hit nothing. Returns the changed
+        blocked cells.
+        """
+        x, y, heading = pose
+        angles = np.asarray(angles, dtype=np.float64) + heading
+        ranges = np.minimum(np.asarray(ranges, dtype=np.float64), max_range)
+        step = self.resolution / 2
+        distances = np.arange(0, max_range, step)
+        # Sample every beam every half cell, up to where it ended
+        along = distances[None, :] < ranges[:, None]
+        xs = x + np.cos(angles)[:, None] * distances[None, :]
+        ys = y + np.sin(angles)[:, None] * distances[None, :]
+        cols = ((xs - self.origin[0]) / self.resolution).astype(np.int64)
+        rows = ((ys - self.origin[1]) / self.resolution).astype(np.int64)
+        inside = along & (cols >= 0) & (cols < self.width) & (rows >= 0) & (rows < self.height)
+        free = np.unique(rows[inside] * self.width + cols[inside])
+
+        hit = ranges < max_range
+        hit_cols = ((x + np.cos(angles[hit]) * ranges[hit] - self.origin[0]) / self.resolution).astype(np.int64)
+        hit_rows = ((y + np.sin(angles[hit]) * ranges[hit] - self.origin[1]) / self.resolution).astype(np.int64)
+        hit_inside = (hit_cols >= 0) & (hit_cols < self.width) & (hit_rows >= 0) & (hit_rows < self.height)
+        hits = np.unique(hit_rows[hit_inside] * self.width + hit_cols[hit_inside])
+        free = np.setdiff1d(free, hits, assume_unique=True)
+
+        flat = self.log_odds.reshape(-1)
+        flat[free] += LOG_ODDS_MISS
+        flat[hits] += LOG_ODDS_HIT
+        touched = np.concatenate([free, hits])
+        if not len(touched):
+            return []
+        flat[touched] = np.clip(flat[touched], -LOG_ODDS_LIMIT, LOG_ODDS_LIMIT)
+        touched_rows, touched_cols = np.divmod(touched, self.width)
+        return self.refresh(touched_rows.min(), touched_rows.max(), touched_cols.min(), touched_cols.max())
+
+    def refresh(self, r0, r1, c0, c1):
+        """Recompute blocked around rows r0..r1, cols c0..c1; returns [((col, row), blocked)] that changed"""
+        pad = self.inflation
+        # blocked cells up to pad away can change; occupancy up to 2 * pad away decides them
+        wr0, wr1 = max(r0 - 2 * pad, 0), min(r1 + 2 * pad, self.height - 1)
+        wc0, wc1 = max(c0 - 2 * pad, 0), min(c1 + 2 * pad, self.width - 1)
+        grown = dilate(self.log_odds[wr0:wr1 + 1, wc0:wc1 + 1] > 0, pad)
+        br0, br1 = max(r0 - pad, 0), min(r1 + pad, self.height - 1)
+        bc0, bc1 = max(c0 - pad, 0), min(c1 + pad, self.width - 1)
+        new = grown[br0 - wr0:br1 - wr0 + 1, bc0 - wc0:bc1 - wc0 + 1]
+        old = self.blocked[br0:br1 + 1, bc0:bc1 + 1]
+        rows, cols = np.nonzero(new != old)
+        changed = [((int(c) + bc0, int(r) + br0), bool(new[r, c])) for r, c in zip(rows, cols)]
+        if changed:
+            self.blocked[br0:br1 + 1, bc0:bc1 + 1] = new
+            self.version += 1
+        return changed
+
+
+def octile(a_col, a_row, b_col, b_row):
+    dx = abs(a_col - b_col)
+    dy = abs(a_row - b_row)
+    return dx + dy + (SQRT2 - 2) * min(dx, dy)
+
+
+class GridGraph:
+    """Flat-indexed 8-connected view of a blocked mask, without corner cutting"""
+
+    def __init__(self, blocked):
+        self.height, self.width = blocked.shape
+        self.cells = bytearray(blocked.tobytes())
+
+    def node(self, cell):
+        return cell[1] * self.width + cell[0]
+
+    def cell(self, node):
+        row, col = divmod(node, self.width)
+        return col, row
+
+    def free(self, node):
+        return not self.cells[node]
+
+    def neighbors(self, node):
+        """Every in-bounds neighbor, passable or not"""
+        row, col = divmod(node, self.width)
+        for d_col, d_row, _ in MOVES:
+            c, r = col + d_col, row + d_row
+            if 0 <= c < self.width and 0 <= r < self.height:
+                yield r * self.width + c
+
+    def edges(self, node):
+        """(neighbor, cost) for every move the robot can make from node"""
+        cells = self.cells
+        if cells[node]:
+            return
+        width = self.width
+        row, col = divmod(node, width)
+        for d_col, d_row, cost in MOVES:
+            c, r = col + d_col, row + d_row
+            if not (0 <= c < width and 0 <= r < self.height) or cells[r * width + c]:
+                continue
+            if d_col and d_row and (cells[row * width + c] or cells[r * width + col]):
+                continue
+            yield r * width + c, cost
+
+    def heuristic(self, a, b):
+        a_row, a_col = divmod(a, self.width)
+        b_row, b_col = divmod(b, self.width)
+        return octile(a_col, a_row, b_col, b_row)
+
+
+def astar(graph, start, goal):
+    """Shortest path of nodes from start to goal, or None if goal cannot be reached"""
+    if not (graph.free(start) and graph.free(goal)):
+        return None
+    g = {start: 0.0}
+    came_from = {}
+    frontier = [(graph.heuristic(start, goal), 0.0, start)]
+    closed = set()
+    while frontier:
+        _, cost, node = heapq.heappop(frontier)
+        if node == goal:
+            path = [node]
+            while node in came_from:
+                node = came_from[node]
+                path.append(node)
+            return path[::-1]
+        if node in closed:
+            continue
+        closed.add(node)
+        for neighbor, step in graph.edges(node):
+            new_cost = cost + step
+            if new_cost < g.get(neighbor, INF):
+                g[neighbor] = new_cost
+                came_from[neighbor] = node
+                heapq.heappush(frontier, (new_cost + graph.heuristic(neighbor, goal), new_cost, neighbor))
+    return None
+
+
+class DStarLite:
+    """D* Lite (Koenig & Likhachev): searches back from the goal and, after cells
+    change or the robot moves, repairs only the part of the search they affect"""
+
+    def __init__(self, graph, start, goal):
+        self.graph = graph
+        self.start = start
+        self.start_col, self.start_row = graph.cell(start)
+        self.last = start
+        self.goal = goal
+        self.km = 0.0
+        self.g = {}
+        self.rhs = {goal: 0.0}
+        self.queue = []
+        self.queued = {}  # node -> key it is queued under; heap entries with another key are stale
+        self.expanded = 0
+        self.push(goal)
+
+    def key(self, node):
+        best = min(self.g.get(node, INF), self.rhs.get(node, INF))
+        row, col = divmod(node, self.graph.width)
+        dx = abs(col - self.start_col)
+        dy = abs(row - self.start_row)
+        return (best + dx + dy + (SQRT2 - 2) * min(dx, dy) + self.km, best)
+
+    def push(self, node):
+        key = self.key(node)
+        self.queued[node] = key
+        heapq.heappush(self.queue, (key, node))
+
+    def update_vertex(self, node):
+        if node != self.goal:
+            g = self.g
+            self.rhs[node] = min((cost + g.get(neighbor, INF) for neighbor, cost in self.graph.edges(node)),
+                                 default=INF)
+        if self.g.get(node, INF) != self.rhs.get(node, INF):
+            self.push(node)
+        else:
+            self.queued.pop(node, None)
+
+    def compute(self):
+        queue, queued, g, rhs = self.queue, self.queued, self.g, self.rhs
+        while queue:
+            key, node = queue[0]
+            if queued.get(node) != key:
+                heapq.heappop(queue)
+                continue
+            if not (key < self.key(self.start) or rhs.get(self.start, INF) != g.get(self.start, INF)):
+                break
+            heapq.heappop(queue)
+            new_key = self.key(node)
+            if key < new_key:
+                queued[node] = new_key
+                heapq.heappush(queue, (new_key, node))
+                continue
+            del queued[node]
+            self.expanded += 1
+            node_rhs = rhs.get(node, INF)
+            if g.get(node, INF) > node_rhs:
+                # Cost to goal dropped: neighbors can only improve by going through node
+                g[node] = node_rhs
+                for neighbor, cost in self.graph.edges(node):
+                    if neighbor != self.goal and cost + node_rhs < rhs.get(neighbor, INF):
+                        rhs[neighbor] = cost + node_rhs
+                        if g.get(neighbor, INF) != rhs[neighbor]:
+                            self.push(neighbor)
+                        else:
+                            queued.pop(neighbor, None)
+            else:
+                g[node] = INF
+                self.update_vertex(node)
+                for neighbor in self.graph.neighbors(node):
+                    self.update_vertex(neighbor)
+
+    def move_to(self, node):
+        self.km += self.graph.heuristic(self.last, node)
+        self.last = node
+        self.start = node
+        self.start_col, self.start_row = self.graph.cell(node)
+
+    def update_cells(self, changed):
+        """Apply [((col, row), blocked)] from OccupancyGrid and repair the affected vertices"""
+        graph = self.graph
+        touched = set()
+        for cell, blocked in changed:
+            node = graph.node(cell)
+            graph.cells[node] = 1 if blocked else 0
+            touched.add(node)
+            touched.update(graph.neighbors(node))
+        for node in touched:
+            self.update_vertex(node)
+
+    def path(self):
+        """Follow the cheapest edges from start to goal; None if the goal is cut off"""
+        if self.g.get(self.start, INF) == INF:
+            return None
+        node = self.start
+        path = [node]
+        seen = {node}
+        while node != self.goal:
+            node = min(self.graph.edges(node), key=lambda edge: edge[1] + self.g.get(edge[0], INF),
+                       default=(None, 0))[0]
+            if node is None or node in seen:
+                return None
+            seen.add(node)
+            path.append(node)
+        return path
+
+
+class RouteCache:
+    """Planned routes between named waypoints, dropped when a cell on them becomes blocked"""
+
+    def __init__(self, size=32):
+        self.size = size
+        self.routes = OrderedDict()  # (from, to) -> (path, set of nodes)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, start, goal):
+        route = self.routes.get((start, goal))
+        if route is None:
+            self.misses += 1
+            return None
+        self.routes.move_to_end((start, goal))
+        self.hits += 1
+        return route[0]
+
+    def put(self, start, goal, path):
+        self.routes[(start, goal)] = (path, set(path))
+        self.routes.move_to_end((start, goal))
+        while len(self.routes) > self.size:
+            self.routes.popitem(last=False)
+
+    def invalidate(self, graph, changed):
+        newly_blocked = {graph.node(cell) for cell, blocked in changed if blocked}
+        if newly_blocked:
+            for key in [key for key, (_, nodes) in self.routes.items() if not nodes.isdisjoint(newly_blocked)]:
+                del self.routes[key]
+
+
+class LocationError(ValueError):
+    """A location the map cannot place: unknown waypoint, lat/lng without a geo origin, or off the map"""
+
+
+class Navigator:
+    """Plans and follows routes on an OccupancyGrid.
+
+    drive(x, y) moves the robot to the next point and returns once it is there;
+    without it the robot is simulated and jumps along the path. sense(pose), if
+    given, returns a scan (angles, ranges, max_range) that is folded into the
+    grid after each step; when it changes the grid the route is repaired with
+    D* Lite. Routes between named waypoints are cached.
+    """
+
+    def __init__(self, grid, waypoints=None, geo_origin=None, pose=(0.0, 0.0, 0.0), drive=None, sense=None,
+                 cache_size=32):
+        self.grid = grid
+        self.waypoints = dict(waypoints or {})
+        self.geo_origin = geo_origin
+        self.pose = pose
+        self.drive = drive
+        self.sense = sense
+        self.routes = RouteCache(cache_size)
+        self.lock = threading.Lock()
+        self.plans = 0
+        self.replans = 0
+        self.plan_seconds = 0.0
+        self.replan_seconds = 0.0
+
+    def resolve(self, target):
+        """(x, y) in metres for a waypoint name, {'x', 'y'} or {'lat', 'lng'} (needs geo_origin)"""
+        if isinstance(target, str):
+            if target not in self.waypoints:
+                raise LocationError(f"Unknown waypoint {target!r}")
+            return self.waypoints[target]
+        if isinstance(target, dict) and 'x' in target and 'y' in target:
+            return float(target['x']), float(target['y'])
+        if isinstance(target, dict) and 'lat' in target and ('lng' in target or 'lon' in target):
+            if not self.geo_origin:
+                raise LocationError("Map has no geo origin for lat/lng locations")
+            lat0, lon0 = self.geo_origin
+            lon = target.get('lng', target.get('lon'))
+            return ((lon - lon0) * METERS_PER_DEGREE * math.cos(math.radians(lat0)),
+                    (target['lat'] - lat0) * METERS_PER_DEGREE)
+        raise LocationError(f"Cannot resolve location {target!r}")
+
+    def waypoint_at(self, cell):
+        for name, point in self.waypoints.items():
+            if self.grid.to_cell(*point) == cell:
+                return name
+        return None
+
+    def plan(self, start_cell, goal_cell, graph):
+        start_name = self.waypoint_at(start_cell)
+        goal_name = self.waypoint_at(goal_cell)
+        if start_name and goal_name:
+            path = self.routes.get(start_name, goal_name)
+            if path is not None:
+                return path
+        started = time.perf_counter()
+        path = astar(graph, graph.node(start_cell), graph.node(goal_cell))
+        self.plan_seconds += time.perf_counter() - started
+        self.plans += 1
+        if path is not None and start_name and goal_name:
+            self.routes.put(start_name, goal_name, path)
+        return path
+
+    def navigate_to(self, target):
+        """Drive to target; returns the path taken in metres.
+
+        Raises LocationError if the map cannot place target, ValueError if there is no route.
+        """
+        with self.lock:
+            goal_cell = self.grid.to_cell(*self.resolve(target))
+            start_cell = self.grid.to_cell(*self.pose[:2])
+            if not (self.grid.in_bounds(start_cell) and self.grid.in_bounds(goal_cell)):
+                raise LocationError("Location is off the map")
+            graph = GridGraph(self.grid.blocked)
+            path = self.plan(start_cell, goal_cell, graph)
+            if path is None:
+                raise ValueError(f"No route to {target!r}")
+            planner = None
+            travelled = []
+            nodes = [path[0]]
+            index = 1
+            while index < len(path):
+                node = path[index]
+                x, y = self.grid.to_world(graph.cell(node))
+                previous = self.pose
+                if self.drive:
+                    self.drive(x, y)
+                self.pose = (x, y, math.atan2(y - previous[1], x - previous[0]))
+                travelled.append((x, y))
+                nodes.append(node)
+                index += 1
+                changed = self.grid.update_scan(self.pose, *self.sense(self.pose)) if self.sense else []
+                if not changed:
+                    continue
+                self.routes.invalidate(graph, changed)
+                started = time.perf_counter()
+                if planner is None:
+                    # First change on this trip: search from scratch once, later changes are repaired
+                    planner = DStarLite(graph, node, graph.node(goal_cell))
+                else:
+                    planner.move_to(node)
+                planner.update_cells(changed)
+                planner.compute()
+                path, index = planner.path(), 1
+                self.replan_seconds += time.perf_counter() - started
+                self.replans += 1
+                if path is None:
+                    raise ValueError(f"Route to {target!r} is blocked")
+            start_name = self.waypoint_at(start_cell)
+            goal_name = self.waypoint_at(goal_cell)
+            if planner and start_name and goal_name:
+                # The route as driven avoids everything found on the way
+                self.routes.put(start_name, goal_name, nodes)
+            return travelled
+
+    def stats(self):
+        return {
+            'plans': self.plans,
+            'replans': self.replans,
+            'plan_ms': self.plan_seconds * 1000,
+            'replan_ms': self.replan_seconds * 1000,
+            'route_cache_hits': self.routes.hits,
+            'route_cache_misses': self.routes.misses
+        }
@@ -1,29 +1,70 @@
 import tkinter as tk
 from tkinter import ttk
 import time
-import requests
+import queue
+import threading
+from robot_outbox import Outbox, PermanentError, make_session, DEFAULT_TIMEOUT
+from robot_otp_registry import OTPRegistry
+import metrics
+
+# How often the keypad's Tk loop picks up show/hide commands from other threads
+KEYPAD_POLL_MS = 10
+
+SERVER_TIME = metrics.histogram("robot_verification_post_seconds", "Time to report a verification to the server")
+VERIFICATIONS = metrics.counter("robot_verifications_total", "Compartments opened, by method", method="otp")
+FACE_VERIFICATIONS = metrics.counter("robot_verifications_total", "Compartments opened, by method", method="face")
+REJECTED_CODES = metrics.counter("robot_rejected_codes_total", "Wrong codes entered on the keypad")
 
 class OTPVerifier:
-    def __init__(self):
-        self.current_otp = None
+    def __init__(self, server_url="http://192.168.0.217:5000/api/owner/deliveries", outbox_dir="otp_outbox",
+                 compartments=4, face_verifier=None, otp_ttl=3600):
+        # Every delivery on board, by compartment; current_delivery_id is the one the robot has arrived with
+        self.registry = OTPRegistry(compartments, ttl=otp_ttl)
         self.current_delivery_id = None
         self.otp_window = None
         self.door_callback = None
-        self.server_url = "http://192.168.0.217:5000/api/owner/deliveries"
+        # The keypad is built once and driven from MQTT workers through this queue
+        self.commands = queue.Queue()
+        self.show_requested_at = None
+        self.show_latencies = []
+        self.server_url = server_url
+        self.timeout = DEFAULT_TIMEOUT
+        self.session = make_session()
+        # ownerId per delivery, fetched when the OTP arrives so verifying is a single POST
+        self.owner_ids = {}
+        self.outbox = Outbox(self.deliver_verification, outbox_dir).start()
+        # Optional face match as an alternative to the PIN; owners' embeddings are fetched with the ownerId
+        self.face_verifier = face_verifier
 
     def set_door_callback(self, callback):
         self.door_callback = callback
 
-    def set_otp(self, otp, delivery_id):
-        self.current_otp = otp
+    def set_otp(self, otp, delivery_id, compartment=None):
+        """Register a delivery's OTP and show the keypad; returns its compartment"""
+        compartment = self.registry.register(delivery_id, otp, compartment)
+        threading.Thread(target=self.prefetch, args=(delivery_id,), daemon=True).start()
+        if self.otp_window is not None:
+            self.commands.put(('show', time.monotonic()))
+        return compartment
+
+    def serve(self, delivery_id):
+        """Hand over delivery_id next: the keypad and face match accept only its owner until it is opened"""
         self.current_delivery_id = delivery_id
-        self.create_otp_window()
 
-    def create_otp_window(self):
-        if self.otp_window is not None:
-            self.otp_window.destroy()
-        
-        self.otp_window = tk.Tk()
+    def hide_keypad(self):
+        self.commands.put(('hide', time.monotonic()))
+
+    def build_keypad(self):
+        """Create the hidden keypad window; must run on the thread that will call run_keypad.
+
+        Returns False when there is no display to show it on.
+        """
+        try:
+            self.otp_window = tk.Tk()
+        except tk.TclError as e:
+            print(f"No display for the OTP keypad: {e}")
+            return False
+        self.otp_window.withdraw()
         window_width = 800
         window_height = 450
         screen_width = self.otp_window.winfo_screenwidth()
@@ -41,7 +82,6 @@ class OTPVerifier:
         # PIN display
         self.pin = ""
         self.pin_var = tk.StringVar()
-        self.error_label= ""
         
         # Create and configure display frame
         display_frame = tk.Frame(main_frame, bg='#000000')
@@ -58,6 +98,9 @@ class OTPVerifier:
             justify='center'
         )
         self.pin_entry.pack(fill='x', ipady=15)
+
+        self.error_label = tk.Label(display_frame, text="", font=('Arial', 16), fg='#ff0000', bg='#000000')
+        self.error_label.pack(fill='x', pady=(10, 0))
         
         # Create keypad frame
         keypad_frame = tk.Frame(main_frame, bg='#000000')
@@ -119,11 +162,48 @@ class OTPVerifier:
                 if i < 3:  # Horizontal lines
                     separator = tk.Frame(keypad_frame, height=1, bg='#ffffff')
                     separator.grid(row=i, column=j, sticky='sew', padx=10, pady=(0, 0))
-                    
-        
 
+        self.otp_window.bind('<Map>', self.on_keypad_mapped)
+        return True
+
+    def run_keypad(self):
+        """Run the keypad's Tk loop on this thread until the window is destroyed"""
+        self.otp_window.after(KEYPAD_POLL_MS, self.process_commands)
         self.otp_window.mainloop()
 
+    def process_commands(self):
+        try:
+            while True:
+                command, requested_at = self.commands.get_nowait()
+                if command == 'show':
+                    self.reset_keypad()
+                    self.show_requested_at = requested_at
+                    if self.otp_window.winfo_viewable():
+                        self.record_show_latency()
+                    else:
+                        self.otp_window.deiconify()
+                    self.otp_window.lift()
+                elif command == 'hide':
+                    self.otp_window.withdraw()
+        except queue.Empty:
+            pass
+        self.otp_window.after(KEYPAD_POLL_MS, self.process_commands)
+
+    def on_keypad_mapped(self, event):
+        if event.widget is self.otp_window and self.show_requested_at is not None:
+            self.record_show_latency()
+
+    def record_show_latency(self):
+        latency = time.monotonic() - self.show_requested_at
+        self.show_requested_at = None
+        self.show_latencies.append(latency)
+        print(f"Keypad visible {latency * 1000:.0f} ms after set_otp")
+
+    def reset_keypad(self):
+        self.pin = ""
+        self.pin_var.set("")
+        self.error_label.config(text="")
+
     def handle_button(self, number):
         if len(self.pin) < 4:
             self.pin += number
@@ -137,49 +217,115 @@ class OTPVerifier:
 
     def verify_otp(self):
         entered_otp = self.pin_var.get()
-        if entered_otp == self.current_otp:
-            self.otp_window.destroy()
-            self.otp_window = None
-            
-            if self.door_callback:
-                self.door_callback("open")
-
-            self.notify_server_otp_verified()
-            self.current_otp = None
-            self.current_delivery_id = None
+        # Only the code of the delivery the robot has arrived with is accepted
+        delivery = self.registry.verify(entered_otp, delivery_id=self.current_delivery_id)
+        if delivery:
+            self.otp_window.withdraw()
+            VERIFICATIONS.inc()
+            self.unlock(delivery)
+            self.notify_server_otp_verified(delivery.delivery_id, entered_otp)
         else:
+            REJECTED_CODES.inc()
             self.error_label.config(text="Invalid security code. Please try again.")
+            self.pin = ""
             self.pin_var.set('')  # Clear the input
 
-    def notify_server_otp_verified(self):
-        if not self.current_delivery_id:
+    def verify_face(self, frames=None, delivery_id=None):
+        """Match the camera (or the given frames) against the owner of delivery_id, by default
+        the delivery the robot has arrived with (see serve); returns the opened compartment or None"""
+        if not self.face_verifier:
+            raise ValueError("Face verification is not enabled")
+        delivery_id = delivery_id or self.current_delivery_id
+        if delivery_id is None:
+            raise ValueError("No delivery to verify a face for")
+        match = self.face_verifier.match(frames, delivery_id)
+        if not match:
+            return None
+        matched_id, score = match
+        delivery = self.registry.release(matched_id, revoked=False)
+        if not delivery:
+            # Expired, revoked or already collected since its faces were loaded
+            self.face_verifier.gallery.remove(matched_id)
+            return None
+        if self.otp_window is not None:
+            self.hide_keypad()
+        FACE_VERIFICATIONS.inc()
+        self.unlock(delivery)
+        self.outbox.enqueue({
+            "deliveryId": delivery.delivery_id,
+            "method": "face",
+            "score": round(score, 3),
+            "ownerId": self.owner_ids.get(delivery.delivery_id)
+        })
+        return delivery.compartment
+
+    def unlock(self, delivery):
+        """Open a verified delivery's compartment and forget it"""
+        if self.door_callback:
+            # Door hardware is slow, keep it off the Tk thread
+            threading.Thread(target=self.door_callback, args=("open", delivery.compartment), daemon=True).start()
+        if self.face_verifier:
+            self.face_verifier.gallery.remove(delivery.delivery_id)
+        if self.current_delivery_id == delivery.delivery_id:
+            self.current_delivery_id = None
+
+    def notify_server_otp_verified(self, delivery_id, otp):
+        """Queue the verification for the server; the outbox sends it in the background"""
+        if not delivery_id:
             print("No delivery ID found for OTP verification")
             return
 
-        owner_id = self.get_owner_id(self.current_delivery_id)
+        self.outbox.enqueue({
+            "deliveryId": delivery_id,
+            "otp": otp,
+            "ownerId": self.owner_ids.get(delivery_id)
+        })
+
+    def deliver_verification(self, event):
+        """Outbox deliver function: raises to retry, PermanentError to drop"""
+        delivery_id = event["deliveryId"]
+        owner_id = event.get("ownerId") or self.get_owner_id(delivery_id)
         if not owner_id:
-            print("Failed to retrieve ownerId")
-            return
+            raise RuntimeError("Failed to retrieve ownerId")
 
-        url = f"{self.server_url}/{self.current_delivery_id}/verify-otp"
-        payload = {
-            "otp": self.current_otp,
-            "ownerId": owner_id
-        }
+        if event.get("method") == "face":
+            url = f"{self.server_url}/{delivery_id}/verify-face"
+            payload = {
+                "score": event["score"],
+                "ownerId": owner_id
+            }
+        else:
+            url = f"{self.server_url}/{delivery_id}/verify-otp"
+            payload = {
+                "otp": event["otp"],
+                "ownerId": owner_id
+            }
+        with SERVER_TIME.time():
+            response = self.session.post(url, json=payload, timeout=self.timeout)
+        if response.status_code == 200:
+            print("OTP verified and door opening notification sent to server.")
+            self.owner_ids.pop(delivery_id, None)
+        elif 400 <= response.status_code < 500 and response.status_code not in (408, 429):
+            raise PermanentError(f"Failed to verify OTP on server: {response.text}")
+        else:
+            raise RuntimeError(f"Server returned {response.status_code}")
 
-        try:
-            response = requests.post(url, json=payload)
-            if response.status_code == 200:
-                print("OTP verified and door opening notification sent to server.")
-            else:
-                print(f"Failed to verify OTP on server: {response.text}")
-        except Exception as e:
-            print(f"Error sending OTP verification request: {e}")
+    def prefetch(self, delivery_id):
+        self.prefetch_owner_id(delivery_id)
+        if self.face_verifier:
+            self.prefetch_faces(delivery_id)
+
+    def prefetch_owner_id(self, delivery_id):
+        owner_id = self.get_owner_id(delivery_id)
+        if owner_id:
+            self.owner_ids[delivery_id] = owner_id
 
     def get_owner_id(self, delivery_id):
+        if delivery_id in self.owner_ids:
+            return self.owner_ids[delivery_id]
         try:
             url = f"{self.server_url}/{delivery_id}"
-            response = requests.get(url)
+            response = self.session.get(url, timeout=self.timeout)
             if response.status_code == 200:
                 data = response.json()
                 return data.get("ownerId")
@@ -190,5 +336,21 @@ class OTPVerifier:
             print(f"Exception while fetching ownerId: {e}")
             return None
 
+    def prefetch_faces(self, delivery_id):
+        """Load the owner's enrolled face embeddings into the verifier's gallery"""
+        try:
+            url = f"{self.server_url}/{delivery_id}/face-embeddings"
+            response = self.session.get(url, timeout=self.timeout)
+            if response.status_code != 200:
+                print(f"No face embeddings for delivery {delivery_id}: {response.status_code}")
+                return
+            embeddings = response.json().get("embeddings")
+            if embeddings:
+                # Slots of collected or expired deliveries are free for this one
+                self.face_verifier.gallery.retain(self.registry.delivery_ids())
+                self.face_verifier.gallery.load(delivery_id, embeddings)
+        except Exception as e:
+            print(f"Exception while fetching face embeddings: {e}")
+
     def verify_delivery_id(self, delivery_id):
-        return delivery_id == self.current_delivery_id
+        return self.registry.compartment_for(delivery_id) is not None
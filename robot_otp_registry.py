@@ -0,0 +1,185 @@
+import hmac
+import time
+import heapq
+import secrets
+import hashlib
+import threading
+
+
+class Delivery:
+    __slots__ = ('delivery_id', 'compartment', 'digest', 'expires_at', 'attempts', 'revoked')
+
+    def __init__(self, delivery_id, compartment, digest, expires_at):
+        self.delivery_id = delivery_id
+        self.compartment = compartment
+        self.digest = digest
+        self.expires_at = expires_at
+        self.attempts = 0
+        # Expired or too many wrong codes: the code no longer opens it, but the package is still inside
+        self.revoked = False
+
+
+class OTPRegistry:
+    """Active deliveries keyed by compartment, with their OTPs stored only as keyed hashes.
+
+    A code entered for a known delivery is compared with hmac.compare_digest
+    against that delivery's stored digest. Without one, the code is looked up in
+    O(1) by HMAC digest (the key is random per process, so lookup timing says
+    nothing about other codes). Codes expire after ttl seconds, popped from a
+    deadline heap. Failed attempts count against the delivery being served, or a
+    shared counter when none is given; max_attempts failures revoke that
+    delivery's code or lock the keypad for lockout_seconds. An expired or revoked
+    delivery keeps its compartment until it is released (opened or cleared).
+    """
+
+    def __init__(self, compartments=4, ttl=3600, max_attempts=5, lockout_seconds=60, clock=time.monotonic):
+        self.compartments = list(range(1, compartments + 1)) if isinstance(compartments, int) else list(compartments)
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.lockout_seconds = lockout_seconds
+        self.clock = clock
+        self.key = secrets.token_bytes(32)
+        self.lock = threading.Lock()
+        self.deliveries = {}  # delivery_id -> Delivery
+        self.by_digest = {}  # digest -> {delivery_id: Delivery}, codes can repeat across deliveries
+        self.by_compartment = {}  # compartment -> Delivery
+        self.free = list(self.compartments)  # min-heap, may hold compartments taken since they were freed
+        heapq.heapify(self.free)
+        self.deadlines = []  # (expires_at, delivery_id), stale entries skipped when popped
+        self.failed_attempts = 0
+        self.locked_until = 0.0
+
+    def digest(self, otp):
+        return hmac.new(self.key, str(otp).encode(), hashlib.sha256).digest()
+
+    def register(self, delivery_id, otp, compartment=None, ttl=None):
+        """Add or replace a delivery's OTP; returns its compartment.
+
+        Raises ValueError if the requested compartment is taken or none is free.
+        """
+        with self.lock:
+            now = self.clock()
+            self.expire(now)
+            previous = self.deliveries.get(delivery_id)
+            if compartment is None:
+                compartment = previous.compartment if previous else self.free_compartment()
+                if compartment is None:
+                    raise ValueError("No free compartment")
+            elif compartment not in self.compartments:
+                raise ValueError(f"Unknown compartment {compartment}")
+            occupant = self.by_compartment.get(compartment)
+            if occupant and occupant.delivery_id != delivery_id:
+                raise ValueError(f"Compartment {compartment} holds delivery {occupant.delivery_id}")
+            if previous:
+                self.remove(previous)
+            delivery = Delivery(delivery_id, compartment, self.digest(otp), now + (ttl or self.ttl))
+            self.deliveries[delivery_id] = delivery
+            self.by_digest.setdefault(delivery.digest, {})[delivery_id] = delivery
+            self.by_compartment[compartment] = delivery
+            heapq.heappush(self.deadlines, (delivery.expires_at, delivery_id))
+            return compartment
+
+    def free_compartment(self):
+        while self.free:
+            compartment = heapq.heappop(self.free)
+            if compartment not in self.by_compartment:
+                return compartment
+        return None
+
+    def revoke(self, delivery):
+        """Stop accepting the delivery's code; the compartment stays reserved"""
+        if delivery.revoked:
+            return
+        delivery.revoked = True
+        matches = self.by_digest[delivery.digest]
+        del matches[delivery.delivery_id]
+        if not matches:
+            del self.by_digest[delivery.digest]
+
+    def remove(self, delivery):
+        self.revoke(delivery)
+        del self.deliveries[delivery.delivery_id]
+        del self.by_compartment[delivery.compartment]
+        heapq.heappush(self.free, delivery.compartment)
+
+    def expire(self, now):
+        while self.deadlines and self.deadlines[0][0] <= now:
+            expires_at, delivery_id = heapq.heappop(self.deadlines)
+            delivery = self.deliveries.get(delivery_id)
+            if delivery and delivery.expires_at == expires_at and not delivery.revoked:
+                print(f"OTP for delivery {delivery_id} expired, compartment {delivery.compartment} stays reserved")
+                self.revoke(delivery)
+
+    def verify(self, otp, delivery_id=None):
+        """Check an entered code; returns the matching Delivery (now removed) or None.
+
+        With delivery_id only that delivery's code is accepted, otherwise the code
+        must identify exactly one delivery whose code is still valid.
+        """
+        with self.lock:
+            now = self.clock()
+            self.expire(now)
+            if now < self.locked_until:
+                return None
+            digest = self.digest(otp)
+            if delivery_id is not None:
+                delivery = self.deliveries.get(delivery_id)
+                if delivery and (delivery.revoked or not hmac.compare_digest(delivery.digest, digest)):
+                    delivery = None
+            else:
+                matches = self.by_digest.get(digest, {})
+                if len(matches) > 1:
+                    # A correct code, just not unique; the caller has to say which delivery
+                    print("Code matches several deliveries")
+                    return None
+                delivery = next(iter(matches.values()), None)
+            if delivery:
+                self.remove(delivery)
+                self.failed_attempts = 0
+                return delivery
+            self.record_failure(now, delivery_id)
+            return None
+
+    def record_failure(self, now, delivery_id):
+        target = self.deliveries.get(delivery_id)
+        if target:
+            target.attempts += 1
+            if target.attempts >= self.max_attempts and not target.revoked:
+                print(f"Too many wrong codes for delivery {delivery_id}, OTP revoked")
+                self.revoke(target)
+        else:
+            self.failed_attempts += 1
+            if self.failed_attempts >= self.max_attempts:
+                print(f"Too many wrong codes, keypad locked for {self.lockout_seconds}s")
+                self.locked_until = now + self.lockout_seconds
+                self.failed_attempts = 0
+
+    def compartment_for(self, delivery_id):
+        """The compartment reserved for a delivery (even with its code expired), or None"""
+        with self.lock:
+            self.expire(self.clock())
+            delivery = self.deliveries.get(delivery_id)
+            return delivery.compartment if delivery else None
+
+    def release(self, delivery_id, revoked=True):
+        """Forget a delivery and free its compartment, e.g. once its door was opened.
+
+        With revoked=False a delivery whose code has expired or been revoked is
+        left in place and None is returned.
+        """
+        with self.lock:
+            self.expire(self.clock())
+            delivery = self.deliveries.get(delivery_id)
+            if delivery and (revoked or not delivery.revoked):
+                self.remove(delivery)
+                return delivery
+            return None
+
+    def delivery_ids(self):
+        """Deliveries whose code is still valid"""
+        with self.lock:
+            self.expire(self.clock())
+            return {delivery_id for delivery_id, delivery in self.deliveries.items() if not delivery.revoked}
+
+    def __len__(self):
+        return len(self.deliveries)
@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import uuid
+import random
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) seconds for every request to the delivery server
+DEFAULT_TIMEOUT = (3.05, 10)
+
+
+class PermanentError(Exception):
+    """Raised by a deliver function when retrying the event can never succeed"""
+
+
+def make_session(pool_size=4, retries=2, backoff_factor=0.5):
+    """A keep-alive session; urllib3 retries connection errors and idempotent requests"""
+    session = requests.Session()
+    retry = Retry(total=retries, connect=retries, read=retries, backoff_factor=backoff_factor,
+                  status_forcelist=(502, 503, 504), allowed_methods=frozenset(["GET", "HEAD"]))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class Outbox:
+    """Durable queue of events delivered by a background sender thread.
+
+    Each event is a JSON file in directory, written atomically before enqueue()
+    returns and deleted once deliver(payload) succeeds, so events survive
+    restarts and network outages. Failed deliveries are retried with exponential
+    backoff and jitter; a PermanentError moves the event to directory/failed.
+    """
+
+    def __init__(self, deliver, directory="otp_outbox", backoff=1.0, max_backoff=300.0, max_attempts=None):
+        self.deliver = deliver
+        self.directory = directory
+        self.failed_directory = os.path.join(directory, "failed")
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+        self.wake = False
+        self.delivered = 0
+        self.retries = 0
+        self.failed = 0
+        os.makedirs(self.failed_directory, exist_ok=True)
+
+    def path(self, event_id):
+        return os.path.join(self.directory, f"{event_id}.json")
+
+    def write(self, event):
+        path = self.path(event['id'])
+        tmp_path = path + ".tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(event, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def enqueue(self, payload):
+        """Persist payload for delivery and wake the sender; returns the event id"""
+        # Time-ordered ids keep delivery in enqueue order
+        event = {
+            'id': f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}",
+            'payload': payload,
+            'attempts': 0,
+            'next_attempt': 0
+        }
+        self.write(event)
+        with self.condition:
+            self.wake = True
+            self.condition.notify()
+        return event['id']
+
+    def pending(self):
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(".json"))
+        events = []
+        for name in names:
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    events.append(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"Skipping unreadable outbox entry {name}: {e}")
+        return events
+
+    def send_due(self):
+        """Try every event whose backoff has expired; returns seconds until the next one is due"""
+        next_due = None
+        for event in self.pending():
+            if not self.running:
+                break
+            wait = event['next_attempt'] - time.time()
+            if wait > 0:
+                next_due = wait if next_due is None else min(next_due, wait)
+                continue
+            try:
+                self.deliver(event['payload'])
+            except PermanentError as e:
+                print(f"Dropping outbox event {event['id']}: {e}")
+                os.replace(self.path(event['id']), os.path.join(self.failed_directory, f"{event['id']}.json"))
+                self.failed += 1
+                continue
+            except Exception as e:
+                event['attempts'] += 1
+                if self.max_attempts and event['attempts'] >= self.max_attempts:
+                    print(f"Giving up on outbox event {event['id']} after {event['attempts']} attempts: {e}")
+                    self.write(event)
+                    os.replace(self.path(event['id']), os.path.join(self.failed_directory, f"{event['id']}.json"))
+                    self.failed += 1
+                    continue
+                delay = min(self.max_backoff, self.backoff * 2 ** (event['attempts'] - 1))
+                delay *= random.uniform(0.5, 1.0)
+                print(f"Outbox delivery failed ({e}), retry {event['attempts']} in {delay:.1f}s")
+                event['next_attempt'] = time.time() + delay
+                self.write(event)
+                self.retries += 1
+                next_due = delay if next_due is None else min(next_due, delay)
+                continue
+            os.remove(self.path(event['id']))
+            self.delivered += 1
+        return next_due
+
+    def run(self):
+        while self.running:
+            with self.condition:
+                self.wake = False
+            try:
+                next_due = self.send_due()
+            except Exception as e:
+                print(f"Outbox sender error: {e}")
+                next_due = self.backoff
+            with self.condition:
+                # Events enqueued while sending were not in this pass, go round again
+                if self.running and not self.wake:
+                    self.condition.wait(next_due)
+
+    def start(self):
+        if self.thread is None:
+            self.running = True
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def wait_empty(self, timeout=None):
+        """Block until every pending event is delivered or dropped; returns True if empty"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending():
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def stats(self):
+        return {
+            'pending': len(self.pending()),
+            'delivered': self.delivered,
+            'retries': self.retries,
+            'failed': self.failed
+        }
@@ -0,0 +1,202 @@
+import time
+import struct
+import threading
+from collections import deque
+
+SCHEMA_VERSION = 1
+# version, field count, sequence number, unix time in milliseconds
+HEADER = struct.Struct("<BBHQ")
+
+
+class Field:
+    """A telemetry value sent as a scaled integer, skipped when it moved less than deadband"""
+
+    def __init__(self, field_id, fmt, scale=1, deadband=0):
+        self.field_id = field_id
+        self.struct = struct.Struct("<B" + fmt)
+        self.scale = scale
+        self.deadband = deadband
+
+    def pack(self, value):
+        return self.struct.pack(self.field_id, round(value * self.scale))
+
+
+# Field ids are part of the wire format: add new ones, never renumber or reuse.
+# Id 5 was battery percent, dropped because the robot has no battery gauge to read.
+FIELDS = {
+    'lat': Field(1, 'i', 1e7, deadband=0.00001),  # degrees, about 1 m
+    'lon': Field(2, 'i', 1e7, deadband=0.00001),
+    'speed': Field(3, 'H', 100, deadband=0.1),  # m/s
+    'heading': Field(4, 'H', 10, deadband=5),  # degrees
+    'doors': Field(6, 'B'),  # bitmask of open compartments, bit 0 is compartment 1
+}
+FIELDS_BY_ID = {field.field_id: (name, field) for name, field in FIELDS.items()}
+
+
+class TopicPolicy:
+    """Which fields go to a topic, and how often: at most every min_interval seconds,
+    and at least every heartbeat seconds so a dashboard can tell the robot is alive"""
+
+    def __init__(self, fields, min_interval, heartbeat=60):
+        self.fields = fields
+        self.min_interval = min_interval
+        self.heartbeat = heartbeat
+
+
+DEFAULT_TOPICS = {
+    'position': TopicPolicy(('lat', 'lon', 'speed', 'heading'), min_interval=1.0, heartbeat=30),
+    'status': TopicPolicy(('doors',), min_interval=0.0, heartbeat=60),
+}
+
+
+def encode(values, sequence, timestamp_ms):
+    body = b"".join(FIELDS[name].pack(value) for name, value in values.items())
+    return HEADER.pack(SCHEMA_VERSION, len(values), sequence & 0xFFFF, timestamp_ms) + body
+
+
+def decode(payload):
+    """Inverse of encode, for dashboards and tests; returns (sequence, timestamp_ms, values)"""
+    version, count, sequence, timestamp_ms = HEADER.unpack_from(payload)
+    if version != SCHEMA_VERSION:
+        raise ValueError(f"Unsupported telemetry schema version {version}")
+    offset = HEADER.size
+    values = {}
+    for _ in range(count):
+        name, field = FIELDS_BY_ID[payload[offset]]
+        value = field.struct.unpack_from(payload, offset)[1]
+        values[name] = value / field.scale if field.scale != 1 else value
+        offset += field.struct.size
+    return sequence, timestamp_ms, values
+
+
+class TelemetryPublisher:
+    """Coalesces telemetry samples and publishes them to robot/<id>/telemetry/<topic>.
+
+    update() may be called at sensor rate from any thread; only the latest value
+    of each field is kept. flush() (called by the background thread every tick)
+    publishes each topic's changed fields no more often than its policy allows.
+    While the client is disconnected, messages are kept in a bounded buffer and
+    sent oldest first once on_connected() is called.
+    """
+
+    def __init__(self, client, robot_id, topics=None, tick=0.1, buffer_size=1000, clock=time.monotonic):
+        self.client = client
+        self.prefix = f"robot/{robot_id}/telemetry"
+        self.topics = topics or DEFAULT_TOPICS
+        self.tick = tick
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.send_lock = threading.Lock()
+        self.latest = {}  # field -> newest value
+        self.sent = {}  # field -> value last published
+        self.last_publish = {topic: None for topic in self.topics}
+        self.sequence = 0
+        self.offline = deque(maxlen=buffer_size)
+        self.stopped = threading.Event()
+        self.thread = None
+        self.messages = 0
+        self.bytes = 0
+        self.dropped = 0
+
+    def update(self, **values):
+        with self.lock:
+            for name, value in values.items():
+                if name not in FIELDS:
+                    raise KeyError(f"Unknown telemetry field {name}")
+                self.latest[name] = value
+
+    def changed(self, name):
+        if name not in self.latest:
+            return False
+        if name not in self.sent:
+            return True
+        delta = abs(self.latest[name] - self.sent[name])
+        return delta > 0 and delta >= FIELDS[name].deadband
+
+    def flush(self, now=None):
+        """Publish due topics; fields count as sent only once their message was handed off"""
+        now = self.clock() if now is None else now
+        messages = []
+        with self.lock:
+            for topic, policy in self.topics.items():
+                last = self.last_publish[topic]
+                heartbeat_due = last is None or now - last >= policy.heartbeat
+                if not heartbeat_due and now - last < policy.min_interval:
+                    continue
+                if heartbeat_due:
+                    names = [name for name in policy.fields if name in self.latest]
+                else:
+                    names = [name for name in policy.fields if self.changed(name)]
+                if not names:
+                    continue
+                values = {name: self.latest[name] for name in names}
+                try:
+                    payload = encode(values, self.sequence + 1, int(time.time() * 1000))
+                except (struct.error, TypeError) as e:
+                    print(f"Error encoding telemetry {topic}: {e}")
+                    continue
+                self.sequence += 1
+                messages.append((topic, payload, values))
+        for topic, payload, values in messages:
+            try:
+                self.publish(f"{self.prefix}/{topic}", payload)
+            except Exception as e:
+                # Left unsent, so the fields go out again on the next tick
+                print(f"Error publishing telemetry {topic}: {e}")
+                continue
+            with self.lock:
+                self.sent.update(values)
+                self.last_publish[topic] = now
+
+    def publish(self, topic, payload):
+        with self.send_lock:
+            if not self.client.is_connected():
+                if len(self.offline) == self.offline.maxlen:
+                    self.dropped += 1
+                self.offline.append((topic, payload))
+                return
+            # Anything buffered goes first so the dashboard sees samples in order
+            self.drain()
+            self.send(topic, payload)
+
+    def send(self, topic, payload, qos=0):
+        self.client.publish(topic, payload, qos=qos)
+        self.messages += 1
+        self.bytes += len(topic) + len(payload)
+
+    def drain(self):
+        while self.offline and self.client.is_connected():
+            topic, payload = self.offline.popleft()
+            self.send(topic, payload, qos=1)
+
+    def on_connected(self):
+        """Send what was buffered while offline; call from the client's on_connect"""
+        with self.send_lock:
+            self.drain()
+
+    def run(self):
+        while not self.stopped.wait(self.tick):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error publishing telemetry: {e}")
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def stats(self):
+        return {
+            'messages': self.messages,
+            'bytes': self.bytes,
+            'buffered': len(self.offline),
+            'dropped': self.dropped
+        }
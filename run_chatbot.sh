@@ -1,14 +1,25 @@
 #!/bin/bash
 
+# Socket the speech handler uses to send animation states
+export ANIMATION_SOCKET=/tmp/robot_animation.sock
+
+# Stage timings (see metrics.py): METRICS=0 turns them off, METRICS_HTTP=1 serves
+# Prometheus text on 127.0.0.1:9101 (speech) and :9102 (animation), METRICS_DIR
+# writes rotating JSON snapshots instead
+# export METRICS_HTTP=1
+
 # Start the animation handler in the background
 python3 animation_handler.py &
 ANIMATION_PID=$!
 
-# Wait a moment for the animation handler to initialize
-sleep 2
+# When the script exits, kill the animation handler
+trap 'kill $ANIMATION_PID 2>/dev/null' EXIT
+
+# Wait for the animation handler to bind its socket (up to 10 seconds)
+for _ in $(seq 1 100); do
+    [ -S "$ANIMATION_SOCKET" ] && break
+    sleep 0.1
+done
 
 # Start the speech handler
 python3 speech_handler.py
-
-# When speech handler exits, kill the animation handler
-kill $ANIMATION_PID
\ No newline at end of file
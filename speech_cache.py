@@ -0,0 +1,141 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class SpeechCache:
+    """Content-addressed cache of synthesized audio.
+
+    Clips are keyed by text, voice, engine and format. Recently used clips stay
+    in memory; everything else lives on disk, evicted least recently used once
+    the directory grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir="speech_cache", max_bytes=50 * 1024 * 1024, memory_items=32):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.miss_seconds = 0.0
+        self.hit_seconds = 0.0
+
+        # Disk index: key -> size, ordered from least to most recently used
+        self.index = OrderedDict()
+        self.disk_bytes = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        entries = []
+        for name in os.listdir(cache_dir):
+            if name.endswith('.audio'):
+                st = os.stat(os.path.join(cache_dir, name))
+                entries.append((st.st_mtime, name[:-len('.audio')], st.st_size))
+        for _, key, size in sorted(entries):
+            self.index[key] = size
+            self.disk_bytes += size
+
+    @staticmethod
+    def key(text, voice, engine, output_format):
+        return hashlib.sha256(f"{voice}|{engine}|{output_format}|{text}".encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.audio")
+
+    def get(self, key):
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.index.move_to_end(key)
+                return self.memory[key]
+            if key not in self.index:
+                return None
+            self.index.move_to_end(key)
+
+        try:
+            with open(self.path(key), 'rb') as f:
+                audio = f.read()
+            # mtime keeps the LRU order across restarts
+            os.utime(self.path(key))
+        except FileNotFoundError:
+            with self.lock:
+                self.disk_bytes -= self.index.pop(key, 0)
+            return None
+        self.remember(key, audio)
+        return audio
+
+    def put(self, key, audio):
+        tmp_path = f"{self.path(key)}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(audio)
+        os.replace(tmp_path, self.path(key))
+
+        with self.lock:
+            self.disk_bytes += len(audio) - self.index.pop(key, 0)
+            self.index[key] = len(audio)
+            while self.disk_bytes > self.max_bytes and len(self.index) > 1:
+                old_key, size = self.index.popitem(last=False)
+                self.memory.pop(old_key, None)
+                self.disk_bytes -= size
+                try:
+                    os.remove(self.path(old_key))
+                except FileNotFoundError:
+                    pass
+        self.remember(key, audio)
+
+    def remember(self, key, audio):
+        with self.lock:
+            self.memory[key] = audio
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.memory_items:
+                self.memory.popitem(last=False)
+
+    def synthesize(self, synthesize, text, voice, engine, output_format):
+        """Return cached audio for text, calling synthesize(text, voice) only on a miss"""
+        key = self.key(text, voice, engine, output_format)
+        start = time.monotonic()
+        audio = self.get(key)
+        if audio is not None:
+            with self.lock:
+                self.hits += 1
+                self.hit_seconds += time.monotonic() - start
+            return audio
+
+        audio = synthesize(text, voice)
+        elapsed = time.monotonic() - start
+        self.put(key, audio)
+        with self.lock:
+            self.misses += 1
+            self.miss_seconds += elapsed
+        return audio
+
+    def warm(self, synthesize, texts, voice, engine, output_format):
+        """Pre-render texts that are not cached yet, returning how many were synthesized"""
+        rendered = 0
+        for text in texts:
+            if self.key(text, voice, engine, output_format) in self.index:
+                continue
+            try:
+                self.synthesize(synthesize, text, voice, engine, output_format)
+                rendered += 1
+            except Exception as e:
+                print(f"⚠️ Error pre-rendering '{text}': {e}")
+        return rendered
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            mean_miss = self.miss_seconds / self.misses if self.misses else 0.0
+            mean_hit = self.hit_seconds / self.hits if self.hits else 0.0
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                # Estimated from the mean synthesis time of misses
+                'seconds_saved': self.hits * max(0.0, mean_miss - mean_hit),
+                'disk_bytes': self.disk_bytes,
+                'entries': len(self.index)
+            }
@@ -0,0 +1,242 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from speech_pipeline import SentenceSplitter, TurnMetrics
+
+EXIT_WORDS = ("exit", "quit", "stop", "bye")
+
+
+class ConversationOrchestrator:
+    """Runs the conversation as overlapping asyncio stages.
+
+    Capture, recognition, answer generation, synthesis and playback are separate
+    tasks joined by queues; blocking backends run on a thread pool with timeouts.
+    Backends:
+      capture.next_utterance(timeout) -> audio or None, optional capture.on_speech_start hook
+      recognize(audio) -> text or None
+      answer(text) -> (iterable of text chunks, fixed) where fixed answers use synthesize_fixed
+      synthesize(sentence) -> audio clip or stream
+      player.play(clip) / player.finish() / player.stop()
+    If the user starts speaking while an answer is playing, the answer is cancelled
+    (barge-in). Without echo cancellation on the sound card the robot's own voice
+    can trigger this, so it can be turned off with barge_in=False; utterances
+    that start while the robot is talking are then its own voice and are dropped.
+    """
+
+    def __init__(self, capture, recognize, answer, synthesize, player, set_state=None,
+                 synthesize_fixed=None, recognize_timeout=10, token_timeout=15,
+                 synthesize_timeout=10, max_pending=4, barge_in=True, exit_words=EXIT_WORDS):
+        self.capture = capture
+        self.recognize = recognize
+        self.answer = answer
+        self.synthesize = synthesize
+        self.synthesize_fixed = synthesize_fixed or synthesize
+        self.player = player
+        self.state_callback = set_state
+        self.recognize_timeout = recognize_timeout
+        self.token_timeout = token_timeout
+        self.synthesize_timeout = synthesize_timeout
+        self.max_pending = max_pending
+        self.barge_in_enabled = barge_in
+        self.exit_words = exit_words
+        self.executor = ThreadPoolExecutor(max_workers=6, thread_name_prefix="orchestrator")
+
+        self.loop = None
+        self.running = False
+        self.turn_task = None
+        self.speaking = False
+        # Whether the utterance being captured started while we were talking
+        self.hearing_echo = True
+        self.barged_in = False
+        self.barge_ins = 0
+        self.turns = []
+
+    def set_state(self, state):
+        if self.state_callback:
+            self.state_callback(state)
+
+    async def call(self, func, *args, timeout=None):
+        """Run a blocking backend call on the thread pool"""
+        future = self.loop.run_in_executor(self.executor, func, *args)
+        return await asyncio.wait_for(future, timeout)
+
+    def on_speech_start(self):
+        # Called from the capture thread
+        self.loop.call_soon_threadsafe(self.speech_started)
+
+    def speech_started(self):
+        if self.barge_in_enabled:
+            self.hearing_echo = False
+            self.barge_in()
+        else:
+            self.hearing_echo = self.speaking
+
+    def barge_in(self):
+        if self.speaking and self.turn_task and not self.turn_task.done():
+            print("✋ User started speaking, stopping answer")
+            self.barge_ins += 1
+            self.barged_in = True
+            self.player.stop()
+            self.turn_task.cancel()
+
+    def discard_echo(self, utterances):
+        """Drop everything captured while we were talking"""
+        self.capture.clear()
+        while not utterances.empty():
+            utterances.get_nowait()
+
+    async def capture_loop(self, utterances):
+        while self.running:
+            audio = await self.call(self.capture.next_utterance, 0.5)
+            if audio is None:
+                continue
+            if self.hearing_echo or self.speaking and not self.barge_in_enabled:
+                print("🔇 Ignoring speech captured while talking")
+                continue
+            await utterances.put(audio)
+
+    async def run(self, max_turns=None):
+        """Converse until an exit word is heard (or max_turns turns have finished)"""
+        self.loop = asyncio.get_running_loop()
+        self.running = True
+        if hasattr(self.capture, 'on_speech_start'):
+            self.capture.on_speech_start = self.on_speech_start
+        else:
+            self.hearing_echo = False
+        utterances = asyncio.Queue()
+        # The greeting is spoken with the microphone already open; an utterance
+        # in progress now started before we were listening
+        self.discard_echo(utterances)
+        capture_task = asyncio.create_task(self.capture_loop(utterances))
+
+        try:
+            while max_turns is None or len(self.turns) < max_turns:
+                self.set_state('listening')
+                audio = await utterances.get()
+                metrics = TurnMetrics()
+                self.set_state('thinking')
+
+                try:
+                    text = await self.call(self.recognize, audio, timeout=self.recognize_timeout)
+                except asyncio.TimeoutError:
+                    print("⚠️ Speech recognition timed out")
+                    continue
+                except Exception as e:
+                    print(f"⚠️ Speech recognition error: {e}")
+                    continue
+                if not text:
+                    continue
+                if text.lower() in self.exit_words:
+                    print("👋 Exiting chatbot...")
+                    self.set_state('last')
+                    break
+
+                self.barged_in = False
+                self.turn_task = asyncio.create_task(self.turn(text, metrics))
+                try:
+                    await self.turn_task
+                except asyncio.CancelledError:
+                    if not self.barged_in:
+                        raise
+                except Exception as e:
+                    print(f"❌ Error answering: {e}")
+                finally:
+                    self.turn_task = None
+                    if not self.barged_in:
+                        # After a barge-in the user's utterance is the next query
+                        self.discard_echo(utterances)
+                    self.speaking = False
+                metrics.finish()
+                metrics.interrupted = self.barged_in
+                self.turns.append(metrics)
+                print(f"⏱️ Turn timing: {metrics.summary()}")
+        finally:
+            self.running = False
+            capture_task.cancel()
+            await asyncio.gather(capture_task, return_exceptions=True)
+            self.executor.shutdown(wait=False)
+
+    async def turn(self, text, metrics):
+        print(f"🎤 User said: {text}")
+        chunks, fixed = await self.call(self.answer, text, timeout=self.token_timeout)
+        synthesize = self.synthesize_fixed if fixed else self.synthesize
+        sentences = asyncio.Queue(maxsize=self.max_pending)
+        clips = asyncio.Queue(maxsize=self.max_pending)
+        tasks = [
+            asyncio.create_task(self.generate(iter(chunks), sentences, metrics)),
+            asyncio.create_task(self.synthesize_sentences(synthesize, sentences, clips)),
+            asyncio.create_task(self.play(clips, metrics))
+        ]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.player.stop()
+            await self.call(self.player.finish)
+            raise
+        finally:
+            self.set_state('idle')
+        print(f"🤖 Response: {results[0]}")
+        return results[0]
+
+    async def generate(self, chunks, sentences, metrics):
+        splitter = SentenceSplitter()
+        text = []
+        pending = None
+        try:
+            while True:
+                # Shielded so a timed-out next() is still tracked until its thread returns
+                pending = self.loop.run_in_executor(self.executor, next, chunks, None)
+                chunk = await asyncio.wait_for(asyncio.shield(pending), self.token_timeout)
+                pending = None
+                if chunk is None:
+                    break
+                metrics.mark_first_token()
+                text.append(chunk)
+                for sentence in splitter.feed(chunk):
+                    await sentences.put(sentence)
+        finally:
+            self.close_chunks(chunks, pending)
+        for sentence in splitter.flush():
+            await sentences.put(sentence)
+        await sentences.put(None)
+        return "".join(text)
+
+    def close_chunks(self, chunks, pending):
+        """Close an abandoned answer generator once no next() call is running on it"""
+        close = getattr(chunks, 'close', None)
+        if close is None:
+            return
+        if pending is None:
+            close()
+        else:
+            pending.add_done_callback(lambda _: close())
+
+    async def synthesize_sentences(self, synthesize, sentences, clips):
+        while True:
+            sentence = await sentences.get()
+            if sentence is None:
+                await clips.put(None)
+                return
+            try:
+                clip = await self.call(synthesize, sentence, timeout=self.synthesize_timeout)
+            except asyncio.TimeoutError:
+                print(f"⚠️ Synthesis timed out: {sentence}")
+                continue
+            except Exception as e:
+                print(f"⚠️ Error synthesizing sentence: {e}")
+                continue
+            await clips.put(clip)
+
+    async def play(self, clips, metrics):
+        while True:
+            clip = await clips.get()
+            if clip is None:
+                await self.call(self.player.finish)
+                return
+            if not self.speaking:
+                metrics.mark_first_audio()
+                self.speaking = True
+                self.set_state('answering')
+            await self.call(self.player.play, clip)
@@ -0,0 +1,80 @@
+import re
+import time
+import metrics
+
+# A sentence ends at . ! ? (or a newline), optionally followed by closing quotes/brackets, then whitespace
+SENTENCE_END = re.compile(r'(?<=[.!?])["\')\]]*\s+|\n+')
+
+
+class SentenceSplitter:
+    """Splits a stream of text chunks into sentences as soon as each one is complete"""
+
+    def __init__(self, min_chars=20):
+        # Very short sentences are merged into the next one to avoid tiny TTS requests
+        self.min_chars = min_chars
+        self.buffer = ""
+
+    def feed(self, text):
+        self.buffer += text
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self.buffer):
+            if match.end() - start < self.min_chars:
+                continue
+            sentence = self.buffer[start:match.end()].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self):
+        sentence = self.buffer.strip()
+        self.buffer = ""
+        return [sentence] if sentence else []
+
+
+TURN_HELP = "Time from the end of the user's utterance to each point of the answer"
+TURN_FIRST_TOKEN_TIME = metrics.histogram("speech_turn_seconds", TURN_HELP, point="first_token")
+TURN_FIRST_AUDIO_TIME = metrics.histogram("speech_turn_seconds", TURN_HELP, point="first_audio")
+TURN_TOTAL_TIME = metrics.histogram("speech_turn_seconds", TURN_HELP, point="total")
+
+
+class TurnMetrics:
+    """Time-to-first-token, time-to-first-audio and total time for one conversational turn"""
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.first_token = None
+        self.first_audio = None
+        self.end = None
+        self.interrupted = False
+
+    def mark_first_token(self):
+        if self.first_token is None:
+            self.first_token = time.monotonic()
+
+    def mark_first_audio(self):
+        if self.first_audio is None:
+            self.first_audio = time.monotonic()
+
+    def finish(self):
+        self.end = time.monotonic()
+        for histogram, mark in ((TURN_FIRST_TOKEN_TIME, self.first_token),
+                                (TURN_FIRST_AUDIO_TIME, self.first_audio),
+                                (TURN_TOTAL_TIME, self.end)):
+            if mark is not None:
+                histogram.observe(mark - self.start)
+
+    def elapsed(self, mark):
+        return None if mark is None else mark - self.start
+
+    def summary(self):
+        parts = []
+        for name, mark in (('first token', self.first_token),
+                           ('first audio', self.first_audio),
+                           ('total', self.end)):
+            value = self.elapsed(mark)
+            parts.append(f"{name} {value:.2f}s" if value is not None else f"{name} -")
+        return ", ".join(parts)
+
@@ -0,0 +1,65 @@
+"""FrameCache: lossless frames and rebuilding a damaged cache file.
+
+Run from the repository root:
+    python3 -m pytest tests
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+from PIL import Image
+from animation_cache import FrameCache
+
+COLOURS = [(255, 0, 0), (0, 128, 255), (12, 34, 56)]
+
+
+class FrameCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        pygame.init()
+        pygame.display.set_mode((80, 60))
+        self.dir = tempfile.mkdtemp(prefix='frame_cache_test_')
+        self.gif = os.path.join(self.dir, 'idle.gif')
+        frames = [Image.new('RGB', (40, 30), colour) for colour in COLOURS]
+        frames[0].save(self.gif, save_all=True, append_images=frames[1:], duration=[50, 60, 70])
+        self.cache_dir = os.path.join(self.dir, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+        pygame.quit()
+
+    def cache(self):
+        return FrameCache({'idle': self.gif}, (80, 60), self.cache_dir)
+
+    def assertFramesIntact(self, frames, durations):
+        self.assertEqual(durations, [50, 60, 70])
+        self.assertEqual([frame.get_size() for frame in frames], [(80, 60)] * 3)
+        self.assertEqual([tuple(frame.get_at((79, 59)))[:3] for frame in frames], COLOURS)
+
+    def test_cached_frames_match_the_gif(self):
+        self.assertFramesIntact(*self.cache().load('idle'))
+        # Second load decodes the file instead of the GIF
+        self.assertFramesIntact(*self.cache().load('idle'))
+
+    def test_damaged_cache_is_rebuilt(self):
+        cache = self.cache()
+        cache.load('idle')
+        cache_file = cache.cache_path('idle')
+        with open(cache_file, 'rb') as f:
+            data = f.read()
+        for damaged in (b'', data[:len(data) // 2], b'XXXX' + data[4:]):
+            with open(cache_file, 'wb') as f:
+                f.write(damaged)
+            self.assertFramesIntact(*self.cache().load('idle'))
+            with open(cache_file, 'rb') as f:
+                self.assertEqual(f.read(), data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+"""AudioPlayer cancellation with a clip still downloading.
+
+Run from the repository root:
+    python3 -m pytest tests
+"""
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_player import AudioPlayer, NullOutput
+
+
+class SlowStream:
+    """Readable like Polly's AudioStream; each read waits until the test lets it through"""
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.gate = threading.Semaphore(0)
+        self.closed = False
+
+    def read(self, size):
+        self.gate.acquire()
+        return self.chunks.pop(0) if self.chunks else b""
+
+    def close(self):
+        self.closed = True
+
+
+class AudioPlayerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.output = NullOutput()
+        self.player = AudioPlayer(self.output)
+
+    def tearDown(self):
+        self.player.close()
+
+    def test_cancelled_clip_is_not_played_after_finish(self):
+        stream = SlowStream([b"\x00" * 1000] * 3)
+        playing = threading.Thread(target=self.player.play, args=(stream,))
+        playing.start()
+        stream.gate.release()
+        self.player.stop()
+        self.player.finish()
+        played = self.output.bytes_written
+        # The download carries on after the barge-in was handled
+        for _ in range(4):
+            stream.gate.release()
+        playing.join(2)
+        self.player.finish()
+        self.assertFalse(playing.is_alive())
+        self.assertEqual(self.output.bytes_written, played)
+        self.assertTrue(stream.closed)
+
+    def test_clips_after_finish_play(self):
+        self.player.stop()
+        self.player.play(b"\x00" * 1000)
+        self.player.finish()
+        self.assertEqual(self.output.bytes_written, 0)
+        self.player.play(b"\x00" * 1000)
+        self.player.finish()
+        self.assertEqual(self.output.bytes_written, 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
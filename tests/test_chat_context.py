@@ -0,0 +1,71 @@
+"""ContextWindow: folding evicted turns while the summarizer is failing.
+
+Run from the repository root:
+    python3 -m pytest tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_context import ContextWindow, SUMMARY_RETRY_SECONDS
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ContextWindowTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.calls = []
+        self.failing = True
+
+    def summarize(self, summary, messages):
+        self.calls.append(list(messages))
+        if self.failing:
+            raise RuntimeError("rate limited")
+        return "they talked about lifts"
+
+    def window(self):
+        return ContextWindow("You are a robot.", max_tokens=100, summarize=self.summarize,
+                             summary_batch_tokens=50, clock=self.clock)
+
+    def fill(self, context, turns):
+        for i in range(turns):
+            context.add("user", f"turn {i} " + "word " * 10)
+
+    def test_failed_summary_backs_off(self):
+        context = self.window()
+        self.fill(context, 30)
+        self.assertEqual(len(self.calls), 1)
+        self.clock.now += SUMMARY_RETRY_SECONDS
+        self.fill(context, 30)
+        self.assertEqual(len(self.calls), 2)
+        # The delay doubles after a second failure
+        self.clock.now += SUMMARY_RETRY_SECONDS
+        self.fill(context, 30)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_evicted_turns_are_capped_while_failing(self):
+        context = self.window()
+        self.fill(context, 200)
+        self.assertLessEqual(context.evicted_tokens, context.max_evicted_tokens)
+        self.failing = False
+        self.clock.now += SUMMARY_RETRY_SECONDS
+        context.add("user", "where is the lift")
+        self.assertEqual(len(self.calls), 2)
+        # The oldest turns were dropped, the newest evicted ones reached the summarizer
+        self.assertNotIn("turn 0 ", self.calls[-1][0]["content"])
+        self.assertLess(context.evicted_tokens, context.summary_batch_tokens)
+        self.assertIn("lifts", context.build()[1]["content"])
+
+
+if __name__ == "__main__":
+    unittest.main()
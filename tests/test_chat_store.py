@@ -0,0 +1,61 @@
+"""JsonlStore: compaction limits and reading the newest records.
+
+Run from the repository root:
+    python3 -m pytest tests
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_store import JsonlStore
+
+
+class JsonlStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix='chat_store_test_')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def store(self, **kwargs):
+        # Roughly three records per segment
+        return JsonlStore(self.dir, segment_bytes=40, compact_segments=3, **kwargs)
+
+    def fill(self, store, count):
+        for i in range(count):
+            store.append({"n": i})
+
+    def test_unlimited_store_never_rewrites_segments(self):
+        store = self.store()
+        self.fill(store, 30)
+        first = os.path.join(self.dir, store.segments()[0])
+        mtime = os.stat(first).st_mtime_ns
+        self.fill(store, 30)
+        store.close()
+        self.assertEqual(os.stat(first).st_mtime_ns, mtime)
+        self.assertEqual([r["n"] for r in self.store().read()], list(range(30)) * 2)
+
+    def test_limit_drops_only_the_oldest_records(self):
+        store = self.store(max_records=10)
+        self.fill(store, 60)
+        store.close()
+        records = [r["n"] for r in self.store(max_records=10).read()]
+        self.assertEqual(records[-10:], list(range(50, 60)))
+        self.assertLess(len(records), 20)
+
+    def test_tail_spans_segments(self):
+        store = self.store()
+        self.fill(store, 25)
+        self.assertEqual([r["n"] for r in store.tail(7)], list(range(18, 25)))
+        self.assertEqual(len(store.tail(100)), 25)
+        self.assertEqual(store.tail(0), [])
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+"""CommandDispatcher: per-delivery ordering, replies and queue-wait stats.
+
+Run from the repository root:
+    python3 -m pytest tests
+"""
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from robot_dispatcher import CommandDispatcher
+
+
+class CommandDispatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.handled = []
+        self.replies = []
+        self.done = threading.Semaphore(0)
+
+    def handle(self, message):
+        if message['action'] == 'broken':
+            raise ValueError("no such door")
+        self.handled.append((message['deliveryId'], message['n']))
+        return 'done'
+
+    def reply(self, message, status, result):
+        self.replies.append((message['action'], status, result))
+        self.done.release()
+
+    def test_commands_run_in_order_per_delivery(self):
+        dispatcher = CommandDispatcher(self.handle, on_reply=self.reply, workers=4, queue_size=64)
+        messages = [{'action': 'open_door', 'deliveryId': f"d{i % 5}", 'n': i} for i in range(50)]
+        messages.append({'action': 'broken', 'deliveryId': 'd0'})
+        for message in messages:
+            self.assertTrue(dispatcher.submit(message))
+        for _ in messages:
+            self.assertTrue(self.done.acquire(timeout=5))
+        stats = dispatcher.stats()
+        dispatcher.stop()
+
+        for delivery in range(5):
+            numbers = [n for d, n in self.handled if d == f"d{delivery}"]
+            self.assertEqual(numbers, sorted(numbers))
+        self.assertIn(('broken', 'error', 'no such door'), self.replies)
+        self.assertEqual(stats['failed'], 1)
+        self.assertEqual(set(stats['wait_buckets']), {'open_door', 'broken'})
+        if metrics.ENABLED:
+            self.assertEqual(sum(stats['wait_buckets']['open_door'].values()), 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
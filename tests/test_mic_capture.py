@@ -0,0 +1,80 @@
+"""VoiceActivityDetector noise tracking and MicrophoneCapture calibration saving.
+
+Run from the repository root:
+    python3 -m pytest tests
+"""
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mic_capture import VoiceActivityDetector, MicrophoneCapture, SAMPLE_RATE, FRAME_MS
+
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+
+
+def tone(frequency, amplitude, frames):
+    """Consecutive frames of a sine, low enough in pitch to pass the zero-crossing check"""
+    t = np.arange(frames * FRAME_SAMPLES) / SAMPLE_RATE
+    samples = (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.int16)
+    return [samples[i * FRAME_SAMPLES:(i + 1) * FRAME_SAMPLES].tobytes() for i in range(frames)]
+
+
+class FrameSource:
+    sample_rate = SAMPLE_RATE
+
+    def __init__(self, frames):
+        self.frames = list(frames)
+
+    def read(self, frames):
+        return self.frames.pop(0) if self.frames else b""
+
+    def close(self):
+        pass
+
+
+class VoiceActivityDetectorTest(unittest.TestCase):
+
+    def test_steady_loud_background_stops_reading_as_speech(self):
+        vad = VoiceActivityDetector(noise_floor=200.0)
+        hum = [vad.is_speech(frame) for frame in tone(120, 3000, 200)]
+        self.assertTrue(hum[0])
+        self.assertFalse(any(hum[-50:]))
+
+    def test_speech_does_not_raise_the_floor(self):
+        vad = VoiceActivityDetector(noise_floor=200.0)
+        words = tone(180, 6000, 400)
+        pauses = tone(180, 300, 400)
+        for i in range(400):
+            vad.is_speech(words[i] if i % 10 < 6 else pauses[i])
+        self.assertLess(vad.noise_floor, 1000)
+        self.assertTrue(vad.is_speech(words[0]))
+
+
+class MicrophoneCaptureTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix='mic_capture_test_')
+        self.path = os.path.join(self.dir, 'noise_floor.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_calibration_is_saved_while_running(self):
+        capture = MicrophoneCapture(FrameSource(tone(120, 3000, 200)), calibration_path=self.path,
+                                    save_interval=0)
+        # Runs until the source is exhausted, without stop()
+        capture.running = True
+        capture.capture_loop()
+        with open(self.path) as f:
+            self.assertAlmostEqual(json.load(f)["noise_floor"], capture.vad.noise_floor)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""OTPRegistry: attempt limits, expiry, compartment reuse and verification scoped to a delivery.
+
+Run from the repository root:
+    python3 -m pytest tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from robot_otp_registry import OTPRegistry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class OTPRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.registry = OTPRegistry(compartments=2, ttl=600, max_attempts=3, lockout_seconds=60, clock=self.clock)
+
+    def test_correct_code_opens_and_frees_compartment(self):
+        compartment = self.registry.register("a", "1234")
+        delivery = self.registry.verify("1234", delivery_id="a")
+        self.assertEqual(delivery.compartment, compartment)
+        self.assertIsNone(self.registry.compartment_for("a"))
+        self.assertEqual(self.registry.register("b", "5678"), compartment)
+
+    def test_code_of_another_delivery_is_rejected(self):
+        self.registry.register("a", "1111")
+        self.registry.register("b", "2222")
+        self.assertIsNone(self.registry.verify("2222", delivery_id="a"))
+        self.assertEqual(self.registry.deliveries["a"].attempts, 1)
+        # b is untouched and still opens with its own code
+        self.assertEqual(self.registry.verify("2222", delivery_id="b").delivery_id, "b")
+
+    def test_shared_code_opens_the_delivery_being_served(self):
+        self.registry.register("a", "1111")
+        self.registry.register("b", "1111")
+        self.assertIsNone(self.registry.verify("1111"))
+        self.assertEqual(self.registry.failed_attempts, 0)
+        self.assertEqual(self.registry.verify("1111", delivery_id="a").delivery_id, "a")
+        self.assertEqual(self.registry.verify("1111").delivery_id, "b")
+
+    def test_wrong_codes_revoke_but_keep_compartment(self):
+        compartment = self.registry.register("a", "1234")
+        for _ in range(3):
+            self.assertIsNone(self.registry.verify("0000", delivery_id="a"))
+        self.assertIsNone(self.registry.verify("1234", delivery_id="a"))
+        self.assertEqual(self.registry.compartment_for("a"), compartment)
+        self.assertEqual(self.registry.delivery_ids(), set())
+        self.assertEqual(self.registry.release("a").compartment, compartment)
+        self.assertIsNone(self.registry.compartment_for("a"))
+
+    def test_keypad_locks_after_unscoped_failures(self):
+        self.registry.register("a", "1234")
+        for _ in range(3):
+            self.assertIsNone(self.registry.verify("0000"))
+        self.assertIsNone(self.registry.verify("1234"))
+        self.clock.now += 61
+        self.assertEqual(self.registry.verify("1234").delivery_id, "a")
+
+    def test_expired_code_is_invalid_but_compartment_stays_reserved(self):
+        compartment = self.registry.register("a", "1234")
+        self.registry.register("b", "5678")
+        self.clock.now += 601
+        self.assertIsNone(self.registry.verify("1234", delivery_id="a"))
+        self.assertIsNone(self.registry.verify("5678"))
+        self.assertEqual(self.registry.compartment_for("a"), compartment)
+        with self.assertRaises(ValueError):
+            self.registry.register("c", "9999")
+        # Face unlock does not take an expired delivery, an operator's open_door does
+        self.assertIsNone(self.registry.release("a", revoked=False))
+        self.assertEqual(self.registry.release("a").compartment, compartment)
+        self.assertEqual(self.registry.register("c", "9999"), compartment)
+
+    def test_new_code_replaces_old_in_same_compartment(self):
+        compartment = self.registry.register("a", "1234")
+        self.clock.now += 601
+        self.assertEqual(self.registry.register("a", "4321"), compartment)
+        self.assertIsNone(self.registry.verify("1234", delivery_id="a"))
+        self.assertEqual(self.registry.verify("4321", delivery_id="a").compartment, compartment)
+
+    def test_taken_compartment_is_refused(self):
+        self.registry.register("a", "1234", compartment=1)
+        with self.assertRaises(ValueError):
+            self.registry.register("b", "5678", compartment=1)
+        with self.assertRaises(ValueError):
+            self.registry.register("b", "5678", compartment=9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+"""ResponseCache: surviving a damaged cache file.
+
+Run from the repository root:
+    python3 -m pytest tests
+"""
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_cache import ResponseCache
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix='response_cache_test_')
+        self.path = os.path.join(self.dir, 'response_cache.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_saved_answers_survive_a_restart(self):
+        cache = ResponseCache(self.path, version="faq-1")
+        cache.put("Where is the lift?", "Next to the lobby.")
+        cache.save()
+        self.assertEqual(ResponseCache(self.path, version="faq-1").get("where is the lift"), "Next to the lobby.")
+
+    def test_malformed_file_is_an_empty_cache(self):
+        for content in ("not json", "[]", "\"text\"", "null",
+                        json.dumps({"version": None, "entries": [["lift", "Lobby."]]}),
+                        json.dumps({"version": None, "entries": [["lift", None, 0]]}),
+                        json.dumps({"version": None, "entries": [["lift", "Lobby.", "yesterday"]]}),
+                        json.dumps({"version": None, "entries": 5})):
+            with open(self.path, "w") as f:
+                f.write(content)
+            cache = ResponseCache(self.path)
+            self.assertEqual(cache.stats()['entries'], 0, content)
+            cache.put("where is the lift", "Next to the lobby.")
+            cache.save()
+            self.assertEqual(ResponseCache(self.path).get("where is the lift"), "Next to the lobby.")
+
+    def test_unreadable_file_is_an_empty_cache(self):
+        os.mkdir(self.path)
+        self.assertEqual(ResponseCache(self.path).stats()['entries'], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
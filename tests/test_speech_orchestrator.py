@@ -0,0 +1,155 @@
+"""ConversationOrchestrator with the fake backends from benchmarks/fakes.py.
+
+Run from the repository root:
+    python3 -m pytest tests
+"""
+import os
+import sys
+import time
+import asyncio
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from audio_player import AudioPlayer, NullOutput
+from speech_orchestrator import ConversationOrchestrator
+from fakes import LatencyModel, FakeCapture, FakeRecognizer, FakeLLM, FakeTTS
+
+ANSWER = "The lift is next to the lobby."
+
+
+async def wait_until(condition, timeout=5.0):
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(poll(), timeout)
+
+
+class OrchestratorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.capture = FakeCapture([])
+        self.llm = FakeLLM(LatencyModel(0), LatencyModel(0), answer=ANSWER)
+        self.queries = []
+        self.states = []
+        # Real-time playback, so the robot is audibly talking for about two seconds per answer
+        self.player = AudioPlayer(NullOutput(realtime=True))
+
+    def tearDown(self):
+        self.player.close()
+
+    def orchestrator(self, answer=None, **kwargs):
+        def record(text):
+            self.queries.append(text)
+            return (answer or self.llm.answer)(text)
+        return ConversationOrchestrator(self.capture, FakeRecognizer(LatencyModel(0)).recognize, record,
+                                        FakeTTS(LatencyModel(0)).synthesize, self.player,
+                                        set_state=self.states.append, **kwargs)
+
+    async def say(self, text):
+        self.capture.on_speech_start()
+        await asyncio.sleep(0.05)
+        self.capture.utterances.put(text)
+
+    async def until_listening(self, orchestrator):
+        await wait_until(lambda: self.states[-1:] == ['listening'] and orchestrator.turn_task is None)
+
+    def test_own_voice_is_not_a_turn(self):
+        orchestrator = self.orchestrator(barge_in=False)
+
+        async def main():
+            task = asyncio.create_task(orchestrator.run())
+            await self.until_listening(orchestrator)
+            await self.say("where is the lift")
+            await wait_until(lambda: orchestrator.speaking)
+            # The microphone hears the answer: one phrase ends mid-answer, one after it
+            await self.say("the lift is next")
+            await asyncio.sleep(0.2)
+            self.capture.on_speech_start()
+            await self.until_listening(orchestrator)
+            self.capture.utterances.put("to the lobby")
+            await asyncio.sleep(0.3)
+            await self.say("bye")
+            await asyncio.wait_for(task, 5)
+
+        asyncio.run(main())
+        self.assertEqual(self.queries, ["where is the lift"])
+        self.assertEqual(len(orchestrator.turns), 1)
+
+    def test_greeting_is_not_a_turn(self):
+        orchestrator = self.orchestrator(barge_in=False)
+        # Heard during the greeting, before the orchestrator was listening
+        self.capture.utterances.put("hello how can i help you")
+
+        async def main():
+            task = asyncio.create_task(orchestrator.run())
+            await self.until_listening(orchestrator)
+            # The end of the greeting, still being captured when run() started
+            self.capture.utterances.put("help you")
+            await asyncio.sleep(0.3)
+            await self.say("where is the lift")
+            await wait_until(lambda: self.queries)
+            await self.until_listening(orchestrator)
+            await self.say("bye")
+            await asyncio.wait_for(task, 5)
+
+        asyncio.run(main())
+        self.assertEqual(self.queries, ["where is the lift"])
+
+    def test_barge_in_utterance_is_next_turn(self):
+        orchestrator = self.orchestrator(barge_in=True)
+
+        async def main():
+            task = asyncio.create_task(orchestrator.run())
+            await self.until_listening(orchestrator)
+            await self.say("where is the lift")
+            await wait_until(lambda: orchestrator.speaking)
+            await self.say("what floor is the cafeteria on")
+            await wait_until(lambda: len(self.queries) == 2)
+            await self.until_listening(orchestrator)
+            await self.say("bye")
+            await asyncio.wait_for(task, 5)
+
+        asyncio.run(main())
+        self.assertEqual(self.queries, ["where is the lift", "what floor is the cafeteria on"])
+        self.assertTrue(orchestrator.turns[0].interrupted)
+
+    def test_timed_out_answer_is_closed_and_logged(self):
+        history = []
+
+        def slow_answer(text):
+            def stream():
+                history.append(("user", text))
+                answer = []
+                try:
+                    for word in ["Let ", "me ", "check."]:
+                        time.sleep(0.5 if text == "slow" else 0)
+                        answer.append(word)
+                        yield word
+                finally:
+                    history.append(("assistant", "".join(answer)))
+            return stream(), False
+
+        orchestrator = self.orchestrator(answer=slow_answer, barge_in=False, token_timeout=0.2)
+
+        async def main():
+            task = asyncio.create_task(orchestrator.run())
+            await self.until_listening(orchestrator)
+            await self.say("slow")
+            await wait_until(lambda: len(history) == 2)
+            await self.until_listening(orchestrator)
+            await self.say("fast")
+            await wait_until(lambda: len(history) == 4)
+            await self.until_listening(orchestrator)
+            await self.say("bye")
+            await asyncio.wait_for(task, 5)
+
+        asyncio.run(main())
+        self.assertEqual(history, [("user", "slow"), ("assistant", "Let "),
+                                   ("user", "fast"), ("assistant", "Let me check.")])
+
+
+if __name__ == "__main__":
+    unittest.main()
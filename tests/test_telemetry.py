@@ -0,0 +1,67 @@
+"""TelemetryPublisher: fields are only marked sent once their message went out.
+
+Run from the repository root:
+    python3 -m pytest tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from robot_telemetry import TelemetryPublisher, decode
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeClient:
+    def __init__(self):
+        self.messages = []
+        self.failing = False
+
+    def is_connected(self):
+        return True
+
+    def publish(self, topic, payload, qos=0):
+        if self.failing:
+            raise OSError("socket closed")
+        self.messages.append((topic, decode(payload)[2]))
+
+
+class TelemetryPublisherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.client = FakeClient()
+        self.publisher = TelemetryPublisher(self.client, "rob-001", clock=self.clock)
+
+    def test_failed_publish_is_resent(self):
+        self.publisher.update(doors=1)
+        self.client.failing = True
+        self.publisher.flush()
+        self.client.failing = False
+        self.clock.now += 0.1
+        self.publisher.flush()
+        self.assertEqual(self.client.messages, [("robot/rob-001/telemetry/status", {'doors': 1})])
+
+    def test_unencodable_value_does_not_block_other_topics(self):
+        self.publisher.update(lat=12.97, lon=77.59, speed=-1, heading=90)
+        self.publisher.update(doors=2)
+        self.publisher.flush()
+        self.assertEqual(self.client.messages, [("robot/rob-001/telemetry/status", {'doors': 2})])
+        # Once the value is valid the position goes out, sequence numbers without a gap
+        self.publisher.update(speed=1.5)
+        self.clock.now += 1
+        self.publisher.flush()
+        self.assertEqual(self.client.messages[-1][1]['speed'], 1.5)
+        self.assertEqual(self.publisher.sequence, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()